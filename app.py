@@ -1,20 +1,34 @@
-from flask import Flask, request, jsonify, render_template_string
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from flask import Flask, Response, request, jsonify, render_template_string, send_file, stream_with_context
+# Selenium's WebDriver, Pillow and OpenAI are imported where first used, so workers boot fast
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+import atexit
 import base64
+import copy
+import hashlib
+import hmac
 import json
+import math
 import os
+import sqlite3
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from itertools import groupby
+from urllib.parse import urlsplit, urlunsplit, urljoin, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+import xml.etree.ElementTree as ElementTree
 from datetime import datetime
+from html.parser import HTMLParser
+import codecs
 import requests
-from PIL import Image
+from requests.adapters import HTTPAdapter
 import io
-import colorsys
-from openai import OpenAI
+import re
+import numpy as np
 from dotenv import load_dotenv
 import os
 app = Flask(__name__)
@@ -22,491 +36,4429 @@ app = Flask(__name__)
 
 # Load environment variables from a .env file
 load_dotenv()
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+# OpenAI client, created on first use by get_openai_client
+client = None
+client_lock = threading.Lock()
+
+
+def get_openai_client():
+    """Return the shared OpenAI client, constructing it on first use"""
+    global client
+    if client is None:
+        with client_lock:
+            if client is None:
+                from openai import OpenAI
+                # OPENAI_BASE_URL points the client at any OpenAI-compatible endpoint (or a local mock)
+                client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), base_url=os.getenv('OPENAI_BASE_URL') or None)
+    return client
+
+
+# Tags whose rendered text is needed by the checks (headings, links, labels...)
+SNAPSHOT_TEXT_TAGS = ['a', 'button', 'label', 'legend', 'summary', 'option',
+                      'h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+# Shared by the in-page collectors: walks the document, open shadow roots and
+# same-origin iframes in one pass. visit(el, context, parent) returns the
+# element's index. Shadow and frame content directly follows its host, so a
+# parent is always visited before its children. context.offset converts a
+# frame's viewport coordinates to the top-level viewport.
+DOM_TRAVERSAL_SCRIPT = """
+const describeHost = (el) => {
+    const tag = el.tagName.toLowerCase();
+    if (el.id) return tag + '#' + el.id;
+    let position = 1;
+    for (let sibling = el.previousElementSibling; sibling; sibling = sibling.previousElementSibling) {
+        if (sibling.tagName === el.tagName) position++;
+    }
+    return tag + ':nth-of-type(' + position + ')';
+};
+const joinPath = (path, part) => (path ? path + ' > ' + part : part);
+const frameDocument = (el) => {
+    try {
+        return el.contentDocument;
+    } catch (e) {
+        return null;
+    }
+};
+const deepActiveElement = () => {
+    let active = document.activeElement;
+    while (active) {
+        if (active.shadowRoot && active.shadowRoot.activeElement) {
+            active = active.shadowRoot.activeElement;
+        } else if ((active.tagName === 'IFRAME' || active.tagName === 'FRAME') && frameDocument(active) &&
+                   frameDocument(active).activeElement && frameDocument(active).activeElement !== frameDocument(active).body) {
+            active = frameDocument(active).activeElement;
+        } else {
+            break;
+        }
+    }
+    return active;
+};
+
+function traverseDom(visit, onBlockedFrame) {
+    const visitChildren = (root, context, parent) => {
+        for (let child = root.firstElementChild; child; child = child.nextElementSibling) {
+            visitElement(child, context, parent);
+        }
+    };
+    const visitElement = (el, context, parent) => {
+        const index = visit(el, context, parent);
+        if (el.shadowRoot) {
+            const shadow = Object.assign({}, context, {shadow: joinPath(context.shadow, describeHost(el))});
+            visitChildren(el.shadowRoot, shadow, index);
+        }
+        if (el.tagName === 'IFRAME' || el.tagName === 'FRAME') {
+            const doc = frameDocument(el);
+            if (doc && doc.documentElement) {
+                const rect = el.getBoundingClientRect();
+                const style = context.view.getComputedStyle(el);
+                const shown = rect.width > 0 && rect.height > 0 && style.visibility === 'visible' &&
+                    (typeof el.checkVisibility !== 'function' || el.checkVisibility({checkOpacity: true, checkVisibilityCSS: true}));
+                visitElement(doc.documentElement, {
+                    doc: doc,
+                    view: doc.defaultView,
+                    offset: [context.offset[0] + rect.left + el.clientLeft + parseFloat(style.paddingLeft),
+                             context.offset[1] + rect.top + el.clientTop + parseFloat(style.paddingTop)],
+                    hidden: context.hidden || !shown,
+                    frame: joinPath(context.frame, describeHost(el)),
+                    shadow: ''
+                }, index);
+            } else if (onBlockedFrame) {
+                onBlockedFrame(el, index);
+            }
+        }
+        visitChildren(el, context, index);
+    };
+    visitElement(document.documentElement,
+                 {doc: document, view: window, offset: [0, 0], hidden: false, frame: '', shadow: ''}, -1);
+}
+"""
+
+# Collects the whole page, including open shadow roots and same-origin iframes,
+# in one execute_script call. Elements are returned in document order with
+# shadow and frame content after its host, so a node's parent always has a
+# lower index than the node. Nodes outside the top-level document are tagged
+# with their 'frame' and 'shadow' host paths.
+SNAPSHOT_SCRIPT = DOM_TRAVERSAL_SCRIPT + """
+const textTags = new Set(arguments[0]);
+const maxText = 200;
+const maxAttr = 500;
+const clip = (s, n) => (s.length > n ? s.slice(0, n) : s);
+const isVisible = (el, style, rect) => {
+    if (typeof el.checkVisibility === 'function') {
+        const opts = {opacityProperty: true, visibilityProperty: true,
+                      checkOpacity: true, checkVisibilityCSS: true};
+        if (!el.checkVisibility(opts)) return false;
+    } else if (style.display === 'none' || style.visibility !== 'visible' || style.opacity === '0') {
+        return false;
+    }
+    return rect.width > 0 && rect.height > 0;
+};
+
+const nodes = [];
+const ranges = new Map();
+const scrollX = window.scrollX, scrollY = window.scrollY;
+
+traverseDom((el, context, parent) => {
+    const tag = el.tagName.toLowerCase();
+    const style = context.view.getComputedStyle(el);
+    const rect = el.getBoundingClientRect();
+    const [offsetX, offsetY] = context.offset;
+    if (!ranges.has(context.doc)) ranges.set(context.doc, context.doc.createRange());
+    const range = ranges.get(context.doc);
+    const attrs = {};
+    for (const attr of el.attributes) attrs[attr.name] = clip(attr.value, maxAttr);
+
+    let ownText = '';
+    for (const child of el.childNodes) {
+        if (child.nodeType === Node.TEXT_NODE) ownText += child.nodeValue;
+    }
+    ownText = clip(ownText.replace(/\\s+/g, ' ').trim(), maxText);
+    let textRect;
+    if (ownText) {
+        // Box around the element's own text, excluding padding and child elements
+        let left = Infinity, top = Infinity, right = -Infinity, bottom = -Infinity;
+        for (const child of el.childNodes) {
+            if (child.nodeType !== Node.TEXT_NODE || !child.nodeValue.trim()) continue;
+            range.selectNodeContents(child);
+            const r = range.getBoundingClientRect();
+            if (!r.width || !r.height) continue;
+            left = Math.min(left, r.left); top = Math.min(top, r.top);
+            right = Math.max(right, r.right); bottom = Math.max(bottom, r.bottom);
+        }
+        if (right > left) {
+            textRect = [Math.round(left + offsetX + scrollX), Math.round(top + offsetY + scrollY),
+                        Math.round(right - left), Math.round(bottom - top)];
+        }
+    }
+
+    const node = {
+        tag: tag,
+        parent: parent,
+        attrs: attrs,
+        own_text: ownText,
+        visible: !context.hidden && isVisible(el, style, rect),
+        enabled: !(el.matches(':disabled')),
+        color: style.color,
+        background: style.backgroundColor,
+        font_size: style.fontSize,
+        outline: style.outline,
+        box_shadow: style.boxShadow,
+        rect: [Math.round(rect.left + offsetX + scrollX), Math.round(rect.top + offsetY + scrollY),
+               Math.round(rect.width), Math.round(rect.height)]
+    };
+    if (ownText || textTags.has(tag)) {
+        node.text = clip((el.innerText || '').replace(/\\s+/g, ' ').trim(), maxText);
+    }
+    if (tag === 'input' || tag === 'textarea' || tag === 'select' || tag === 'button') {
+        node.type = el.type;
+    }
+    if (tag === 'img') {
+        node.src = el.currentSrc || el.src;
+    }
+    if (textRect) {
+        node.text_rect = textRect;
+    }
+    if (context.frame) {
+        node.frame = context.frame;
+    }
+    if (context.shadow) {
+        node.shadow = context.shadow;
+    }
+    nodes.push(node);
+    return nodes.length - 1;
+}, (el, index) => {
+    // Cross-origin frames cannot be read from this document
+    nodes[index].cross_origin_frame = true;
+});
+
+return {
+    url: location.href,
+    title: document.title,
+    lang: document.documentElement.getAttribute('lang'),
+    nodes: nodes
+};
+"""
+
+
+# Walks the sequential focus order in one execute_script call. Every tabbable
+# element is focused in turn and its rendered style (including ::before and
+# ::after) is compared with the unfocused style to find a visible indicator.
+KEYBOARD_AUDIT_SCRIPT = DOM_TRAVERSAL_SCRIPT + """
+const candidateSelector = 'a[href], area[href], button, input, select, textarea, iframe, summary, ' +
+    '[tabindex], [contenteditable]:not([contenteditable="false"]), audio[controls], video[controls]';
+const styleProps = ['outlineStyle', 'outlineWidth', 'outlineColor', 'outlineOffset', 'boxShadow',
+    'borderTopColor', 'borderRightColor', 'borderBottomColor', 'borderLeftColor',
+    'borderTopWidth', 'borderBottomWidth', 'backgroundColor', 'backgroundImage', 'color',
+    'textDecorationLine', 'textDecorationColor', 'transform', 'opacity', 'filter'];
+const pseudoProps = ['content', 'backgroundColor', 'borderBottomColor', 'boxShadow', 'outlineStyle', 'opacity'];
+
+const contexts = new Map();
+const viewOf = (el) => el.ownerDocument.defaultView || window;
+const isBody = (el) => !el || el === el.ownerDocument.body;
+const isVisible = (el) => {
+    if (contexts.get(el).hidden) return false;
+    if (typeof el.checkVisibility === 'function') {
+        if (!el.checkVisibility({opacityProperty: true, visibilityProperty: true,
+                                 checkOpacity: true, checkVisibilityCSS: true})) return false;
+    } else {
+        const style = viewOf(el).getComputedStyle(el);
+        if (style.display === 'none' || style.visibility !== 'visible') return false;
+    }
+    const rect = el.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0;
+};
+const isTabbable = (el) => {
+    if (el.tabIndex < 0 || el.matches(':disabled') || el.closest('[inert]')) return false;
+    if (el.tagName === 'INPUT' && el.type === 'hidden') return false;
+    if (el.tagName === 'SUMMARY' && el.parentElement && el.parentElement.tagName !== 'DETAILS') return false;
+    return isVisible(el);
+};
+const cssPath = (el) => {
+    const parts = [];
+    while (el && el.nodeType === Node.ELEMENT_NODE) {
+        if (el.id) {
+            parts.unshift('#' + CSS.escape(el.id));
+            break;
+        }
+        let part = el.tagName.toLowerCase();
+        const parent = el.parentElement;
+        if (parent) {
+            const same = Array.from(parent.children).filter((child) => child.tagName === el.tagName);
+            if (same.length > 1) part += ':nth-of-type(' + (same.indexOf(el) + 1) + ')';
+        }
+        parts.unshift(part);
+        el = parent;
+    }
+    return parts.join(' > ');
+};
+const styleOf = (el) => {
+    const values = {};
+    const view = viewOf(el);
+    const style = view.getComputedStyle(el);
+    for (const prop of styleProps) values[prop] = style[prop];
+    for (const pseudo of ['::before', '::after']) {
+        const pseudoStyle = view.getComputedStyle(el, pseudo);
+        for (const prop of pseudoProps) values[pseudo + prop] = pseudoStyle[prop];
+    }
+    return values;
+};
+const hasVisibleOutline = (values) =>
+    values.outlineStyle !== 'none' && parseFloat(values.outlineWidth) > 0;
+
+// Sequential focus navigation order: positive tabindex ascending, then document order
+traverseDom((el, context) => {
+    if (el.matches(candidateSelector)) contexts.set(el, context);
+    return 0;
+});
+const tabbable = Array.from(contexts.keys()).filter(isTabbable);
+const positive = tabbable.filter((el) => el.tabIndex > 0).sort((a, b) => a.tabIndex - b.tabIndex);
+const order = positive.concat(tabbable.filter((el) => el.tabIndex === 0));
+
+const previousFocus = deepActiveElement();
+const scroll = [window.scrollX, window.scrollY];
+const elements = [];
+
+for (let i = 0; i < order.length; i++) {
+    const el = order[i];
+    const context = contexts.get(el);
+    const current = deepActiveElement();
+    if (!isBody(current)) current.blur();
+    const before = styleOf(el);
+    const item = {
+        position: i + 1,
+        tag: el.tagName.toLowerCase(),
+        tabindex: el.tabIndex,
+        selector: cssPath(el),
+        text: (el.innerText || el.getAttribute('aria-label') || el.value || '').replace(/\\s+/g, ' ').trim().slice(0, 50),
+        rect: (() => {
+            const r = el.getBoundingClientRect();
+            return [Math.round(r.left + context.offset[0] + scroll[0]), Math.round(r.top + context.offset[1] + scroll[1]),
+                    Math.round(r.width), Math.round(r.height)];
+        })()
+    };
+    if (context.frame) item.frame = context.frame;
+    if (context.shadow) item.shadow = context.shadow;
+
+    try {
+        el.focus({preventScroll: true});
+    } catch (e) {}
+    const active = deepActiveElement();
+    item.focused = active === el || (el.contains(active) && !isBody(active));
+
+    // A blur handler that pulls focus back to the previous element traps keyboard users
+    if (i > 0 && active === order[i - 1]) {
+        elements[i - 1].trap = 'Focus is pulled back when it leaves this element';
+    }
+
+    const after = styleOf(el);
+    const changed = styleProps.concat(
+        ['::before', '::after'].flatMap((pseudo) => pseudoProps.map((prop) => pseudo + prop))
+    ).filter((prop) => before[prop] !== after[prop]);
+    const indicators = changed.filter((prop) => !prop.startsWith('outline') || hasVisibleOutline(after));
+    item.focus_visible = item.focused && indicators.length > 0;
+    item.changed = indicators;
+
+    // Intercepting Tab outside a modal dialog keeps keyboard users from moving on
+    if (item.focused && !el.closest('[aria-modal="true"], dialog[open]')) {
+        const tab = new KeyboardEvent('keydown', {key: 'Tab', code: 'Tab', keyCode: 9, bubbles: true, cancelable: true});
+        const target = deepActiveElement();
+        target.dispatchEvent(tab);
+        const next = deepActiveElement();
+        if (tab.defaultPrevented && (next === target || order.indexOf(next) <= i)) {
+            item.trap = 'Tab key is intercepted and focus does not move forward';
+        }
+    }
+    elements.push(item);
+}
+
+const last = deepActiveElement();
+if (!isBody(last)) last.blur();
+if (!isBody(previousFocus) && previousFocus.focus) {
+    previousFocus.focus({preventScroll: true});
+}
+window.scrollTo(scroll[0], scroll[1]);
+
+return {elements: elements};
+"""
+
+# Resolves once the page has loaded, has had no requests in flight for
+# networkQuietMs and no DOM mutations for domQuietMs, or when timeoutMs runs
+# out. Requests are seen through Resource Timing entries plus wrapped fetch and
+# XMLHttpRequest, so work started by SPA bootstrapping code is waited for too.
+READINESS_SCRIPT = """
+const [mode, networkQuietMs, domQuietMs, timeoutMs] = arguments;
+const done = arguments[arguments.length - 1];
+const started = performance.now();
+
+let state = window.__accessibilityReadiness;
+if (!state) {
+    state = window.__accessibilityReadiness = {inflight: 0, lastNetwork: 0, lastMutation: performance.now(), mutations: 0};
+    for (const entry of performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))) {
+        state.lastNetwork = Math.max(state.lastNetwork, entry.responseEnd || performance.now());
+    }
+    if (window.PerformanceObserver) {
+        new PerformanceObserver(list => {
+            for (const entry of list.getEntries()) state.lastNetwork = Math.max(state.lastNetwork, entry.responseEnd);
+        }).observe({type: 'resource', buffered: true});
+    }
+    new MutationObserver(records => {
+        state.mutations += records.length;
+        state.lastMutation = performance.now();
+    }).observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+
+    const begin = () => { state.inflight++; state.lastNetwork = performance.now(); };
+    const end = () => { state.inflight = Math.max(0, state.inflight - 1); state.lastNetwork = performance.now(); };
+    if (window.fetch) {
+        const originalFetch = window.fetch;
+        window.fetch = function () {
+            begin();
+            return originalFetch.apply(this, arguments).finally(end);
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        begin();
+        this.addEventListener('loadend', end, {once: true});
+        return originalSend.apply(this, arguments);
+    };
+}
+
+// Images and fonts only show up in Resource Timing once they finish, so count the unfinished ones
+function pendingImages() {
+    let pending = 0;
+    for (const img of document.images) {
+        if (!img.complete && img.loading !== 'lazy' && (img.currentSrc || img.src)) pending++;
+    }
+    return pending;
+}
+
+function check() {
+    const now = performance.now();
+    // Both wait for the load event, so images, fonts and stylesheets in the markup have arrived
+    let ready = document.readyState === 'complete' && !!document.body && location.href !== 'about:blank';
+    let images = 0;
+    let fontsLoading = false;
+    if (ready && mode === 'settled') {
+        images = pendingImages();
+        fontsLoading = !!document.fonts && document.fonts.status === 'loading';
+        ready = state.inflight === 0 && images === 0 && !fontsLoading &&
+            now - state.lastNetwork >= networkQuietMs && now - state.lastMutation >= domQuietMs;
+    }
+    if (ready || now - started >= timeoutMs) {
+        clearInterval(timer);
+        done({
+            ready: ready,
+            waited_ms: Math.round(now - started),
+            ready_state: document.readyState,
+            inflight: state.inflight,
+            pending_images: images,
+            fonts_loading: fontsLoading,
+            mutations: state.mutations
+        });
+    }
+}
+const timer = setInterval(check, 50);
+check();
+"""
+
+
+class DomSnapshot:
+    """Read-only view over the page data returned by SNAPSHOT_SCRIPT or parsed from static HTML"""
+    def __init__(self, data):
+        self.url = data.get('url')
+        self.title = data.get('title') or ''
+        self.lang = data.get('lang')
+        self.nodes = data.get('nodes') or []
+        self._by_tag = {}
+        # Id references only resolve inside their own frame and shadow root
+        self._by_id = {}
+        self._labels = {}
+
+        for i, node in enumerate(self.nodes):
+            node['index'] = i
+            self._by_tag.setdefault(node['tag'], []).append(node)
+            scope = self.scope(node)
+            element_id = node['attrs'].get('id')
+            if element_id:
+                self._by_id.setdefault((scope, element_id), node)
+            if node['tag'] == 'label' and node['attrs'].get('for'):
+                self._labels.setdefault((scope, node['attrs']['for']), []).append(node)
+
+    def by_tag(self, *tags):
+        """Return nodes with any of the given tags in document order"""
+        if len(tags) == 1:
+            return list(self._by_tag.get(tags[0], []))
+        found = []
+        for tag in tags:
+            found.extend(self._by_tag.get(tag, []))
+        return sorted(found, key=lambda node: node['index'])
+
+    def with_attr(self, name):
+        """Return nodes carrying the given attribute"""
+        return [node for node in self.nodes if name in node['attrs']]
+
+    def by_id(self, node, element_id):
+        """Return the node an id reference on the given node points to, or None"""
+        return self._by_id.get((self.scope(node), element_id))
+
+    def labels_for(self, node):
+        """Return the <label for=...> elements naming the node"""
+        element_id = node['attrs'].get('id')
+        return list(self._labels.get((self.scope(node), element_id), [])) if element_id else []
+
+    def parent(self, node):
+        parent = node['parent']
+        return self.nodes[parent] if parent >= 0 else None
+
+    def has_ancestor(self, node, tags):
+        """Check whether any ancestor of the node has one of the given tags"""
+        parent = self.parent(node)
+        while parent is not None:
+            if parent['tag'] in tags:
+                return True
+            parent = self.parent(parent)
+        return False
+
+    @staticmethod
+    def text(node):
+        return node.get('text') or node.get('own_text') or ''
+    
+    @staticmethod
+    def scope(node):
+        """Return the (frame, shadow root) a node lives in; the top-level document is ('', '')"""
+        return (node.get('frame', ''), node.get('shadow', ''))
+    
+    @staticmethod
+    def location(node):
+        """Return the frame and shadow host paths of a node, for tagging its issues"""
+        return {key: node[key] for key in ('frame', 'shadow') if node.get(key)}
+
+
+# Quick mode: markup-only checks run on the served HTML, without a browser
+STATIC_FETCH_CONCURRENCY = int(os.getenv('STATIC_FETCH_CONCURRENCY', '16'))
+STATIC_FETCH_TIMEOUT_SECONDS = float(os.getenv('STATIC_FETCH_TIMEOUT_SECONDS', '15'))
+STATIC_MAX_BYTES = int(os.getenv('STATIC_MAX_BYTES', str(5 * 1024 * 1024)))
+STATIC_CHUNK_BYTES = 64 * 1024
+STATIC_USER_AGENT = os.getenv('STATIC_USER_AGENT', 'Mozilla/5.0 (compatible; AccessibilityTester/1.0)')
+AUDIT_MODES = ('full', 'quick')
+
+# Elements that never have content or an end tag
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+             'param', 'source', 'track', 'wbr'}
+# Starting one of these closes an open sibling of the listed tags
+IMPLIED_END_TAGS = {
+    'li': ('li',), 'option': ('option',), 'p': ('p',), 'dt': ('dt', 'dd'), 'dd': ('dt', 'dd'),
+    'tr': ('tr', 'td', 'th'), 'td': ('td', 'th'), 'th': ('td', 'th')
+}
+# Text that a browser would not render
+UNRENDERED_TAGS = {'script', 'style', 'noscript', 'template', 'head'}
+STATIC_MAX_TEXT = 200
+STATIC_MAX_ATTR = 500
+
+
+FORM_CONTROL_TAGS = ('input', 'textarea', 'select', 'button')
+
+
+def control_type(tag, attrs):
+    """The type property a browser reports for a form control, from its markup"""
+    if tag == 'select':
+        return 'select-multiple' if 'multiple' in attrs else 'select-one'
+    if tag == 'textarea':
+        return 'textarea'
+    default = 'submit' if tag == 'button' else 'text'
+    return attrs.get('type', default).strip().lower() or default
+
+
+class StaticSnapshotParser(HTMLParser):
+    """Builds SNAPSHOT_SCRIPT-shaped nodes from HTML fed in chunks
+
+    There is no layout, so rects are empty and visibility only reflects
+    the hidden attribute and unrendered containers.
+    """
+    def __init__(self, url):
+        super().__init__(convert_charrefs=True)
+        self.url = url
+        self.base_url = url
+        self.nodes = []
+        self.open = []
+        self.title = None
+        self.lang = None
+        self._text = {}
+        self._template_depth = 0
+        self._title_parts = None
+    
+    def handle_starttag(self, tag, attrs):
+        if self._template_depth:
+            # Template content is inert until a script clones it
+            if tag == 'template':
+                self._template_depth += 1
+            return
+        implied = IMPLIED_END_TAGS.get(tag)
+        if implied and self.open and self.nodes[self.open[-1]]['tag'] in implied:
+            self.open.pop()
+        
+        attrs = {name: (value or '')[:STATIC_MAX_ATTR] for name, value in attrs}
+        parent = self.open[-1] if self.open else -1
+        parent_node = self.nodes[parent] if parent >= 0 else None
+        node = {
+            'tag': tag,
+            'parent': parent,
+            'attrs': attrs,
+            'own_text': '',
+            'visible': (tag not in UNRENDERED_TAGS and 'hidden' not in attrs
+                        and (parent_node is None or parent_node['visible'])),
+            'enabled': 'disabled' not in attrs,
+            'rect': [0, 0, 0, 0]
+        }
+        if tag in FORM_CONTROL_TAGS:
+            node['type'] = control_type(tag, attrs)
+        elif tag == 'img' and attrs.get('src'):
+            node['src'] = urljoin(self.base_url, attrs['src'])
+        elif tag in ('a', 'area') and attrs.get('href'):
+            node['href'] = urljoin(self.base_url, attrs['href'])
+        elif tag == 'base' and attrs.get('href'):
+            self.base_url = urljoin(self.url, attrs['href'])
+        elif tag == 'html' and self.lang is None:
+            self.lang = attrs.get('lang')
+        elif tag == 'title' and self.title is None:
+            self._title_parts = []
+        self.nodes.append(node)
+        
+        if tag == 'template':
+            self._template_depth = 1
+        elif tag not in VOID_TAGS:
+            self.open.append(len(self.nodes) - 1)
+    
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and not self._template_depth and self.open and self.nodes[self.open[-1]]['tag'] == tag:
+            self.open.pop()
+    
+    def handle_endtag(self, tag):
+        if self._template_depth:
+            if tag == 'template':
+                self._template_depth -= 1
+            return
+        if tag == 'title' and self._title_parts is not None:
+            self.title = ' '.join(''.join(self._title_parts).split())
+            self._title_parts = None
+        # Close the nearest matching element; stray end tags are ignored
+        for position in range(len(self.open) - 1, -1, -1):
+            if self.nodes[self.open[position]]['tag'] == tag:
+                del self.open[position:]
+                break
+    
+    def handle_data(self, data):
+        if self._template_depth or not self.open:
+            return
+        if self._title_parts is not None:
+            self._title_parts.append(data)
+        current = self.nodes[self.open[-1]]
+        if current['tag'] in ('script', 'style'):
+            return
+        if len(current['own_text']) < STATIC_MAX_TEXT:
+            current['own_text'] += data
+        if not current['visible']:
+            return
+        # Descendant text, the static stand-in for innerText
+        for index in self.open:
+            parts = self._text.setdefault(index, [0, []])
+            if parts[0] < STATIC_MAX_TEXT:
+                parts[0] += len(data)
+                parts[1].append(data)
+    
+    def snapshot(self):
+        """Finish parsing and return the DomSnapshot"""
+        self.close()
+        for index, node in enumerate(self.nodes):
+            node['own_text'] = ' '.join(node['own_text'].split())[:STATIC_MAX_TEXT]
+            if node['own_text'] or node['tag'] in SNAPSHOT_TEXT_TAGS:
+                parts = self._text.get(index)
+                node['text'] = ' '.join(''.join(parts[1]).split())[:STATIC_MAX_TEXT] if parts else ''
+        return DomSnapshot({'url': self.url, 'title': self.title or '', 'lang': self.lang, 'nodes': self.nodes})
+
+
+# Keep-alive connections shared by quick-mode fetches and cache validation
+http_session = requests.Session()
+http_session.headers['User-Agent'] = STATIC_USER_AGENT
+http_adapter = HTTPAdapter(pool_connections=STATIC_FETCH_CONCURRENCY, pool_maxsize=STATIC_FETCH_CONCURRENCY)
+http_session.mount('http://', http_adapter)
+http_session.mount('https://', http_adapter)
+static_fetch_slots = threading.BoundedSemaphore(STATIC_FETCH_CONCURRENCY)
+
+
+def fetch_static_snapshot(url, timeout=STATIC_FETCH_TIMEOUT_SECONDS):
+    """Fetch a page's HTML and parse it while it streams in; returns (snapshot, sha256 of the body)"""
+    with static_fetch_slots:
+        with http_session.get(url, timeout=timeout, stream=True) as response:
+            response.raise_for_status()
+            content_type = response.headers.get('Content-Type', '')
+            if content_type and 'html' not in content_type and 'xml' not in content_type:
+                raise ValueError(f'Expected an HTML page, got {content_type}')
+            # requests assumes ISO-8859-1 when no charset is declared; pages are overwhelmingly UTF-8
+            encoding = response.encoding if 'charset' in content_type.lower() else 'utf-8'
+            try:
+                decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+            except LookupError:
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            
+            parser = StaticSnapshotParser(response.url)
+            digest = hashlib.sha256()
+            received = 0
+            for chunk in response.iter_content(STATIC_CHUNK_BYTES):
+                digest.update(chunk)
+                parser.feed(decoder.decode(chunk))
+                received += len(chunk)
+                if received >= STATIC_MAX_BYTES:
+                    break
+            parser.feed(decoder.decode(b'', final=True))
+    return parser.snapshot(), digest.hexdigest()
+
+# Accessibility tree roles the checks care about
+AX_FORM_CONTROL_ROLES = {'textbox', 'searchbox', 'combobox', 'listbox', 'checkbox', 'radio',
+                         'slider', 'spinbutton', 'switch'}
+AX_GENERIC_ROLES = {'generic', 'GenericContainer'}
+# Landmark role -> the HTML element reported for it
+AX_LANDMARK_TAGS = OrderedDict([('main', 'main'), ('navigation', 'nav'), ('banner', 'header'),
+                                ('contentinfo', 'footer'), ('complementary', 'aside'), ('region', 'section')])
+# Name sources that count as a label; placeholder and title names vanish or hide once the user starts typing
+AX_LABEL_NAME_SOURCES = {'aria-label', 'aria-labelledby', 'label', 'labelfor', 'labelwrapped'}
+
+
+def ax_name_source(name):
+    """Attribute or native source the computed name came from, None when the browser did not report sources"""
+    for source in name.get('sources') or []:
+        # Sources are listed by precedence; the first with a value wins and the rest are marked superseded
+        if source.get('superseded') or not str((source.get('value') or {}).get('value') or '').strip():
+            continue
+        return source.get('attribute') or source.get('nativeSource') or source.get('type')
+    return None
+
+
+def describe_host(tag, element_id, position):
+    """Path segment for a shadow host or frame owner, as DOM_TRAVERSAL_SCRIPT writes it"""
+    return f'{tag}#{element_id}' if element_id else f'{tag}:nth-of-type({position})'
+
+
+def join_path(path, part):
+    return f'{path} > {part}' if path else part
+
+
+class AXTree:
+    """The browser's computed accessibility tree for every frame, joined to the elements behind it
+
+    Built from one DOMSnapshot.captureSnapshot call (tags, attributes and
+    boxes of every element in every frame) and one Accessibility.getFullAXTree
+    call per frame, so the checks can read it without touching the driver.
+    """
+    def __init__(self, nodes, elements):
+        self.nodes = nodes
+        self.elements = elements
+        self._by_id = {node['id']: node for node in nodes}
+        self._order = None
+        self._ids = {}
+        for element in elements.values():
+            element_id = element['attrs'].get('id')
+            if element_id:
+                self._ids.setdefault((DomSnapshot.scope(element), element_id), element)
+    
+    @classmethod
+    def fetch(cls, driver):
+        """Fetch the tree in bulk, or return None if the browser has no documents to report"""
+        capture = driver.execute_cdp_cmd('DOMSnapshot.captureSnapshot', {'computedStyles': []}) or {}
+        strings = capture.get('strings') or []
+        documents = capture.get('documents') or []
+        if not documents:
+            return None
+        
+        # Which iframe element owns each child document
+        owners = {}
+        for index, document in enumerate(documents):
+            content = document['nodes'].get('contentDocumentIndex') or {}
+            for node_index, child in zip(content.get('index', []), content.get('value', [])):
+                owners[child] = (index, node_index)
+        
+        tables = [cls._element_table(document, strings) for document in documents]
+        placement = {}
+        
+        def place(index):
+            # Frame path and page offset of a document, from its owner's
+            if index not in placement:
+                if index in owners:
+                    parent, node_index = owners[index]
+                    frame, offset = place(parent)
+                    owner = tables[parent][1].get(node_index)
+                    if owner:
+                        frame = join_path(frame, owner['host'])
+                        offset = (offset[0] + owner['box'][0], offset[1] + owner['box'][1])
+                    placement[index] = (frame, offset)
+                else:
+                    placement[index] = ('', (0, 0))
+            return placement[index]
+        
+        for index in range(len(documents)):
+            place(index)
+        
+        elements = {}
+        nodes = []
+        for index, document in enumerate(documents):
+            frame, (offset_x, offset_y) = placement[index]
+            for backend_id, element in tables[index][0].items():
+                x, y, width, height = element.pop('box')
+                element.pop('host')
+                element['rect'] = [round(x + offset_x), round(y + offset_y), round(width), round(height)]
+                if frame:
+                    element['frame'] = frame
+                elements[backend_id] = element
+            
+            frame_id = strings[document['frameId']] if document.get('frameId', -1) >= 0 else None
+            try:
+                tree = driver.execute_cdp_cmd('Accessibility.getFullAXTree', {'frameId': frame_id} if frame_id else {})
+            except Exception:
+                if index == 0:
+                    raise
+                # Frames in another renderer process have to be skipped
+                continue
+            nodes.extend(cls._ax_nodes(tree.get('nodes') or [], index, frame))
+        
+        return cls(nodes, elements)
+    
+    @staticmethod
+    def _element_table(document, strings):
+        """Elements of one captured document keyed by backend node id, and by node index for frame owners"""
+        tree = document['nodes']
+        parents = tree.get('parentIndex', [])
+        names = tree.get('nodeName', [])
+        types = tree.get('nodeType', [])
+        backend_ids = tree.get('backendNodeId', [])
+        attributes = tree.get('attributes', [])
+        shadow_roots = set((tree.get('shadowRootType') or {}).get('index', []))
+        boxes = dict(zip(document.get('layout', {}).get('nodeIndex', []), document.get('layout', {}).get('bounds', [])))
+        
+        by_backend = {}
+        by_index = {}
+        shadow = {}
+        positions = {}
+        for index, parent in enumerate(parents):
+            # Nodes come in tree order, so a parent's shadow path is already known
+            if index in shadow_roots and parent in by_index:
+                shadow[index] = join_path(shadow.get(parent, ''), by_index[parent]['host'])
+            else:
+                shadow[index] = shadow.get(parent, '')
+            if types[index] != 1:
+                continue
+            tag = strings[names[index]].lower()
+            values = attributes[index] if index < len(attributes) else []
+            attrs = {strings[values[i]]: strings[values[i + 1]] for i in range(0, len(values) - 1, 2)}
+            positions[(parent, tag)] = positions.get((parent, tag), 0) + 1
+            element = {
+                'tag': tag,
+                'attrs': attrs,
+                'box': boxes.get(index, [0, 0, 0, 0]),
+                'host': describe_host(tag, attrs.get('id'), positions[(parent, tag)])
+            }
+            if tag in FORM_CONTROL_TAGS:
+                element['type'] = control_type(tag, attrs)
+            if shadow[index]:
+                element['shadow'] = shadow[index]
+            by_backend[backend_ids[index]] = element
+            by_index[index] = element
+        return by_backend, by_index
+    
+    @staticmethod
+    def _ax_nodes(raw_nodes, document, frame):
+        """Flatten the CDP AXNode format; ids are made unique across frames"""
+        nodes = []
+        for raw in raw_nodes:
+            node = {
+                'id': f"{document}:{raw['nodeId']}",
+                'parent': f"{document}:{raw['parentId']}" if raw.get('parentId') else None,
+                'children': [f'{document}:{child}' for child in raw.get('childIds', [])],
+                'role': (raw.get('role') or {}).get('value') or '',
+                'name': str((raw.get('name') or {}).get('value') or '').strip(),
+                'name_source': ax_name_source(raw.get('name') or {}),
+                'ignored': bool(raw.get('ignored')),
+                'properties': {prop['name']: (prop.get('value') or {}).get('value') for prop in raw.get('properties', [])},
+                'backend_id': raw.get('backendDOMNodeId')
+            }
+            if frame:
+                node['frame'] = frame
+            nodes.append(node)
+        return nodes
+    
+    def walk(self):
+        """Return the nodes that are not ignored, in tree order, main frame first"""
+        if self._order is None:
+            order = []
+            stack = list(reversed([node for node in self.nodes if node['parent'] is None]))
+            while stack:
+                node = stack.pop()
+                if not node['ignored']:
+                    order.append(node)
+                stack.extend(self._by_id[child] for child in reversed(node['children']) if child in self._by_id)
+            self._order = order
+        return self._order
+    
+    def by_role(self, *roles):
+        return [node for node in self.walk() if node['role'] in roles]
+    
+    def descendants(self, node):
+        stack = [self._by_id[child] for child in node['children'] if child in self._by_id]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(self._by_id[child] for child in current['children'] if child in self._by_id)
+    
+    def element(self, node):
+        """The element behind an accessibility node; nodes without one get a placeholder"""
+        element = self.elements.get(node['backend_id'])
+        if element is None:
+            element = {'tag': node['role'], 'attrs': {}, 'rect': [0, 0, 0, 0]}
+            if node.get('frame'):
+                element['frame'] = node['frame']
+        return element
+    
+    def by_id(self, element, element_id):
+        """Return the element an id reference on the given element points to, or None"""
+        return self._ids.get((DomSnapshot.scope(element), element_id))
+
+# sRGB channel value (0-255) -> linear light, precomputed once
+SRGB_TO_LINEAR = np.array([
+    c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
+    for c in (i / 255.0 for i in range(256))
+])
+LUMINANCE_WEIGHTS = np.array([0.2126, 0.7152, 0.0722])
+CANVAS_COLOR = (255.0, 255.0, 255.0, 1.0)
+COLOR_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?%?', re.IGNORECASE)
+
+
+# Modern computed colors (oklch(), lab(), color(display-p3 ...)) are converted through CIE XYZ (D65)
+XYZ_TO_LINEAR_SRGB = np.array([
+    [3.2409699419045226, -1.537383177570094, -0.4986107602930034],
+    [-0.9692436362808796, 1.8759675015077202, 0.04155505740717559],
+    [0.05563007969699366, -0.20397695888897652, 1.0569715142428786]
+])
+D50_TO_D65 = np.array([
+    [0.9554734527042182, -0.023098536874261423, 0.0632593086610217],
+    [-0.028369706963208136, 1.0099954580058226, 0.021041398966943008],
+    [0.012314001688319899, -0.020507696433477912, 1.3303659366080753]
+])
+D50_WHITE = np.array([0.3457 / 0.3585, 1.0, (1.0 - 0.3457 - 0.3585) / 0.3585])
+OKLAB_TO_LMS = np.array([
+    [1.0, 0.3963377774, 0.2158037573],
+    [1.0, -0.1055613458, -0.0638541728],
+    [1.0, -0.0894841775, -1.2914855480]
+])
+LMS_TO_LINEAR_SRGB = np.array([
+    [4.0767416621, -3.3077115913, 0.2309699292],
+    [-1.2684380046, 2.6097574011, -0.3413193965],
+    [-0.0041960863, -0.7034186147, 1.7076147010]
+])
+
+
+def srgb_transfer_to_linear(channels):
+    channels = np.asarray(channels, dtype=float)
+    magnitude = np.abs(channels)
+    linear = np.where(magnitude <= 0.04045, magnitude / 12.92, ((magnitude + 0.055) / 1.055) ** 2.4)
+    return np.sign(channels) * linear
+
+
+def rec2020_to_linear(channels):
+    channels = np.asarray(channels, dtype=float)
+    alpha, beta = 1.09929682680944, 0.018053968510807
+    magnitude = np.abs(channels)
+    linear = np.where(magnitude < beta * 4.5, magnitude / 4.5, ((magnitude + alpha - 1) / alpha) ** (1 / 0.45))
+    return np.sign(channels) * linear
+
+
+# color() spaces: (transfer to linear light, linear light -> XYZ D65)
+COLOR_SPACES = {
+    'srgb-linear': (lambda channels: np.asarray(channels, dtype=float), np.linalg.inv(XYZ_TO_LINEAR_SRGB)),
+    'display-p3': (srgb_transfer_to_linear, np.array([
+        [0.4865709486482162, 0.26566769316909306, 0.1982172852343625],
+        [0.2289745640697488, 0.6917385218365064, 0.079286914093745],
+        [0.0, 0.04511338185890264, 1.043944368900976]
+    ])),
+    'a98-rgb': (lambda channels: np.sign(channels) * np.abs(np.asarray(channels, dtype=float)) ** (563 / 256), np.array([
+        [0.5766690429101305, 0.1855582379065463, 0.1882286462349947],
+        [0.29734497525053605, 0.6273635662554661, 0.07529145849399788],
+        [0.02703136138641234, 0.07068885253582723, 0.9913375368376388]
+    ])),
+    'rec2020': (rec2020_to_linear, np.array([
+        [0.6369580483012914, 0.14461690358620832, 0.1688809751641721],
+        [0.2627002120112671, 0.6779980715188708, 0.05930171646986196],
+        [0.0, 0.028072693049087428, 1.060985057710791]
+    ])),
+    'xyz': (lambda channels: np.asarray(channels, dtype=float), np.identity(3)),
+    'xyz-d65': (lambda channels: np.asarray(channels, dtype=float), np.identity(3)),
+    'xyz-d50': (lambda channels: np.asarray(channels, dtype=float), D50_TO_D65),
+}
+ANGLE_UNITS = {'deg': 1.0, 'grad': 0.9, 'rad': 180.0 / math.pi, 'turn': 360.0}
+
+
+def color_component(token, percent_scale=1.0):
+    """A color function argument as a number: percentages scale, 'none' is zero, angles are degrees"""
+    if token == 'none':
+        return 0.0
+    if token.endswith('%'):
+        return float(token[:-1]) / 100.0 * percent_scale
+    for unit, degrees in ANGLE_UNITS.items():
+        if token.endswith(unit):
+            return float(token[:-len(unit)]) * degrees
+    return float(token)
+
+
+def linear_srgb_to_rgb(linear):
+    """Linear-light sRGB -> 0-255 channels, clipped to the sRGB gamut"""
+    linear = np.clip(linear, 0.0, 1.0)
+    encoded = np.where(linear <= 0.0031308, linear * 12.92, 1.055 * linear ** (1 / 2.4) - 0.055)
+    return [float(channel) for channel in np.clip(encoded * 255.0, 0.0, 255.0)]
+
+
+def lab_to_xyz_d65(lightness, a, b):
+    """CIE Lab (D50, as CSS defines it) -> XYZ D65"""
+    kappa, epsilon = 24389 / 27, 216 / 24389
+    fy = (lightness + 16) / 116
+    fx = fy + a / 500
+    fz = fy - b / 200
+    x = fx ** 3 if fx ** 3 > epsilon else (116 * fx - 16) / kappa
+    y = fy ** 3 if lightness > kappa * epsilon else lightness / kappa
+    z = fz ** 3 if fz ** 3 > epsilon else (116 * fz - 16) / kappa
+    return D50_TO_D65 @ (np.array([x, y, z]) * D50_WHITE)
+
+
+def convert_css_color(value):
+    """Convert oklab(), oklch(), lab(), lch() and color(<space> ...) to (r, g, b, alpha), or None"""
+    name, _, arguments = value.partition('(')
+    channels, _, alpha = arguments.rstrip(')').partition('/')
+    tokens = channels.replace(',', ' ').split()
+    alpha = min(max(color_component(alpha.strip()), 0.0), 1.0) if alpha.strip() else 1.0
+    
+    if name == 'color':
+        if not tokens or tokens[0] not in COLOR_SPACES or len(tokens) != 4:
+            return None
+        to_linear, to_xyz = COLOR_SPACES[tokens[0]]
+        xyz = to_xyz @ to_linear([color_component(token) for token in tokens[1:]])
+        linear = XYZ_TO_LINEAR_SRGB @ xyz
+    elif len(tokens) != 3:
+        return None
+    elif name in ('oklab', 'oklch'):
+        lightness = color_component(tokens[0])
+        if name == 'oklab':
+            a, b = color_component(tokens[1], 0.4), color_component(tokens[2], 0.4)
+        else:
+            chroma, hue = color_component(tokens[1], 0.4), math.radians(color_component(tokens[2]))
+            a, b = chroma * math.cos(hue), chroma * math.sin(hue)
+        linear = LMS_TO_LINEAR_SRGB @ ((OKLAB_TO_LMS @ np.array([lightness, a, b])) ** 3)
+    elif name in ('lab', 'lch'):
+        lightness = color_component(tokens[0], 100.0)
+        if name == 'lab':
+            a, b = color_component(tokens[1], 125.0), color_component(tokens[2], 125.0)
+        else:
+            chroma, hue = color_component(tokens[1], 150.0), math.radians(color_component(tokens[2]))
+            a, b = chroma * math.cos(hue), chroma * math.sin(hue)
+        linear = XYZ_TO_LINEAR_SRGB @ lab_to_xyz_d65(lightness, a, b)
+    else:
+        return None
+    
+    red, green, blue = linear_srgb_to_rgb(linear)
+    return (red, green, blue, alpha)
+
+
+@lru_cache(maxsize=4096)
+def parse_css_color(value):
+    """Parse a computed CSS color into (r, g, b, alpha) with channels in 0-255, or None"""
+    value = (value or '').strip().lower()
+    if value == 'transparent':
+        return (0.0, 0.0, 0.0, 0.0)
+    
+    if value.startswith('#'):
+        digits = value[1:]
+        if len(digits) in (3, 4):
+            digits = ''.join(c * 2 for c in digits)
+        if len(digits) not in (6, 8):
+            return None
+        try:
+            channels = [int(digits[i:i + 2], 16) for i in range(0, len(digits), 2)]
+        except ValueError:
+            return None
+        alpha = channels[3] / 255.0 if len(channels) == 4 else 1.0
+        return (float(channels[0]), float(channels[1]), float(channels[2]), alpha)
+    
+    def number(token, scale):
+        if token.endswith('%'):
+            return float(token[:-1]) / 100.0 * scale
+        return float(token)
+    
+    if value.startswith(('rgb(', 'rgba(', 'color(srgb ')):
+        # color(srgb r g b / a) uses 0-1 channels, rgb()/rgba() use 0-255
+        scale = 1.0 if value.startswith('color(') else 255.0
+        tokens = COLOR_NUMBER.findall(value)
+        if len(tokens) < 3:
+            return None
+        try:
+            rgb = [min(max(number(token, scale) * 255.0 / scale, 0.0), 255.0) for token in tokens[:3]]
+            alpha = number(tokens[3], 1.0) if len(tokens) > 3 else 1.0
+        except ValueError:
+            return None
+        return (rgb[0], rgb[1], rgb[2], min(max(alpha, 0.0), 1.0))
+    
+    if value.startswith(('oklab(', 'oklch(', 'lab(', 'lch(', 'color(')):
+        try:
+            return convert_css_color(value)
+        except (ValueError, OverflowError):
+            return None
+    
+    return None
+
+
+def composite(top, bottom):
+    """Alpha-composite RGBA colors over opaque RGB colors (arrays of shape (n, 4) and (n, 3))"""
+    alpha = top[:, 3:4]
+    return top[:, :3] * alpha + bottom * (1.0 - alpha)
+
+
+def relative_luminance(rgb):
+    """Relative luminance of an (n, 3) array of 0-255 colors via the lookup table"""
+    indices = np.clip(np.rint(rgb), 0, 255).astype(np.intp)
+    return SRGB_TO_LINEAR[indices] @ LUMINANCE_WEIGHTS
+
+
+def contrast_ratios(foreground, background):
+    """WCAG contrast ratio for arrays of opaque foreground/background colors"""
+    l1 = relative_luminance(foreground)
+    l2 = relative_luminance(background)
+    return (np.maximum(l1, l2) + 0.05) / (np.minimum(l1, l2) + 0.05)
+
+
+def effective_backgrounds(snapshot):
+    """Composite each node's background over its ancestors' down to the canvas"""
+    count = len(snapshot.nodes)
+    backgrounds = np.array([parse_css_color(node['background']) or (0.0, 0.0, 0.0, 0.0)
+                            for node in snapshot.nodes]).reshape(count, 4)
+    parent_list = [node['parent'] for node in snapshot.nodes]
+    
+    # Parents precede children, so depths fill in a single pass
+    depth_list = [0] * count
+    for i, parent in enumerate(parent_list):
+        if parent >= 0:
+            depth_list[i] = depth_list[parent] + 1
+    parents = np.array(parent_list, dtype=np.intp)
+    depths = np.array(depth_list, dtype=np.intp)
+    
+    effective = np.zeros((count, 3))
+    canvas = np.array(CANVAS_COLOR[:3])
+    for depth in range(int(depths.max()) + 1 if count else 0):
+        level = np.nonzero(depths == depth)[0]
+        below = np.tile(canvas, (len(level), 1)) if depth == 0 else effective[parents[level]]
+        effective[level] = composite(backgrounds[level], below)
+    return effective
+
+
+def unresolved_backgrounds(snapshot):
+    """Per node, the index of the node whose unparseable background shows through behind it, or -1"""
+    unresolved = [-1] * len(snapshot.nodes)
+    for i, node in enumerate(snapshot.nodes):
+        value = node.get('background')
+        color = parse_css_color(value) if value else (0.0, 0.0, 0.0, 0.0)
+        if color is None:
+            unresolved[i] = i
+        elif color[3] < 1.0 and node['parent'] >= 0:
+            # A translucent or transparent layer shows its parent's backdrop
+            unresolved[i] = unresolved[node['parent']]
+    return unresolved
+
+
+CONTRAST_MODES = ('computed', 'pixels', 'both')
+SRGB_TO_LINEAR_32 = SRGB_TO_LINEAR.astype(np.float32)
+LUMINANCE_WEIGHTS_32 = LUMINANCE_WEIGHTS.astype(np.float32)
+
+
+# Rendered-pixel sampling: a fixed grid inside each text box and a ring just outside it
+PIXEL_SAMPLE_ROWS = 24
+PIXEL_SAMPLE_COLUMNS = 96
+PIXEL_RING_PADDING = 3
+PIXEL_BATCH_SIZE = 512
+# Below this luminance ratio inside the box no text is visible (e.g. a fill covering it)
+PIXEL_MIN_SEPARATION = 1.1
+
+
+def sample_offsets(start, stop, count):
+    """count integer positions spread over [start, stop) for each row of the start/stop arrays"""
+    steps = (np.arange(count, dtype=np.float32) + 0.5) / count
+    positions = start[:, None] + (stop - start)[:, None] * steps
+    return np.minimum(positions.astype(np.intp), (stop - 1)[:, None])
+
+
+def pixel_contrast_ratios(pixels, boxes):
+    """Estimate text contrast from rendered pixels for each (x, y, w, h) box
+
+    pixels is the decoded screenshot as an (height, width, 3) uint8 array.
+    Every box is sampled on the same grid, so all boxes are measured in
+    batched array operations. The background is the median luminance of
+    a ring just outside the box, and the foreground is the extreme
+    luminance inside it furthest from that, which tolerates anti-aliasing,
+    gradients and images behind the text. Returns NaN for boxes outside
+    the screenshot and for boxes with no visible text, so the caller falls
+    back to the computed-style ratio.
+    """
+    height, width = pixels.shape[:2]
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    ratios = np.full(len(boxes), np.nan)
+    
+    x0 = np.clip(np.floor(boxes[:, 0]), 0, width).astype(np.intp)
+    y0 = np.clip(np.floor(boxes[:, 1]), 0, height).astype(np.intp)
+    x1 = np.clip(np.ceil(boxes[:, 0] + boxes[:, 2]), 0, width).astype(np.intp)
+    y1 = np.clip(np.ceil(boxes[:, 1] + boxes[:, 3]), 0, height).astype(np.intp)
+    measurable = np.nonzero((x1 - x0 >= 2) & (y1 - y0 >= 2))[0]
+    
+    for start in range(0, len(measurable), PIXEL_BATCH_SIZE):
+        batch = measurable[start:start + PIXEL_BATCH_SIZE]
+        bx0, by0, bx1, by1 = x0[batch], y0[batch], x1[batch], y1[batch]
+        
+        # Inside the box: (boxes, rows, columns)
+        rows = sample_offsets(by0, by1, PIXEL_SAMPLE_ROWS)
+        columns = sample_offsets(bx0, bx1, PIXEL_SAMPLE_COLUMNS)
+        inside = SRGB_TO_LINEAR_32[pixels[rows[:, :, None], columns[:, None, :]]] @ LUMINANCE_WEIGHTS_32
+        
+        # Just outside the box, clamped to the screenshot: (boxes, ring samples)
+        left = np.maximum(bx0 - PIXEL_RING_PADDING, 0)
+        right = np.minimum(bx1 - 1 + PIXEL_RING_PADDING, width - 1)
+        top = np.maximum(by0 - PIXEL_RING_PADDING, 0)
+        bottom = np.minimum(by1 - 1 + PIXEL_RING_PADDING, height - 1)
+        ring_columns = sample_offsets(left, right + 1, PIXEL_SAMPLE_COLUMNS)
+        ring_rows = sample_offsets(top, bottom + 1, PIXEL_SAMPLE_ROWS)
+        ring = np.concatenate((
+            pixels[top[:, None], ring_columns], pixels[bottom[:, None], ring_columns],
+            pixels[ring_rows, left[:, None]], pixels[ring_rows, right[:, None]]
+        ), axis=1)
+        background = np.median(SRGB_TO_LINEAR_32[ring] @ LUMINANCE_WEIGHTS_32, axis=1)
+        
+        darkest, lightest = np.percentile(inside.reshape(len(batch), -1), [1, 99], axis=1)
+        foreground = np.where(background - darkest >= lightest - background, darkest, lightest)
+        batch_ratios = (np.maximum(foreground, background) + 0.05) / (np.minimum(foreground, background) + 0.05)
+        visible = (lightest + 0.05) / (darkest + 0.05) >= PIXEL_MIN_SEPARATION
+        ratios[batch] = np.where(visible, batch_ratios, np.nan)
+    
+    return ratios
+
+
+def format_rgb(rgb):
+    """Format integer channels the way getComputedStyle does"""
+    return 'rgb({}, {}, {})'.format(*rgb)
+
+
+class Metrics:
+    """Thread-safe counters and histograms rendered in the Prometheus text format"""
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._meta = OrderedDict()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+    
+    def counter(self, name, help_text):
+        self._meta[name] = ('counter', help_text, None)
+    
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self._meta[name] = ('histogram', help_text, tuple(buckets))
+    
+    def gauge(self, name, help_text, callback):
+        """Register a gauge whose value is read from callback() at scrape time"""
+        self._meta[name] = ('gauge', help_text, None)
+        self._gauges[name] = callback
+    
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def observe(self, name, value, **labels):
+        buckets = self._meta[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._histograms.setdefault(key, {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+    
+    def render(self):
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+            return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+        
+        lines = []
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: dict(value, buckets=list(value['buckets'])) for key, value in self._histograms.items()}
+        
+        for name, (kind, help_text, buckets) in self._meta.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (series, labels), value in sorted(counters.items()):
+                    if series == name:
+                        lines.append(f'{name}{label_text(labels)} {value}')
+            elif kind == 'histogram':
+                for (series, labels), data in sorted(histograms.items()):
+                    if series != name:
+                        continue
+                    for bound, count in zip(buckets, data['buckets']):
+                        lines.append(f'{name}_bucket{label_text(labels, [("le", bound)])} {count}')
+                    lines.append(f'{name}_bucket{label_text(labels, [("le", "+Inf")])} {data["count"]}')
+                    lines.append(f'{name}_sum{label_text(labels)} {data["sum"]}')
+                    lines.append(f'{name}_count{label_text(labels)} {data["count"]}')
+            else:
+                try:
+                    values = self._gauges[name]()
+                except Exception:
+                    continue
+                for labels, value in values:
+                    lines.append(f'{name}{label_text(sorted(labels.items()))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+metrics.counter('accessibility_tests_total', 'Accessibility tests run, by outcome')
+metrics.histogram('accessibility_phase_seconds', 'Time spent in each phase of a test')
+metrics.histogram('accessibility_check_seconds', 'Time spent in each check')
+metrics.counter('accessibility_webdriver_commands_total', 'WebDriver round-trips, by phase or check')
+metrics.counter('accessibility_elements_inspected_total', 'Elements inspected, by check')
+metrics.histogram('accessibility_openai_request_seconds', 'Latency of OpenAI summary requests')
+metrics.counter('accessibility_openai_requests_total', 'OpenAI summary requests, by outcome')
+metrics.counter('accessibility_openai_tokens_total', 'OpenAI tokens used, by kind')
+metrics.histogram('accessibility_openai_first_token_seconds', 'Time until the first streamed summary token')
+
+
+@lru_cache(maxsize=None)
+def instrumented_chrome_class():
+    """Chrome driver class that counts its WebDriver round-trips, defined on first use"""
+    from selenium import webdriver
+    
+    class InstrumentedChrome(webdriver.Chrome):
+        command_count = 0
+        network_profile = None
+        cache_lock = None
+        
+        def execute(self, driver_command, params=None):
+            self.command_count += 1
+            return super().execute(driver_command, params)
+        
+        def quit(self):
+            try:
+                super().quit()
+            finally:
+                # Free the browser cache slot for the next driver
+                if self.cache_lock:
+                    self.cache_lock.close()
+                    self.cache_lock = None
+    
+    return InstrumentedChrome
+
+
+# Chrome and the WebP encoder both stop at 16383px in either direction
+SCREENSHOT_MAX_HEIGHT = int(os.getenv('SCREENSHOT_MAX_HEIGHT', '16383'))
+SCREENSHOT_MAX_WIDTH = int(os.getenv('SCREENSHOT_MAX_WIDTH', '16383'))
+
+# Screenshot storage settings
+SCREENSHOT_DIR = os.getenv('SCREENSHOT_DIR', '/tmp/accessibility-screenshots')
+SCREENSHOT_FORMAT = os.getenv('SCREENSHOT_FORMAT', 'webp').lower()
+SCREENSHOT_QUALITY = int(os.getenv('SCREENSHOT_QUALITY', '80'))
+SCREENSHOT_TTL_SECONDS = int(os.getenv('SCREENSHOT_TTL_SECONDS', str(7 * 86400)))
+SCREENSHOT_MAX_MB = int(os.getenv('SCREENSHOT_MAX_MB', '1024'))
+SCREENSHOT_PRUNE_INTERVAL = 300
+# Signs crop URLs; a key is generated and kept in SCREENSHOT_DIR when unset
+SCREENSHOT_URL_SECRET = os.getenv('SCREENSHOT_URL_SECRET', '')
+THUMBNAIL_WIDTH = int(os.getenv('THUMBNAIL_WIDTH', '320'))
+THUMBNAIL_MIN_WIDTH = 16
+THUMBNAIL_MAX_WIDTH = 1920
+# Only these widths are kept on disk; any other is rendered per request
+THUMBNAIL_CACHED_WIDTHS = {THUMBNAIL_WIDTH, 800}
+CROP_PADDING = 8
+
+IMAGE_FORMATS = {
+    'webp': ('WEBP', 'webp', 'image/webp'),
+    'jpeg': ('JPEG', 'jpg', 'image/jpeg'),
+}
+
+
+class ScreenshotStore:
+    """Content-addressed on-disk store of compressed screenshots, pruned by age and total size"""
+    def __init__(self, directory=SCREENSHOT_DIR, image_format=SCREENSHOT_FORMAT, quality=SCREENSHOT_QUALITY,
+                 ttl=SCREENSHOT_TTL_SECONDS, max_bytes=SCREENSHOT_MAX_MB * 1024 * 1024, secret=SCREENSHOT_URL_SECRET):
+        if image_format not in IMAGE_FORMATS:
+            image_format = 'webp'
+        self.directory = directory
+        self.pil_format, self.extension, self.mimetype = IMAGE_FORMATS[image_format]
+        self.quality = quality
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._pruned = None
+        os.makedirs(directory, exist_ok=True)
+        self._secret = (secret or self._load_secret()).encode('utf-8')
+    
+    def _load_secret(self):
+        """The crop-signing key kept next to the screenshots, so signed URLs survive restarts"""
+        path = os.path.join(self.directory, '.url-key')
+        try:
+            with open(path) as handle:
+                return handle.read().strip()
+        except OSError:
+            secret = os.urandom(32).hex()
+            with open(path, 'w') as handle:
+                handle.write(secret)
+            return secret
+    
+    def save(self, png_bytes, name='screenshot'):
+        """Store a PNG screenshot and return a reference to it for the results"""
+        from PIL import Image
+        image_id = hashlib.sha256(png_bytes).hexdigest()
+        
+        with Image.open(io.BytesIO(png_bytes)) as image:
+            width, height = image.size
+            path = self.path(image_id)
+            try:
+                # A repeat screenshot refreshes the stored file so pruning does not drop it from under new results
+                os.utime(path)
+            except FileNotFoundError:
+                self._write(path, image)
+        
+        with self._lock:
+            due = self._pruned is None or time.monotonic() - self._pruned >= SCREENSHOT_PRUNE_INTERVAL
+            if due:
+                self._pruned = time.monotonic()
+        if due:
+            threading.Thread(target=self.prune, name='screenshot-prune', daemon=True).start()
+        
+        return {
+            'name': name,
+            'id': image_id,
+            'url': f'/screenshots/{image_id}',
+            'thumbnail_url': f'/screenshots/{image_id}/thumbnail',
+            'width': width,
+            'height': height,
+            'format': self.extension,
+            'timestamp': datetime.now().isoformat()
+        }
+    
+    def path(self, image_id, variant=''):
+        if not re.fullmatch(r'[0-9a-f]{64}', image_id or ''):
+            raise ValueError('Invalid screenshot id')
+        return os.path.join(self.directory, image_id[:2], f'{image_id}{variant}.{self.extension}')
+    
+    def sign(self, image_id, x, y, w, h):
+        """Signature of a crop, so only regions the checks reported can be rendered"""
+        message = f'{image_id}:{x}:{y}:{w}:{h}'.encode('utf-8')
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()[:32]
+    
+    def verify(self, image_id, x, y, w, h, signature):
+        return hmac.compare_digest(self.sign(image_id, x, y, w, h), signature or '')
+    
+    def thumbnail(self, image_id, width=THUMBNAIL_WIDTH):
+        """A downscaled copy: a cached path for the standard widths, image bytes for any other"""
+        def render(image):
+            image.thumbnail((width, width * 20))
+            return image
+        return self._derived(image_id, f'.thumb-{width}', render, cache=width in THUMBNAIL_CACHED_WIDTHS)
+    
+    def crop(self, image_id, x, y, w, h, padding=CROP_PADDING):
+        """Path of a region of the screenshot, generated on first request"""
+        def render(image):
+            box = (max(x - padding, 0), max(y - padding, 0),
+                   min(x + w + padding, image.width), min(y + h + padding, image.height))
+            if box[2] <= box[0] or box[3] <= box[1]:
+                raise ValueError('Crop is outside the screenshot')
+            return image.crop(box)
+        return self._derived(image_id, f'.crop-{x}-{y}-{w}-{h}', render)
+    
+    def prune(self):
+        """Delete files older than the TTL, then the oldest ones until the store fits its size cap"""
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.startswith('.'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        
+        cutoff = time.time() - self.ttl if self.ttl else None
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in sorted(files):
+            if (cutoff is None or mtime >= cutoff) and (not self.max_bytes or total <= self.max_bytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+    
+    def _derived(self, image_id, variant, render, cache=True):
+        path = self.path(image_id, variant)
+        if cache and os.path.exists(path):
+            return path
+        source = self.path(image_id)
+        if not os.path.exists(source):
+            raise FileNotFoundError(image_id)
+        from PIL import Image
+        with Image.open(source) as image:
+            image.load()
+            if not cache:
+                buffer = io.BytesIO()
+                render(image).convert('RGB').save(buffer, self.pil_format, quality=self.quality)
+                buffer.seek(0)
+                return buffer
+            self._write(path, render(image))
+        return path
+    
+    def _write(self, path, image):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        image.convert('RGB').save(tmp_path, self.pil_format, quality=self.quality)
+        os.replace(tmp_path, path)
+
+
+def crop_url(screenshot, rect):
+    """Signed URL of the screenshot region showing an element"""
+    x, y, w, h = (int(value) for value in rect)
+    signature = screenshot_store.sign(screenshot['id'], x, y, w, h)
+    return f"/screenshots/{screenshot['id']}/crop?x={x}&y={y}&w={w}&h={h}&sig={signature}"
+
+
+screenshot_store = ScreenshotStore()
+
+# WebDriver pool settings
+DRIVER_POOL_SIZE = int(os.getenv('DRIVER_POOL_SIZE', '2'))
+DRIVER_MAX_USES = int(os.getenv('DRIVER_MAX_USES', '50'))
+DRIVER_MAX_MEMORY_MB = int(os.getenv('DRIVER_MAX_MEMORY_MB', '1024'))
+DRIVER_CHECKOUT_TIMEOUT = float(os.getenv('DRIVER_CHECKOUT_TIMEOUT', '120'))
+DRIVER_POOL_PREWARM = os.getenv('DRIVER_POOL_PREWARM', 'true').lower() == 'true'
+# 'eager' returns from driver.get at DOMContentLoaded, 'none' as soon as navigation starts;
+# the readiness wait in run_full_test decides when the page is actually ready
+PAGE_LOAD_STRATEGY = os.getenv('PAGE_LOAD_STRATEGY', 'eager')
+# Persistent HTTP cache so repeat audits of a site reuse its static assets (off when empty)
+BROWSER_CACHE_DIR = os.getenv('BROWSER_CACHE_DIR', '')
+BROWSER_CACHE_SIZE_MB = int(os.getenv('BROWSER_CACHE_SIZE_MB', '512'))
+BROWSER_CACHE_MAX_SLOTS = 64
+
+def host_url_patterns(*domains):
+    """Patterns for requests to the domains and their subdomains, anchored to the host"""
+    return [pattern for domain in domains for pattern in (f'*://{domain}/*', f'*://*.{domain}/*')]
+
+
+def extension_url_patterns(*extensions):
+    """Patterns for paths ending in the extensions, with or without a query string"""
+    return [pattern for extension in extensions for pattern in (f'*.{extension}', f'*.{extension}?*')]
+
+
+# URL patterns blocked through Network.setBlockedURLs ('*' matches any run of characters, nothing else is special)
+TRACKER_URL_PATTERNS = host_url_patterns(
+    'google-analytics.com', 'googletagmanager.com', 'googlesyndication.com', 'doubleclick.net',
+    'adservice.google.com', 'connect.facebook.net', 'hotjar.com', 'segment.com', 'segment.io', 'mixpanel.com',
+    'amplitude.com', 'fullstory.com', 'clarity.ms', 'scorecardresearch.com', 'quantserve.com', 'nr-data.net',
+    'criteo.com', 'taboola.com', 'outbrain.com'
+)
+MEDIA_URL_PATTERNS = extension_url_patterns('mp4', 'webm', 'm4v', 'mov', 'm3u8', 'mpd', 'mp3', 'ogg', 'wav')
+FONT_URL_PATTERNS = extension_url_patterns('woff2', 'woff', 'ttf', 'otf', 'eot')
+IMAGE_URL_PATTERNS = extension_url_patterns('png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'bmp', 'ico')
+# Fonts change text metrics and images feed pixel contrast, so only the later profiles drop them
+NETWORK_PROFILES = {
+    'full': [],
+    'lean': TRACKER_URL_PATTERNS + MEDIA_URL_PATTERNS,
+    'minimal': TRACKER_URL_PATTERNS + MEDIA_URL_PATTERNS + FONT_URL_PATTERNS,
+    'text': TRACKER_URL_PATTERNS + MEDIA_URL_PATTERNS + FONT_URL_PATTERNS + IMAGE_URL_PATTERNS
+}
+NETWORK_PROFILE_LABELS = {
+    'full': 'Load everything',
+    'lean': 'Skip trackers and media',
+    'minimal': 'Skip trackers, media and fonts',
+    'text': 'Skip trackers, media, fonts and images'
+}
+# The page is audited as served unless the caller asks for blocking
+NETWORK_PROFILE = os.getenv('NETWORK_PROFILE', 'full')
+
+
+def create_driver():
+    """Setup Chrome driver with accessibility-focused options"""
+    from selenium.webdriver.chrome.options import Options
+    options = Options()
+    options.add_argument('--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument('--force-device-scale-factor=1')
+    options.page_load_strategy = PAGE_LOAD_STRATEGY
+    
+    cache_dir, cache_lock = claim_browser_cache_dir() if BROWSER_CACHE_DIR else (None, None)
+    if cache_dir:
+        options.add_argument(f'--disk-cache-dir={cache_dir}')
+        options.add_argument(f'--disk-cache-size={BROWSER_CACHE_SIZE_MB * 1024 * 1024}')
+    
+    # No implicit wait: checks read a snapshot, and a missing element should not cost seconds
+    try:
+        driver = instrumented_chrome_class()(options=options)
+    except Exception:
+        if cache_lock:
+            cache_lock.close()
+        raise
+    driver.cache_lock = cache_lock
+    return driver
+
+
+def claim_browser_cache_dir():
+    """Lock a free cache slot under BROWSER_CACHE_DIR; Chrome cannot share one between processes"""
+    import fcntl
+    for slot in range(BROWSER_CACHE_MAX_SLOTS):
+        directory = os.path.join(BROWSER_CACHE_DIR, f'slot-{slot}')
+        try:
+            os.makedirs(directory, exist_ok=True)
+            handle = open(os.path.join(directory, '.lock'), 'w')
+        except OSError as e:
+            print(f"Browser cache disabled: {e}")
+            return None, None
+        try:
+            # Held until the driver quits, or released by the OS if this process dies
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return directory, handle
+        except OSError:
+            handle.close()
+    return None, None
+
+
+def process_tree_memory_mb(pid):
+    """Resident memory of a process and all of its descendants (Linux only)"""
+    try:
+        children = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    # The command name may contain spaces, the ppid follows it
+                    ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+        
+        total_kb = 0
+        pending = [pid]
+        while pending:
+            current = pending.pop()
+            pending.extend(children.get(current, []))
+            try:
+                with open(f'/proc/{current}/status') as f:
+                    for line in f:
+                        if line.startswith('VmRSS:'):
+                            total_kb += int(line.split()[1])
+                            break
+            except OSError:
+                continue
+        return total_kb / 1024
+    except OSError:
+        return None
+
+
+class DriverPoolTimeout(Exception):
+    """Raised when no driver could be checked out in time"""
+
+
+class PooledDriver:
+    """A pooled WebDriver together with its usage statistics"""
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created = time.time()
+    
+    def memory_mb(self):
+        try:
+            return process_tree_memory_mb(self.driver.service.process.pid)
+        except Exception:
+            return None
+
+
+class DriverPool:
+    """Bounded pool of long-lived Chrome drivers shared across tests"""
+    def __init__(self, size=DRIVER_POOL_SIZE, max_uses=DRIVER_MAX_USES,
+                 max_memory_mb=DRIVER_MAX_MEMORY_MB, checkout_timeout=DRIVER_CHECKOUT_TIMEOUT,
+                 factory=create_driver):
+        self.size = size
+        self.max_uses = max_uses
+        self.max_memory_mb = max_memory_mb
+        self.checkout_timeout = checkout_timeout
+        self.factory = factory
+        self._idle = []
+        self._total = 0
+        self._closed = False
+        self._cond = threading.Condition()
+    
+    def warm(self):
+        """Launch drivers up to the pool size in the background"""
+        def fill():
+            while True:
+                with self._cond:
+                    if self._closed or self._total >= self.size:
+                        return
+                    self._total += 1
+                try:
+                    entry = PooledDriver(self.factory())
+                except Exception as e:
+                    print(f"Failed to pre-warm driver: {e}")
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    return
+                with self._cond:
+                    self._idle.append(entry)
+                    self._cond.notify()
+        
+        threading.Thread(target=fill, name='driver-pool-warm', daemon=True).start()
+    
+    def acquire(self, timeout=None):
+        """Check out a healthy driver, launching one if the pool has room"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        
+        while True:
+            entry = None
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError('Driver pool is closed')
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._total < self.size:
+                        self._total += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise DriverPoolTimeout(f'No browser available after {timeout:.0f}s')
+                    self._cond.wait(remaining)
+            
+            if entry is not None:
+                if self._is_healthy(entry):
+                    return entry
+                # Replace the dead driver but keep its slot
+                self._quit(entry)
+            
+            try:
+                return PooledDriver(self.factory())
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+    
+    def release(self, entry):
+        """Return a driver to the pool, recycling it when it is worn out"""
+        entry.uses += 1
+        recycle = self._closed or entry.uses >= self.max_uses
+        
+        if not recycle and self.max_memory_mb:
+            memory = entry.memory_mb()
+            recycle = memory is not None and memory > self.max_memory_mb
+        
+        if not recycle:
+            try:
+                self._reset(entry.driver)
+            except Exception:
+                recycle = True
+        
+        if recycle:
+            self._quit(entry)
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+        else:
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+    
+    @contextmanager
+    def checkout(self, timeout=None):
+        entry = self.acquire(timeout)
+        try:
+            yield entry.driver
+        finally:
+            self.release(entry)
+    
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for entry in idle:
+            self._quit(entry)
+    
+    def stats(self):
+        with self._cond:
+            return {'size': self.size, 'open': self._total, 'idle': len(self._idle)}
+    
+    def _is_healthy(self, entry):
+        try:
+            return entry.driver.execute_script('return 1;') == 1
+        except Exception:
+            return False
+    
+    def _reset(self, driver):
+        """Clear cookies, storage and extra tabs left behind by the last run"""
+        driver.set_script_timeout(DEFAULT_SCRIPT_TIMEOUT)
+        driver.set_page_load_timeout(DEFAULT_PAGE_LOAD_TIMEOUT)
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        
+        origin = driver.execute_script('return window.location.origin;')
+        if origin and origin.startswith('http'):
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+                'origin': origin,
+                'storageTypes': 'local_storage,indexeddb,websql,service_workers,cache_storage'
+            })
+            driver.execute_script('try { window.sessionStorage.clear(); } catch (e) {}')
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        driver.execute_cdp_cmd('Emulation.clearDeviceMetricsOverride', {})
+        driver.get('about:blank')
+    
+    def _quit(self, entry):
+        try:
+            entry.driver.quit()
+        except Exception:
+            pass
+
+
+# Result cache settings
+RESULT_CACHE_BACKEND = os.getenv('RESULT_CACHE_BACKEND', 'memory')
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', '/tmp/accessibility-cache')
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '256'))
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', '3600'))
+RESULT_CACHE_RUN_FIELDS = ('timings', 'summary_status', 'summary_url')
+
+
+def normalize_cache_url(url):
+    """Canonical form of a URL so equivalent spellings share cache entries"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f'{host}:{parts.port}'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def fetch_http_validator(url, timeout=5):
+    """Return the page's ETag or Last-Modified header, if the server sends one"""
+    try:
+        response = http_session.head(url, timeout=timeout, allow_redirects=True)
+    except requests.RequestException:
+        return None
+    if response.status_code >= 400:
+        return None
+    if response.headers.get('ETag'):
+        return 'etag:' + response.headers['ETag']
+    if response.headers.get('Last-Modified'):
+        return 'last-modified:' + response.headers['Last-Modified']
+    return None
+
+
+class MemoryCacheBackend:
+    """LRU cache held in process memory"""
+    def __init__(self, max_entries=RESULT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires'] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+    
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCacheBackend:
+    """LRU cache stored as JSON files, with file mtimes tracking recency"""
+    def __init__(self, directory=RESULT_CACHE_DIR, max_entries=RESULT_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+    
+    def get(self, key):
+        path = self._path(key)
+        with self._lock:
+            try:
+                with open(path) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+            if entry['expires'] < time.time():
+                os.remove(path)
+                return None
+            os.utime(path)
+            return entry
+    
+    def set(self, key, entry):
+        path = self._path(key)
+        with self._lock:
+            tmp_path = f'{path}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+            self._evict()
+    
+    def clear(self):
+        with self._lock:
+            for name in os.listdir(self.directory):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.directory, name))
+    
+    def _evict(self):
+        files = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.json')]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class ResultCache:
+    """Content-addressed cache of test results with a TTL"""
+    def __init__(self, backend, ttl=RESULT_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+    
+    def key(self, url, validator, variant=None):
+        """Key on the normalized URL plus a validator (HTTP header or DOM hash)"""
+        material = json.dumps([normalize_cache_url(url), validator, variant or {}], sort_keys=True)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+    
+    def get(self, key):
+        entry = self.backend.get(key)
+        if entry is None:
+            return None
+        # Callers annotate and trim what they get, so each hit is a copy of its own
+        result = copy.deepcopy(entry['value'])
+        result['cached'] = True
+        result['cached_at'] = datetime.fromtimestamp(entry['stored']).isoformat()
+        return result
+    
+    def set(self, key, value):
+        now = time.time()
+        # Timings and the summary stream belong to one run, not the page, so they are never served again
+        value = copy.deepcopy({name: item for name, item in value.items() if name not in RESULT_CACHE_RUN_FIELDS})
+        self.backend.set(key, {'value': value, 'stored': now, 'expires': now + self.ttl})
+
+
+def create_cache_backend(subdirectory, max_entries):
+    """Build the backend selected by RESULT_CACHE_BACKEND (None when disabled)"""
+    if RESULT_CACHE_BACKEND == 'disk':
+        return DiskCacheBackend(os.path.join(RESULT_CACHE_DIR, subdirectory), max_entries)
+    if RESULT_CACHE_BACKEND == 'memory':
+        return MemoryCacheBackend(max_entries)
+    return None
+
+
+def create_result_cache():
+    backend = create_cache_backend('results', RESULT_CACHE_MAX_ENTRIES)
+    return ResultCache(backend) if backend else None
+
+
+result_cache = create_result_cache()
+
+
+# Results history settings (HISTORY_DB='' disables it)
+HISTORY_DB = os.getenv('HISTORY_DB', '/tmp/accessibility-history.sqlite3')
+HISTORY_RETENTION_DAYS = int(os.getenv('HISTORY_RETENTION_DAYS', '90'))
+HISTORY_QUERY_LIMIT = 500
+SEVERITIES = ('high', 'medium', 'low')
+# What identifies an issue: where it is and what it says, never what was measured
+ISSUE_FINGERPRINT_FIELDS = ('element', 'selector', 'src', 'text', 'alt_text', 'element_type', 'aria_label',
+                            'current_title', 'viewport', 'frame', 'shadow')
+
+
+def fingerprint_issues(issues):
+    """Give every issue a fingerprint that is stable across runs; repeats are numbered"""
+    seen = {}
+    for issue in issues:
+        key = json.dumps([issue.get('type')] + [issue.get(field) for field in ISSUE_FINGERPRINT_FIELDS], default=str)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        seen[digest] = seen.get(digest, 0) + 1
+        issue['fingerprint'] = digest if seen[digest] == 1 else f'{digest}-{seen[digest]}'
+    return issues
+
+
+class HistoryStore:
+    """SQLite record of past runs and their fingerprinted issues"""
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            normalized_url TEXT NOT NULL,
+            created REAL NOT NULL,
+            total_issues INTEGER NOT NULL,
+            high INTEGER NOT NULL,
+            medium INTEGER NOT NULL,
+            low INTEGER NOT NULL,
+            complete INTEGER NOT NULL,
+            summary TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS runs_by_url ON runs (normalized_url, created);
+        CREATE INDEX IF NOT EXISTS runs_by_date ON runs (created);
+        CREATE TABLE IF NOT EXISTS issues (
+            run_id TEXT NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+            fingerprint TEXT NOT NULL,
+            check_name TEXT,
+            type TEXT,
+            severity TEXT,
+            data TEXT NOT NULL,
+            PRIMARY KEY (run_id, fingerprint)
+        );
+        CREATE INDEX IF NOT EXISTS issues_by_severity ON issues (severity, run_id);
+    """
+    
+    def __init__(self, path=HISTORY_DB, retention_days=HISTORY_RETENTION_DAYS):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA foreign_keys=ON')
+            self._db.executescript(self.SCHEMA)
+    
+    def record(self, results):
+        """Store a finished run; issues must already carry fingerprints"""
+        summary = {key: value for key, value in results.items() if key not in ('issues', 'timings', 'cached')}
+        severity = results.get('issues_by_severity', {})
+        complete = all(status['status'] == 'completed' for status in results.get('check_status', {}).values())
+        now = time.time()
+        
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (results['run_id'], results['url'], normalize_cache_url(results['url']), now,
+                 results.get('total_issues', 0), severity.get('high', 0), severity.get('medium', 0),
+                 severity.get('low', 0), int(complete), json.dumps(summary, default=str))
+            )
+            self._db.executemany(
+                'INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?)',
+                [(results['run_id'], issue['fingerprint'], issue.get('check'), issue.get('type'),
+                  issue.get('severity'), json.dumps(issue, default=str)) for issue in results.get('issues', [])]
+            )
+            if self.retention_days:
+                self._db.execute('DELETE FROM runs WHERE created < ?', (now - self.retention_days * 86400,))
+    
+    def runs(self, url=None, since=None, until=None, severity=None, limit=50):
+        """Most recent runs first, filtered by URL, date range and severity present"""
+        query = 'SELECT id, url, created, total_issues, high, medium, low, complete FROM runs WHERE 1 = 1'
+        params = []
+        if url:
+            query += ' AND normalized_url = ?'
+            params.append(normalize_cache_url(url))
+        if since is not None:
+            query += ' AND created >= ?'
+            params.append(since)
+        if until is not None:
+            query += ' AND created < ?'
+            params.append(until)
+        if severity in SEVERITIES:
+            query += f' AND {severity} > 0'
+        query += ' ORDER BY created DESC LIMIT ?'
+        params.append(min(limit, HISTORY_QUERY_LIMIT))
+        
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [{
+            'run_id': row['id'],
+            'url': row['url'],
+            'timestamp': datetime.fromtimestamp(row['created']).isoformat(),
+            'total_issues': row['total_issues'],
+            'issues_by_severity': {level: row[level] for level in SEVERITIES},
+            'complete': bool(row['complete'])
+        } for row in rows]
+    
+    def run(self, run_id, severity=None):
+        """A stored run with its issues, optionally only those of one severity"""
+        with self._lock:
+            row = self._db.execute('SELECT summary FROM runs WHERE id = ?', (run_id,)).fetchone()
+            if row is None:
+                return None
+            if severity:
+                issues = self._db.execute('SELECT data FROM issues WHERE run_id = ? AND severity = ?',
+                                          (run_id, severity)).fetchall()
+            else:
+                issues = self._db.execute('SELECT data FROM issues WHERE run_id = ?', (run_id,)).fetchall()
+        result = json.loads(row['summary'])
+        result['issues'] = [json.loads(issue['data']) for issue in issues]
+        return result
+    
+    def summary(self, run_id):
+        """The AI summary fields of a stored run"""
+        with self._lock:
+            row = self._db.execute('SELECT url, summary FROM runs WHERE id = ?', (run_id,)).fetchone()
+        if row is None:
+            return None
+        stored = json.loads(row['summary'])
+        return {
+            'run_id': run_id,
+            'url': row['url'],
+            # Runs summarised before the summary went asynchronous carry only the text
+            'status': stored.get('summary_status') or ('completed' if stored.get('ai_summary') else 'off'),
+            'ai_summary': stored.get('ai_summary'),
+            'error': stored.get('summary_error')
+        }
+    
+    def set_summary(self, run_id, status, summary=None, error=None):
+        """Attach an AI summary that finished after the run was recorded"""
+        with self._lock, self._db:
+            row = self._db.execute('SELECT summary FROM runs WHERE id = ?', (run_id,)).fetchone()
+            if row is None:
+                return False
+            stored = json.loads(row['summary'])
+            stored.update({'summary_status': status, 'ai_summary': summary})
+            if error:
+                stored['summary_error'] = error
+            self._db.execute('UPDATE runs SET summary = ? WHERE id = ?', (json.dumps(stored, default=str), run_id))
+        return True
+    
+    def diff(self, run_id, against=None):
+        """New, fixed and unchanged issues of a run relative to an earlier run of the same URL"""
+        with self._lock:
+            current = self._db.execute('SELECT * FROM runs WHERE id = ?', (run_id,)).fetchone()
+            if current is None:
+                return None
+            if against:
+                previous = self._db.execute('SELECT * FROM runs WHERE id = ?', (against,)).fetchone()
+            else:
+                previous = self._db.execute(
+                    'SELECT * FROM runs WHERE normalized_url = ? AND created < ? ORDER BY created DESC LIMIT 1',
+                    (current['normalized_url'], current['created'])
+                ).fetchone()
+            current_issues = self._db.execute('SELECT fingerprint, check_name, data FROM issues WHERE run_id = ?',
+                                              (run_id,)).fetchall()
+            previous_issues = self._db.execute('SELECT fingerprint, check_name, data FROM issues WHERE run_id = ?',
+                                               (previous['id'],)).fetchall() if previous else []
+        
+        summary = json.loads(current['summary'])
+        
+        def completed(row):
+            statuses = json.loads(row['summary']).get('check_status', {}) if row else {}
+            return {name for name, status in statuses.items() if status['status'] == 'completed'}
+        
+        # A check that did not finish in either run can neither introduce nor fix anything (a first run has no baseline)
+        comparable = completed(current) & completed(previous)
+        
+        def issues(rows):
+            return {row['fingerprint']: row for row in rows if previous is None or row['check_name'] in comparable}
+        
+        before = issues(previous_issues)
+        after = issues(current_issues)
+        new = [json.loads(row['data']) for fingerprint, row in after.items() if fingerprint not in before]
+        fixed = []
+        for fingerprint, row in before.items():
+            if fingerprint in after:
+                continue
+            issue = json.loads(row['data'])
+            fixed.append({key: issue[key] for key in ('fingerprint', 'check', 'type', 'severity', 'element', 'text')
+                          if key in issue})
+        
+        return {
+            'run_id': run_id,
+            'previous_run_id': previous['id'] if previous else None,
+            'url': summary['url'],
+            'timestamp': summary.get('timestamp'),
+            'total_issues': summary.get('total_issues'),
+            'issues_by_severity': summary.get('issues_by_severity'),
+            'check_status': summary.get('check_status'),
+            'diff': {'new': len(new), 'fixed': len(fixed), 'unchanged': len(after) - len(new)},
+            'new_issues': new,
+            'fixed_issues': fixed
+        }
+
+
+def create_history_store():
+    if not HISTORY_DB:
+        return None
+    try:
+        return HistoryStore()
+    except Exception as e:
+        print(f"Run history disabled: {e}")
+        return None
+
+
+history_store = create_history_store()
+
+
+# AI summary settings
+AI_SUMMARY_MAX_EXAMPLES = int(os.getenv('AI_SUMMARY_MAX_EXAMPLES', '3'))
+AI_PROMPT_TOKEN_BUDGET = int(os.getenv('AI_PROMPT_TOKEN_BUDGET', '3000'))
+AI_SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv('AI_SUMMARY_CACHE_MAX_ENTRIES', '1024'))
+AI_SUMMARY_CACHE_TTL = int(os.getenv('AI_SUMMARY_CACHE_TTL', '86400'))
+AI_SUMMARY_MODEL = os.getenv('AI_SUMMARY_MODEL', 'gpt-4o')
+AI_SUMMARY_MAX_TOKENS = int(os.getenv('AI_SUMMARY_MAX_TOKENS', '1000'))
+AI_SUMMARY_MODES = ('async', 'sync', 'off')
+AI_SUMMARY_MODE = os.getenv('AI_SUMMARY_MODE', 'async')
+AI_SUMMARY_WORKERS = int(os.getenv('AI_SUMMARY_WORKERS', '4'))
+AI_SUMMARY_TIMEOUT_SECONDS = float(os.getenv('AI_SUMMARY_TIMEOUT_SECONDS', '120'))
+AI_SUMMARY_RETENTION_SECONDS = int(os.getenv('AI_SUMMARY_RETENTION_SECONDS', '3600'))
+
+SEVERITY_RANK = {'high': 0, 'medium': 1, 'low': 2}
+
+SUMMARY_PROMPT = """
+Analyze the following accessibility issues found on a webpage.
+
+Issues found, grouped by type with counts per severity and a few examples:
+{digest}
+
+Please provide:
+1. A brief executive summary of the accessibility status
+2. Top 3 priority issues that should be fixed first
+3. Specific recommendations for each major issue category
+4. Impact on different user groups (vision, motor, cognitive disabilities)
+5. Estimated effort level (Low/Medium/High) for fixes
+
+Format the response as a structured report.
+"""
+
+summary_cache = create_cache_backend('summaries', AI_SUMMARY_CACHE_MAX_ENTRIES)
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English/JSON)"""
+    return len(text) // 4 + 1
+
+
+def compact_issue(issue, max_length=80):
+    """Strip an issue down to short, prompt-friendly fields"""
+    example = {}
+    for key, value in issue.items():
+        if key in ('type', 'severity', 'rect', 'screenshot_crop', 'check', 'fingerprint'):
+            continue
+        if isinstance(value, str):
+            value = value[:max_length]
+        elif isinstance(value, list):
+            value = value[:5]
+        elif isinstance(value, dict):
+            continue
+        example[key] = value
+    return example
+
+
+def build_issue_digest(issues, max_examples=AI_SUMMARY_MAX_EXAMPLES):
+    """Aggregate issues per type and severity, keeping a few examples of each"""
+    groups = {}
+    for issue in issues:
+        group = groups.setdefault(issue.get('type', 'Unknown'), {
+            'type': issue.get('type', 'Unknown'),
+            'count': 0,
+            'by_severity': {},
+            'examples': []
+        })
+        severity = issue.get('severity', 'medium')
+        group['count'] += 1
+        group['by_severity'][severity] = group['by_severity'].get(severity, 0) + 1
+        if len(group['examples']) < max_examples:
+            group['examples'].append(compact_issue(issue))
+    
+    def priority(group):
+        worst = min(SEVERITY_RANK.get(severity, 1) for severity in group['by_severity'])
+        return (worst, -group['count'], group['type'])
+    
+    return sorted(groups.values(), key=priority)
+
+
+def digest_fingerprint(digest):
+    """Fingerprint of the issue types and severity counts, ignoring page-specific examples"""
+    material = [[group['type'], sorted(group['by_severity'].items())] for group in digest]
+    return hashlib.sha256(json.dumps(material).encode('utf-8')).hexdigest()
+
+
+def build_summary_prompt(digest, token_budget=AI_PROMPT_TOKEN_BUDGET):
+    """Render the digest into a prompt that fits the token budget"""
+    def render(groups, max_examples):
+        trimmed = [dict(group, examples=group['examples'][:max_examples]) for group in groups]
+        return SUMMARY_PROMPT.format(digest=json.dumps(trimmed, separators=(',', ':')))
+    
+    # Shed examples first, then the lowest priority issue types
+    max_examples = max((len(group['examples']) for group in digest), default=0)
+    for examples in range(max_examples, -1, -1):
+        prompt = render(digest, examples)
+        if estimate_tokens(prompt) <= token_budget:
+            return prompt
+    
+    groups = list(digest)
+    while len(groups) > 1 and estimate_tokens(render(groups, 0)) > token_budget:
+        groups.pop()
+    omitted = digest[len(groups):]
+    prompt = render(groups, 0)
+    if omitted:
+        prompt += f"\n{len(omitted)} lower priority issue types ({sum(group['count'] for group in omitted)} issues) were omitted.\n"
+    return prompt
+
+
+def summary_mode(value):
+    """Normalize the ai_summary option: true means AI_SUMMARY_MODE, false turns the summary off"""
+    if value is None or value is True:
+        return AI_SUMMARY_MODE
+    if value is False:
+        return 'off'
+    if value not in AI_SUMMARY_MODES:
+        raise ValueError(f"Unknown ai_summary mode: {value} (expected true, false or one of {', '.join(AI_SUMMARY_MODES)})")
+    return value
+
+
+def generate_summary(issues, timeout=None, on_delta=None):
+    """Stream an AI summary of the issues, handing each piece of text to on_delta; returns (summary, usage)"""
+    # Pages built from the same template share a digest, and so a summary
+    digest = build_issue_digest(issues)
+    fingerprint = digest_fingerprint(digest)
+    if summary_cache:
+        cached = summary_cache.get(fingerprint)
+        if cached:
+            return cached['value'], None
+    
+    prompt = build_summary_prompt(digest)
+    
+    api = get_openai_client()
+    api = api.with_options(timeout=timeout) if timeout else api
+    started = time.monotonic()
+    parts = []
+    usage = None
+    try:
+        stream = api.chat.completions.create(
+            model=AI_SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": "You are an accessibility expert providing detailed analysis and recommendations for web accessibility issues."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=AI_SUMMARY_MAX_TOKENS,
+            stream=True,
+            stream_options={'include_usage': True}
+        )
+        try:
+            for chunk in stream:
+                # The final chunk carries the token usage and no choices
+                usage = getattr(chunk, 'usage', None) or usage
+                for choice in chunk.choices or []:
+                    text = getattr(choice.delta, 'content', None)
+                    if not text:
+                        continue
+                    if not parts:
+                        metrics.observe('accessibility_openai_first_token_seconds', time.monotonic() - started)
+                    parts.append(text)
+                    if on_delta:
+                        on_delta(text)
+                # The client timeout applies per read, so a slow trickle of tokens is cut off here
+                if timeout and time.monotonic() - started > timeout:
+                    raise TimeoutError(f'summary not finished after {timeout:.0f}s')
+        finally:
+            close = getattr(stream, 'close', None)
+            if close:
+                close()
+    except Exception:
+        metrics.inc('accessibility_openai_requests_total', status='error')
+        raise
+    finally:
+        latency = time.monotonic() - started
+        metrics.observe('accessibility_openai_request_seconds', latency)
+    
+    metrics.inc('accessibility_openai_requests_total', status='ok')
+    if usage:
+        metrics.inc('accessibility_openai_tokens_total', usage.prompt_tokens or 0, kind='prompt')
+        metrics.inc('accessibility_openai_tokens_total', usage.completion_tokens or 0, kind='completion')
+    
+    summary = ''.join(parts)
+    if summary_cache and summary:
+        now = time.time()
+        summary_cache.set(fingerprint, {'value': summary, 'stored': now, 'expires': now + AI_SUMMARY_CACHE_TTL})
+    
+    return summary, {
+        'seconds': round(latency, 4),
+        'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+        'completion_tokens': getattr(usage, 'completion_tokens', None)
+    }
+
+
+# Time limits for a single test
+TEST_DEADLINE_SECONDS = float(os.getenv('TEST_DEADLINE_SECONDS', '180'))
+TEST_MAX_DEADLINE_SECONDS = float(os.getenv('TEST_MAX_DEADLINE_SECONDS', '600'))
+CHECK_BUDGET_SECONDS = float(os.getenv('CHECK_BUDGET_SECONDS', '30'))
+PAGE_LOAD_TIMEOUT_SECONDS = float(os.getenv('PAGE_LOAD_TIMEOUT_SECONDS', '60'))
+READINESS_MODES = ('none', 'load', 'settled')
+READINESS_MODE = os.getenv('READINESS_MODE', 'settled')
+READINESS_TIMEOUT_SECONDS = float(os.getenv('READINESS_TIMEOUT_SECONDS', '15'))
+READINESS_NETWORK_QUIET_MS = int(os.getenv('READINESS_NETWORK_QUIET_MS', '500'))
+READINESS_DOM_QUIET_MS = int(os.getenv('READINESS_DOM_QUIET_MS', '300'))
+READINESS_RETRIES = 3
+
+# Extra viewports are emulated on the loaded page; widths up to the maximum count as mobile
+VIEWPORT_DEFAULT_HEIGHT = int(os.getenv('VIEWPORT_DEFAULT_HEIGHT', '900'))
+VIEWPORT_MAX_COUNT = int(os.getenv('VIEWPORT_MAX_COUNT', '6'))
+VIEWPORT_MOBILE_MAX_WIDTH = 767
+VIEWPORT_MIN_SIZE = 200
+VIEWPORT_MAX_SIZE = 4096
+AI_SUMMARY_MIN_SECONDS = 5
+DEFAULT_SCRIPT_TIMEOUT = 30
+DEFAULT_PAGE_LOAD_TIMEOUT = 300
+
+
+class Deadline:
+    """Wall-clock limit shared by every phase of a test"""
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.expires = self.started + seconds
+    
+    def remaining(self):
+        return max(self.expires - time.monotonic(), 0.0)
+    
+    def expired(self):
+        return self.remaining() <= 0
+    
+    def budget(self, seconds):
+        """Time a phase may use: its own budget, cut short by the deadline"""
+        return min(seconds, self.remaining())
+    
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+
+# Checks that only read the snapshot run in parallel, on a pool of this size per test
+CHECK_WORKERS = int(os.getenv('CHECK_WORKERS', '4'))
+CHECK_POLL_SECONDS = 0.1
+# How long a test waits for a timed-out check to notice and stop
+CHECK_STOP_GRACE_SECONDS = float(os.getenv('CHECK_STOP_GRACE_SECONDS', '1'))
+
+
+class CheckCancelled(Exception):
+    """Raised inside a check whose budget ran out, so its worker stops early"""
+
+# Data a check can depend on
+REQUIRES_DRIVER = 'driver'        # interacts with the live page, so runs serially
+REQUIRES_SNAPSHOT = 'snapshot'    # reads the DOM snapshot only
+REQUIRES_SCREENSHOT = 'screenshot'
+REQUIRES_AX_TREE = 'ax_tree'      # reads the computed accessibility tree, falling back to the snapshot
+
+
+class CheckSpec:
+    """A registered check, the data it needs and its time budget"""
+    def __init__(self, name, label, method, requires, budget=None, layout=False, static=False):
+        self.name = name
+        self.label = label
+        self.method = method
+        self.requires = tuple(requires)
+        self.budget = budget or CHECK_BUDGET_SECONDS
+        # Layout-dependent checks are re-run at every requested viewport
+        self.layout = layout
+        # Markup-only checks can also run in quick mode, on the served HTML
+        self.static = static
+    
+    def to_dict(self):
+        return {'name': self.name, 'label': self.label, 'requires': list(self.requires),
+                'budget_seconds': self.budget, 'layout': self.layout, 'static': self.static}
+
+
+# All checks in the order they are reported
+CHECK_REGISTRY = OrderedDict()
+
+
+def register_check(name, label, requires=(REQUIRES_SNAPSHOT,), budget=None, layout=False, static=False):
+    """Register an AccessibilityTester method as a named check"""
+    def decorator(method):
+        CHECK_REGISTRY[name] = CheckSpec(name, label, method.__name__, requires, budget, layout, static)
+        return method
+    return decorator
+
+
 class AccessibilityTester:
-    def __init__(self):
+    def __init__(self, pool=None, progress=None):
+        self.pool = pool
+        self.progress = progress
         self.driver = None
         self.issues = []
         self.screenshots = []
-        
+        self.snapshot = None
+        self.ax_tree = None
+        self.tab_order = []
+        self.readiness = None
+        self.check_status = {}
+        self.inspected = {}
+        self.timings = {'phases': {}, 'checks': {}}
+        self.check_timings = self.timings['checks']
+        self.viewports = []
+        self.screenshot = None
+        self.screenshot_png = None
+        self._screenshot_pixels = None
+        self.contrast_mode = 'computed'
+        self.network_profile = None
+        self.mode = 'full'
+        # When the check running on this thread has to stop
+        self._running = threading.local()
+
     def setup_driver(self):
-        """Setup Chrome driver with accessibility-focused options"""
-        options = Options()
-        options.add_argument('--headless')
-        options.add_argument('--no-sandbox')
-        options.add_argument('--disable-dev-shm-usage')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--window-size=1920,1080')
-        options.add_argument('--force-device-scale-factor=1')
-        
-        self.driver = webdriver.Chrome(options=options)
-        self.driver.implicitly_wait(10)
-    
-    def capture_screenshot(self, name="screenshot"):
-        """Capture screenshot and return base64 encoded image"""
-        screenshot = self.driver.get_screenshot_as_png()
-        screenshot_b64 = base64.b64encode(screenshot).decode('utf-8')
-        
-        self.screenshots.append({
-            'name': name,
-            'data': screenshot_b64,
-            'timestamp': datetime.now().isoformat()
-        })
+        """Launch a dedicated Chrome driver outside of the shared pool"""
+        self.driver = create_driver()
+    
+    def command_count(self):
+        return getattr(self.driver, 'command_count', 0)
+    
+    @contextmanager
+    def timed(self, phase):
+        """Time a phase of the test and count the WebDriver round-trips it makes"""
+        started = time.monotonic()
+        commands = self.command_count()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            used = self.command_count() - commands
+            self.timings['phases'][phase] = {'seconds': round(elapsed, 4), 'webdriver_commands': used}
+            metrics.observe('accessibility_phase_seconds', elapsed, phase=phase)
+            if used:
+                metrics.inc('accessibility_webdriver_commands_total', used, phase=phase)
+    
+    def report(self, event, **data):
+        """Send a structured progress event to the listener, or log it"""
+        if self.progress:
+            self.progress(event, data)
+        elif event == 'check_started':
+            print(f"Checking {data['label']}...")
+        elif event == 'summary_started':
+            print("Generating AI summary...")
+    
+    def capture_screenshot(self, name="screenshot", full_page=True):
+        """Capture screenshot into the screenshot store and return its reference, or None if that failed"""
+        # Kept for checks that analyse the rendered pixels
+        self.screenshot = self.screenshot_png = self._screenshot_pixels = None
+        try:
+            screenshot = None
+            if full_page:
+                screenshot = self.capture_full_page_png()
+            if screenshot is None:
+                screenshot = self.driver.get_screenshot_as_png()
+            reference = screenshot_store.save(screenshot, name)
+        except Exception as e:
+            # The checks still run; pixel contrast falls back to computed styles and issues get no crops
+            print(f"Screenshot {name} failed: {e}")
+            return None
+        
+        self.screenshot_png = screenshot
+        self.screenshot = reference
+        self.screenshots.append(reference)
+        
+        return reference
+    
+    def capture_full_page_png(self):
+        """Capture the whole document in one CDP call, or None if unsupported"""
+        try:
+            metrics = self.driver.execute_cdp_cmd('Page.getLayoutMetrics', {})
+            size = metrics.get('cssContentSize') or metrics['contentSize']
+            clip = {
+                'x': 0, 'y': 0, 'scale': 1,
+                'width': max(min(int(size['width']), SCREENSHOT_MAX_WIDTH), 1),
+                'height': max(min(int(size['height']), SCREENSHOT_MAX_HEIGHT), 1)
+            }
+            data = self.driver.execute_cdp_cmd('Page.captureScreenshot', {
+                'format': 'png', 'captureBeyondViewport': True, 'clip': clip
+            })
+            return base64.b64decode(data['data'])
+        except Exception:
+            return None
+    
+    def screenshot_pixels(self):
+        """Decode the last screenshot once into an RGB array"""
+        if self._screenshot_pixels is None and self.screenshot_png:
+            from PIL import Image
+            with Image.open(io.BytesIO(self.screenshot_png)) as image:
+                self._screenshot_pixels = np.asarray(image.convert('RGB'))
+        return self._screenshot_pixels
+    
+    def apply_network_profile(self, profile):
+        """Block the profile's URL patterns before the page starts loading"""
+        if getattr(self.driver, 'network_profile', None) == profile:
+            return
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': NETWORK_PROFILES[profile]})
+        # Pooled drivers keep the block list, so the next test with this profile skips the round-trips
+        self.driver.network_profile = profile
+    
+    def wait_until_ready(self, deadline, mode=READINESS_MODE):
+        """Wait for the page to load, then for the network and DOM to go quiet"""
+        timeout = max(deadline.budget(READINESS_TIMEOUT_SECONDS), 1)
+        if mode == 'none':
+            from selenium.webdriver.common.by import By
+            from selenium.webdriver.support.ui import WebDriverWait
+            from selenium.webdriver.support import expected_conditions as EC
+            WebDriverWait(self.driver, timeout).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            return {'mode': mode, 'ready': True}
+        
+        until = time.monotonic() + timeout
+        readiness = {'mode': mode, 'ready': False}
+        for _ in range(READINESS_RETRIES):
+            remaining = until - time.monotonic()
+            if remaining <= 0:
+                break
+            self.driver.set_script_timeout(remaining + 5)
+            try:
+                report = self.driver.execute_async_script(
+                    READINESS_SCRIPT, mode, READINESS_NETWORK_QUIET_MS, READINESS_DOM_QUIET_MS, int(remaining * 1000)
+                ) or {}
+                readiness = dict(report, mode=mode)
+                break
+            except TimeoutException:
+                break
+            except WebDriverException:
+                # A redirect or client-side navigation replaced the document mid-wait
+                time.sleep(0.1)
+        return readiness
+    
+    def current_viewport(self):
+        width, height = self.driver.execute_script('return [window.innerWidth, window.innerHeight];')
+        return f'{width}x{height}'
+    
+    def audit_viewports(self, viewports, names, needs, deadline):
+        """Re-run the layout-dependent checks at each viewport on the page already loaded"""
+        layout_names = [name for name in names if CHECK_REGISTRY[name].layout]
+        if not layout_names:
+            return []
+        
+        primary = (self.check_status, self.check_timings, self.tab_order, self.snapshot)
+        issues = []
+        try:
+            for width, height in viewports:
+                label = f'{width}x{height}'
+                entry = {'viewport': label, 'width': width, 'height': height, 'primary': False}
+                self.viewports.append(entry)
+                started = time.monotonic()
+                self.report('viewport_started', viewport=label)
+                
+                # Emulation resizes in place: no reload, and media queries and resize handlers still fire
+                self.driver.execute_cdp_cmd('Emulation.setDeviceMetricsOverride', {
+                    'width': width,
+                    'height': height,
+                    'deviceScaleFactor': 1,
+                    'mobile': width <= VIEWPORT_MOBILE_MAX_WIDTH
+                })
+                entry['readiness'] = self.wait_until_ready(deadline, 'settled')
+                if REQUIRES_SCREENSHOT in needs:
+                    entry['screenshot'] = self.capture_screenshot(f'viewport_{label}')
+                if any(REQUIRES_SNAPSHOT in CHECK_REGISTRY[name].requires for name in layout_names):
+                    self.take_snapshot()
+                
+                self.check_status = {}
+                self.check_timings = self.timings.setdefault('viewports', {}).setdefault(label, {})
+                found = self.run_checks(layout_names, deadline, viewport=label)
+                entry['check_status'] = self.check_status
+                entry['issue_count'] = len(found)
+                entry['elapsed'] = round(time.monotonic() - started, 3)
+                issues.extend(found)
+        finally:
+            self.check_status, self.check_timings, self.tab_order, self.snapshot = primary
+            try:
+                self.driver.execute_cdp_cmd('Emulation.clearDeviceMetricsOverride', {})
+            except Exception:
+                pass
         
-        return screenshot_b64
+        return issues
+    
+    def fetch_ax_tree(self):
+        """Fetch the accessibility tree, or None so the checks fall back to the DOM snapshot"""
+        try:
+            return AXTree.fetch(self.driver)
+        except Exception as e:
+            print(f"Accessibility tree unavailable, using the DOM snapshot: {e}")
+            return None
+    
+    def take_snapshot(self):
+        """Collect the DOM snapshot used by the checks in a single round-trip"""
+        data = self.driver.execute_script(SNAPSHOT_SCRIPT, SNAPSHOT_TEXT_TAGS)
+        self.snapshot = DomSnapshot(data or {})
+        return self.snapshot
     
+    @register_check('color_contrast', 'color contrast', requires=(REQUIRES_SNAPSHOT,), layout=True)
     def check_color_contrast(self):
         """Check color contrast ratios"""
         issues = []
         
-        # Get all text elements
-        text_elements = self.driver.find_elements(By.XPATH, "//*[text()]")
+        nodes = []
+        colors = []
+        # (node, property, value) for text whose colors could not be read, reported rather than guessed
+        unevaluated = []
+        unresolved = None
+        for node in self.watched(self.snapshot.nodes):
+            if not (node['own_text'] and node['visible'] and DomSnapshot.text(node)):
+                continue
+            color = parse_css_color(node['color'])
+            if unresolved is None:
+                unresolved = unresolved_backgrounds(self.snapshot)
+            if color is None:
+                unevaluated.append((node, 'text color', node['color']))
+            elif unresolved[node['index']] >= 0:
+                layer = self.snapshot.nodes[unresolved[node['index']]]
+                unevaluated.append((node, 'background color', layer['background']))
+            else:
+                nodes.append(node)
+                colors.append(color)
+        self.inspected['color_contrast'] = len(nodes) + len(unevaluated)
         
-        for element in text_elements[:50]:  # Limit to avoid timeout
-            try:
-                # Get computed styles
-                text_color = self.driver.execute_script(
-                    "return window.getComputedStyle(arguments[0]).color;", element
-                )
-                bg_color = self.driver.execute_script(
-                    "return window.getComputedStyle(arguments[0]).backgroundColor;", element
-                )
-                font_size = self.driver.execute_script(
-                    "return window.getComputedStyle(arguments[0]).fontSize;", element
-                )
+        for node, prop, value in unevaluated:
+            issues.append({
+                'type': 'Contrast Not Evaluated',
+                'element': node['tag'],
+                'text': DomSnapshot.text(node)[:50],
+                'text_color': node['color'],
+                'severity': 'low',
+                'description': f'Unsupported {prop} {value!r}; check this contrast manually',
+                'rect': node.get('text_rect') or node['rect'],
+                **DomSnapshot.location(node)
+            })
+        
+        if not nodes:
+            return issues
+        
+        # Text is drawn over the element's own (already composited) background
+        backgrounds = effective_backgrounds(self.snapshot)[[node['index'] for node in nodes]]
+        foregrounds = composite(np.array(colors), backgrounds)
+        ratios = contrast_ratios(foregrounds, backgrounds)
+        
+        # Rendered pixels see images, gradients and overlays behind the text
+        pixel_ratios = None
+        if self.contrast_mode in ('pixels', 'both') and self.screenshot_pixels() is not None:
+            boxes = [node.get('text_rect') or node['rect'] for node in nodes]
+            pixel_ratios = pixel_contrast_ratios(self.screenshot_pixels(), boxes)
+            measured = ~np.isnan(pixel_ratios)
+            if self.contrast_mode == 'pixels':
+                ratios = np.where(measured, pixel_ratios, ratios)
+            else:
+                ratios = np.where(measured, np.minimum(ratios, pixel_ratios), ratios)
+        
+        failing = np.nonzero(ratios < 4.5)[0]  # WCAG AA standard
+        failing_backgrounds = np.rint(backgrounds[failing]).astype(int).tolist()
+        failing_rows = zip(failing.tolist(), ratios[failing].tolist(), failing_backgrounds)
+        for i, contrast_ratio, background in self.watched(failing_rows):
+            node = nodes[i]
+            issue = {
+                'type': 'Low Color Contrast',
+                'element': node['tag'],
+                'text': DomSnapshot.text(node)[:50],
+                'text_color': node['color'],
+                'bg_color': format_rgb(background),
+                'contrast_ratio': contrast_ratio,
+                'font_size': node['font_size'],
+                'severity': 'high' if contrast_ratio < 3 else 'medium',
+                'rect': node.get('text_rect') or node['rect'],
+                **DomSnapshot.location(node)
+            }
+            if pixel_ratios is not None and not np.isnan(pixel_ratios[i]):
+                issue['pixel_contrast_ratio'] = float(pixel_ratios[i])
+            issues.append(issue)
                 
-                # Check if element is visible
-                if element.is_displayed() and element.text.strip():
-                    contrast_ratio = self.calculate_contrast_ratio(text_color, bg_color)
-                    
-                    if contrast_ratio < 4.5:  # WCAG AA standard
-                        issues.append({
-                            'type': 'Low Color Contrast',
-                            'element': element.tag_name,
-                            'text': element.text[:50],
-                            'text_color': text_color,
-                            'bg_color': bg_color,
-                            'contrast_ratio': contrast_ratio,
-                            'font_size': font_size,
-                            'severity': 'high' if contrast_ratio < 3 else 'medium'
-                        })
-                        
-            except Exception as e:
-                continue
+        return issues
+    
+    def calculate_contrast_ratio(self, color1, color2):
+        """Calculate contrast ratio between two colors, or None if either cannot be parsed"""
+        foreground = parse_css_color(color1)
+        background = parse_css_color(color2)
+        if not foreground or not background:
+            return None
+        
+        background = composite(np.array([background]), np.array([CANVAS_COLOR[:3]]))
+        foreground = composite(np.array([foreground]), background)
+        return float(contrast_ratios(foreground, background)[0])
+    
+    @register_check('alt_text', 'alt text', static=True)
+    def check_alt_text(self):
+        """Check for missing or inadequate alt text"""
+        issues = []
+        
+        # Check images
+        images = self.snapshot.by_tag('img')
+        self.inspected['alt_text'] = len(images)
+        for img in self.watched(images):
+            alt_text = img['attrs'].get('alt')
+            src = img.get('src')
+            
+            if not alt_text:
+                issues.append({
+                    'type': 'Missing Alt Text',
+                    'element': 'img',
+                    'src': src,
+                    'severity': 'high',
+                    'rect': img['rect'],
+                    **DomSnapshot.location(img)
+                })
+            elif len(alt_text.strip()) < 3:
+                issues.append({
+                    'type': 'Inadequate Alt Text',
+                    'element': 'img',
+                    'src': src,
+                    'alt_text': alt_text,
+                    'severity': 'medium',
+                    'rect': img['rect'],
+                    **DomSnapshot.location(img)
+                })
+                
+        return issues
+    
+    @register_check('headings_structure', 'headings structure', requires=(REQUIRES_SNAPSHOT, REQUIRES_AX_TREE),
+                    static=True)
+    def check_headings_structure(self):
+        """Check heading hierarchy and structure"""
+        issues = []
+        
+        # (level, text, element) in document order
+        if self.ax_tree:
+            # Computed headings: role="heading" and aria-level count, hidden headings do not
+            headings = [(int(node['properties'].get('level') or 2), node['name'], self.ax_tree.element(node))
+                        for node in self.watched(self.ax_tree.by_role('heading'))]
+        else:
+            headings = [(int(node['tag'][1]), DomSnapshot.text(node), node)
+                        for node in self.watched(self.snapshot.by_tag('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))]
+        self.inspected['headings_structure'] = len(headings)
+        
+        if not headings:
+            issues.append({
+                'type': 'No Headings Found',
+                'severity': 'medium',
+                'description': 'Page has no heading elements'
+            })
+            return issues
+        
+        # Check for H1; framed documents have their own outline
+        h1_count = sum(1 for level, _, heading in headings if level == 1 and not heading.get('frame'))
+        if h1_count == 0:
+            issues.append({
+                'type': 'Missing H1',
+                'severity': 'high',
+                'description': 'Page should have exactly one H1 element'
+            })
+        elif h1_count > 1:
+            issues.append({
+                'type': 'Multiple H1',
+                'severity': 'medium',
+                'description': f'Page has {h1_count} H1 elements, should have only one'
+            })
+        
+        # Check heading hierarchy, separately for each framed document
+        previous_levels = {}
+        for level, text, heading in self.watched(headings):
+            previous_level = previous_levels.get(heading.get('frame', ''), 0)
+            if level > previous_level + 1:
+                issues.append({
+                    'type': 'Heading Hierarchy Skip',
+                    'element': heading['tag'],
+                    'text': text[:50],
+                    'severity': 'medium',
+                    'description': f'Heading level jumps from H{previous_level} to H{level}',
+                    'rect': heading['rect'],
+                    **DomSnapshot.location(heading)
+                })
+            previous_levels[heading.get('frame', '')] = level
+            
+        return issues
+    
+    @register_check('form_labels', 'form labels', requires=(REQUIRES_SNAPSHOT, REQUIRES_AX_TREE), static=True)
+    def check_form_labels(self):
+        """Check form inputs for proper labels"""
+        issues = []
+        
+        # (element, has_label) for every control that needs a name
+        if self.ax_tree:
+            # The browser's computed name covers label[for], wrapping labels and aria-labelledby, but a name
+            # that only comes from the placeholder or title is not a label
+            fields = [(self.ax_tree.element(node), bool(node['name']) and node['name_source'] in AX_LABEL_NAME_SOURCES)
+                      for node in self.watched(self.ax_tree.by_role(*AX_FORM_CONTROL_ROLES))]
+        else:
+            fields = []
+            for element in self.watched(self.snapshot.by_tag('input', 'textarea', 'select')):
+                if element.get('type') in ['hidden', 'submit', 'button']:
+                    continue
+                attrs = element['attrs']
+                labelledby = [self.snapshot.by_id(element, ref) for ref in attrs.get('aria-labelledby', '').split()]
+                has_label = bool(
+                    self.snapshot.labels_for(element)
+                    or self.snapshot.has_ancestor(element, ('label',))
+                    or attrs.get('aria-label', '').strip()
+                    or any(labelledby)
+                )
+                fields.append((element, has_label))
+        self.inspected['form_labels'] = len(fields)
+        
+        for element, has_label in self.watched(fields):
+            if not has_label:
+                issues.append({
+                    'type': 'Form Field Missing Label',
+                    'element': element['tag'],
+                    'element_type': element.get('type'),
+                    'severity': 'high',
+                    'rect': element['rect'],
+                    **DomSnapshot.location(element)
+                })
                 
         return issues
     
-    def calculate_contrast_ratio(self, color1, color2):
-        """Calculate contrast ratio between two colors"""
-        try:
-            # Parse RGB values
-            def parse_rgb(color_str):
-                if color_str.startswith('rgb('):
-                    return [int(x) for x in color_str[4:-1].split(',')]
-                elif color_str.startswith('rgba('):
-                    return [int(x) for x in color_str[5:-1].split(',')[:3]]
-                return [0, 0, 0]  # Default to black
-            
-            def relative_luminance(rgb):
-                r, g, b = [x/255.0 for x in rgb]
-                def gamma_correct(c):
-                    return c/12.92 if c <= 0.03928 else ((c+0.055)/1.055)**2.4
-                return 0.2126 * gamma_correct(r) + 0.7152 * gamma_correct(g) + 0.0722 * gamma_correct(b)
-            
-            rgb1 = parse_rgb(color1)
-            rgb2 = parse_rgb(color2)
-            
-            l1 = relative_luminance(rgb1)
-            l2 = relative_luminance(rgb2)
-            
-            lighter = max(l1, l2)
-            darker = min(l1, l2)
-            
-            return (lighter + 0.05) / (darker + 0.05)
-            
-        except:
-            return 1.0  # Default to failing ratio
-    
-    def check_alt_text(self):
-        """Check for missing or inadequate alt text"""
+    @register_check('keyboard_navigation', 'keyboard navigation', requires=(REQUIRES_DRIVER,), budget=60, layout=True)
+    def check_keyboard_navigation(self):
+        """Check for keyboard navigation issues"""
+        issues = []
+        
+        # Walk the whole tab order in one round-trip
+        report = self.driver.execute_script(KEYBOARD_AUDIT_SCRIPT) or {}
+        self.tab_order = report.get('elements') or []
+        self.inspected['keyboard_navigation'] = len(self.tab_order)
+        
+        missing_focus = [element for element in self.tab_order if not element['focus_visible']]
+        if missing_focus:
+            issues.append({
+                'type': 'Focus Visibility Issues',
+                'count': len(missing_focus),
+                'severity': 'high',
+                'description': f'{len(missing_focus)} elements lack visible focus indicators',
+                'elements': [
+                    {'selector': element['selector'], 'element': element['tag'], 'text': element['text'],
+                     **DomSnapshot.location(element)}
+                    for element in missing_focus
+                ]
+            })
+        
+        for element in self.tab_order:
+            if element.get('trap'):
+                issues.append({
+                    'type': 'Keyboard Focus Trap',
+                    'element': element['tag'],
+                    'selector': element['selector'],
+                    'text': element['text'],
+                    'severity': 'high',
+                    'description': element['trap'],
+                    'rect': element['rect'],
+                    **DomSnapshot.location(element)
+                })
+        
+        positive = [element for element in self.tab_order if element['tabindex'] > 0]
+        if positive:
+            issues.append({
+                'type': 'Positive Tabindex',
+                'count': len(positive),
+                'severity': 'medium',
+                'description': f'{len(positive)} elements use a positive tabindex, which overrides the natural focus order',
+                'elements': [{'selector': element['selector'], 'tabindex': element['tabindex'], **DomSnapshot.location(element)}
+                             for element in positive]
+            })
+        
+        return issues
+    
+    @register_check('semantic_markup', 'semantic markup', requires=(REQUIRES_SNAPSHOT, REQUIRES_AX_TREE), static=True)
+    def check_semantic_markup(self):
+        """Check for semantic HTML usage"""
+        issues = []
+        
+        # Check for landmark elements
+        landmarks = ['main', 'nav', 'header', 'footer', 'aside', 'section']
+        if self.ax_tree:
+            # Roles rather than tags: <div role="navigation"> counts, a <header> inside an <article> does not
+            found = {AX_LANDMARK_TAGS[node['role']] for node in self.ax_tree.by_role(*AX_LANDMARK_TAGS)}
+            navigation = self.ax_tree.by_role('navigation')
+            nav_lists = [
+                node for node in self.watched(navigation)
+                if any(child['role'] == 'list' and not child['ignored'] for child in self.ax_tree.descendants(node))
+            ]
+            self.inspected['semantic_markup'] = len(self.ax_tree.by_role(*AX_LANDMARK_TAGS, 'list'))
+        else:
+            found = {landmark for landmark in landmarks if self.snapshot.by_tag(landmark)}
+            navigation = self.snapshot.by_tag('nav')
+            nav_lists = [
+                node for node in self.watched(self.snapshot.by_tag('ul', 'ol'))
+                if self.snapshot.has_ancestor(node, ('nav',))
+            ]
+            self.inspected['semantic_markup'] = len(self.snapshot.by_tag(*landmarks, 'ul', 'ol'))
+        found_landmarks = [landmark for landmark in landmarks if landmark in found]
+        
+        if len(found_landmarks) < 3:
+            issues.append({
+                'type': 'Limited Semantic Markup',
+                'found_landmarks': found_landmarks,
+                'severity': 'medium',
+                'description': 'Page uses limited semantic HTML5 elements'
+            })
+        
+        # Check for lists used for navigation
+        if navigation:
+            if not nav_lists:
+                issues.append({
+                    'type': 'Navigation Not Using Lists',
+                    'severity': 'low',
+                    'description': 'Navigation elements should use list markup'
+                })
+        
+        return issues
+    
+    @register_check('aria_attributes', 'ARIA attributes', requires=(REQUIRES_SNAPSHOT, REQUIRES_AX_TREE), static=True)
+    def check_aria_attributes(self):
+        """Check ARIA attributes usage"""
         issues = []
+        source = self.ax_tree or self.snapshot
+        
+        # (element, lacks a role) for elements with an aria-label
+        if self.ax_tree:
+            # Generic containers may not be named, so browsers drop the label
+            labelled = []
+            for node in self.watched(self.ax_tree.walk()):
+                element = self.ax_tree.element(node)
+                if 'aria-label' in element['attrs']:
+                    labelled.append((element, node['role'] in AX_GENERIC_ROLES))
+            referencing = [element for element in self.watched(self.ax_tree.elements.values())
+                           if 'aria-labelledby' in element['attrs']]
+        else:
+            labelled = [
+                (element, not element['attrs'].get('role') and element['tag'] in ['div', 'span'])
+                for element in self.watched(self.snapshot.with_attr('aria-label'))
+            ]
+            referencing = self.snapshot.with_attr('aria-labelledby')
+        self.inspected['aria_attributes'] = len(labelled) + len(referencing)
+        
+        # Check for elements with aria-label but no role
+        for element, roleless in self.watched(labelled):
+            if roleless:
+                issues.append({
+                    'type': 'ARIA Label Without Role',
+                    'element': element['tag'],
+                    'aria_label': element['attrs'].get('aria-label'),
+                    'severity': 'medium',
+                    'rect': element['rect'],
+                    **DomSnapshot.location(element)
+                })
+        
+        # aria-labelledby ids must exist in the same document or shadow root
+        for element in self.watched(referencing):
+            ids = element['attrs']['aria-labelledby'].split()
+            missing = [element_id for element_id in ids if source.by_id(element, element_id) is None]
+            if missing:
+                issues.append({
+                    'type': 'ARIA Reference To Missing Id',
+                    'element': element['tag'],
+                    'aria_labelledby': element['attrs']['aria-labelledby'],
+                    'missing_ids': missing,
+                    'severity': 'high' if len(missing) == len(ids) else 'medium',
+                    'description': f"aria-labelledby points at ids that do not exist: {', '.join(missing)}",
+                    'rect': element['rect'],
+                    **DomSnapshot.location(element)
+                })
         
-        # Check images
-        images = self.driver.find_elements(By.TAG_NAME, "img")
-        for img in images:
-            try:
-                alt_text = img.get_attribute("alt")
-                src = img.get_attribute("src")
-                
-                if not alt_text:
-                    issues.append({
-                        'type': 'Missing Alt Text',
-                        'element': 'img',
-                        'src': src,
-                        'severity': 'high'
-                    })
-                elif len(alt_text.strip()) < 3:
-                    issues.append({
-                        'type': 'Inadequate Alt Text',
-                        'element': 'img',
-                        'src': src,
-                        'alt_text': alt_text,
-                        'severity': 'medium'
-                    })
-                    
-            except Exception as e:
-                continue
-                
         return issues
     
-    def check_headings_structure(self):
-        """Check heading hierarchy and structure"""
+    @register_check('page_structure', 'page structure', static=True)
+    def check_page_structure(self):
+        """Check overall page structure"""
         issues = []
         
-        headings = self.driver.find_elements(By.XPATH, "//h1 | //h2 | //h3 | //h4 | //h5 | //h6")
+        # Check for skip links
+        links = self.snapshot.by_tag('a')
+        self.inspected['page_structure'] = len(links)
+        skip_links = [link for link in self.watched(links) if '#' in link['attrs'].get('href', '')]
+        has_skip_link = any('skip' in DomSnapshot.text(link).lower() for link in skip_links)
         
-        if not headings:
+        if not has_skip_link:
             issues.append({
-                'type': 'No Headings Found',
+                'type': 'Missing Skip Link',
                 'severity': 'medium',
-                'description': 'Page has no heading elements'
+                'description': 'Page should have a skip to main content link'
             })
-            return issues
         
-        # Check for H1
-        h1_elements = self.driver.find_elements(By.TAG_NAME, "h1")
-        if len(h1_elements) == 0:
+        # Check page title
+        title = self.snapshot.title
+        if not title or len(title.strip()) < 3:
             issues.append({
-                'type': 'Missing H1',
-                'severity': 'high',
-                'description': 'Page should have exactly one H1 element'
+                'type': 'Missing or Inadequate Page Title',
+                'current_title': title,
+                'severity': 'high'
             })
-        elif len(h1_elements) > 1:
+        
+        # Check for language attribute
+        if not self.snapshot.lang:
             issues.append({
-                'type': 'Multiple H1',
+                'type': 'Missing Language Attribute',
                 'severity': 'medium',
-                'description': f'Page has {len(h1_elements)} H1 elements, should have only one'
+                'description': 'HTML element should have lang attribute'
             })
         
-        # Check heading hierarchy
-        previous_level = 0
-        for heading in headings:
-            level = int(heading.tag_name[1])
-            if level > previous_level + 1:
-                issues.append({
-                    'type': 'Heading Hierarchy Skip',
-                    'element': heading.tag_name,
-                    'text': heading.text[:50],
-                    'severity': 'medium',
-                    'description': f'Heading level jumps from H{previous_level} to H{level}'
-                })
-            previous_level = level
-            
         return issues
     
-    def check_form_labels(self):
-        """Check form inputs for proper labels"""
-        issues = []
-        
-        # Get form elements separately to avoid XPath issues
-        form_elements = []
-        form_elements.extend(self.driver.find_elements(By.TAG_NAME, "input"))
-        form_elements.extend(self.driver.find_elements(By.TAG_NAME, "textarea"))
-        form_elements.extend(self.driver.find_elements(By.TAG_NAME, "select"))
+    def generate_ai_summary(self, all_issues, url, timeout=None):
+        """Generate AI summary of accessibility issues while the caller waits, relaying the tokens as progress"""
+        try:
+            summary, usage = generate_summary(all_issues, timeout=timeout,
+                                              on_delta=lambda text: self.report('summary_delta', text=text))
+            if usage:
+                self.timings['openai'] = usage
+            return summary
+            
+        except Exception as e:
+            return f"Error generating AI summary: {str(e)}"
+    
+    def watched(self, items):
+        """Iterate items for a check, stopping it once its budget has run out"""
+        expires = getattr(self._running, 'expires', None)
+        for item in items:
+            if expires is not None and time.monotonic() >= expires:
+                raise CheckCancelled('Stopped after its budget ran out')
+            yield item
+    
+    def run_checks(self, names, deadline=None, viewport=None):
+        """Run the named checks and return their issues in registry order
+
+        Every check gets its own time budget, cut short by the deadline.
+        Checks that overrun are recorded as timed out in self.check_status,
+        so the issues of the other checks survive, and stop at their next
+        watched() step; their workers stay busy until they have.
+        """
+        deadline = deadline or Deadline(TEST_DEADLINE_SECONDS)
+        specs = [CHECK_REGISTRY[name] for name in names]
+        positions = {spec.name: position for position, spec in enumerate(specs, start=1)}
+        issues_by_check = {}
+        durations = {}
+        begun = {}
+        finished = threading.Lock()
         
-        for element in form_elements:
+        def run(spec):
+            # The budget starts when a worker picks the check up, not while it waits for one
+            begun[spec.name] = time.monotonic()
+            if deadline.expired():
+                raise CheckCancelled('Test deadline reached before the check started')
+            self._running.expires = min(begun[spec.name] + spec.budget, deadline.expires)
+            self.report('check_started', check=spec.name, label=spec.label,
+                        position=positions[spec.name], total=len(specs), viewport=viewport)
+            commands = self.command_count()
             try:
-                element_type = element.get_attribute("type")
-                if element_type in ['hidden', 'submit', 'button']:
+                return getattr(self, spec.method)()
+            finally:
+                self._running.expires = None
+                durations[spec.name] = time.monotonic() - begun[spec.name]
+                # Snapshot readers make no round-trips; only live-driver checks are counted
+                if REQUIRES_DRIVER in spec.requires:
+                    self.check_timings.setdefault(spec.name, {})['webdriver_commands'] = self.command_count() - commands
+        
+        def finish(spec, status, started, issues=None, error=None):
+            # A check is finished once, by whichever of its worker or the deadline gets there first
+            with finished:
+                if spec.name in issues_by_check:
+                    return
+                issues_by_check[spec.name] = issues or []
+            for issue in issues or []:
+                issue['check'] = spec.name
+                if viewport and spec.layout:
+                    issue['viewport'] = viewport
+                # Link issues to the part of the screenshot showing the element
+                if self.screenshot and issue.get('rect') and issue['rect'][2] and issue['rect'][3]:
+                    issue['screenshot_crop'] = crop_url(self.screenshot, issue['rect'])
+            self.check_status[spec.name] = {
+                'status': status,
+                'elapsed': round(durations.get(spec.name, time.monotonic() - started), 3),
+                'issue_count': len(issues or [])
+            }
+            if error:
+                self.check_status[spec.name]['error'] = error
+            
+            timing = self.check_timings.setdefault(spec.name, {})
+            timing.setdefault('webdriver_commands', 0)
+            timing['seconds'] = self.check_status[spec.name]['elapsed']
+            timing['elements_inspected'] = self.inspected.get(spec.name, 0)
+            metrics.observe('accessibility_check_seconds', timing['seconds'], check=spec.name, status=status)
+            metrics.inc('accessibility_elements_inspected_total', timing['elements_inspected'], check=spec.name)
+            if timing['webdriver_commands']:
+                metrics.inc('accessibility_webdriver_commands_total', timing['webdriver_commands'], check=spec.name)
+            # Listeners get each check's issues as soon as it finishes
+            self.report('check_completed', check=spec.name, label=spec.label,
+                        position=positions[spec.name], total=len(specs),
+                        issue_count=len(issues or []), status=status, issues=issues or [], viewport=viewport)
+        
+        def finish_future(spec):
+            def callback(future):
+                if future.cancelled():
+                    return
+                started = begun.get(spec.name, time.monotonic())
+                if future.exception() is None:
+                    finish(spec, 'completed', started, future.result())
+                elif isinstance(future.exception(), CheckCancelled):
+                    finish(spec, 'timed_out', started, error=expiry(spec)[1])
+                else:
+                    finish(spec, 'failed', started, error=str(future.exception()))
+            return callback
+        
+        def expiry(spec):
+            """When a pooled check runs out of time, and the error to report then"""
+            if spec.name not in begun:
+                return deadline.expires, 'Test deadline reached before the check started'
+            expires = min(begun[spec.name] + spec.budget, deadline.expires)
+            return expires, f'Exceeded its {expires - begun[spec.name]:.0f}s budget'
+        
+        # Snapshot readers run concurrently, on a pool of this test's own, while live-driver
+        # checks take turns; each is reported the moment it finishes
+        pooled = [spec for spec in specs if REQUIRES_DRIVER not in spec.requires]
+        executor = ThreadPoolExecutor(max_workers=CHECK_WORKERS, thread_name_prefix='check') if pooled else None
+        futures = {}
+        for spec in pooled:
+            future = executor.submit(run, spec)
+            future.add_done_callback(finish_future(spec))
+            futures[spec.name] = future
+        
+        try:
+            for spec in specs:
+                if REQUIRES_DRIVER not in spec.requires:
                     continue
-                
-                # Check for label
-                element_id = element.get_attribute("id")
-                aria_label = element.get_attribute("aria-label")
-                aria_labelledby = element.get_attribute("aria-labelledby")
-                
-                has_label = False
-                
-                if element_id:
-                    labels = self.driver.find_elements(By.XPATH, f"//label[@for='{element_id}']")
-                    if labels:
-                        has_label = True
-                
-                if aria_label or aria_labelledby:
-                    has_label = True
-                
-                if not has_label:
-                    issues.append({
-                        'type': 'Form Field Missing Label',
-                        'element': element.tag_name,
-                        'element_type': element_type,
-                        'severity': 'high'
-                    })
-                    
+                started = time.monotonic()
+                budget = deadline.budget(spec.budget)
+                if budget <= 0:
+                    finish(spec, 'timed_out', started, error='Test deadline reached before the check started')
+                    continue
+                try:
+                    # Bounds in-page scripts, so a hung execute_script cannot stall the test
+                    self.driver.set_script_timeout(budget)
+                    finish(spec, 'completed', started, run(spec))
+                except (TimeoutException, CheckCancelled):
+                    finish(spec, 'timed_out', started, error=f'Exceeded its {budget:.0f}s budget')
+                except Exception as e:
+                    finish(spec, 'failed', started, error=str(e))
+                finally:
+                    try:
+                        self.driver.set_script_timeout(DEFAULT_SCRIPT_TIMEOUT)
+                    except Exception:
+                        pass
+            
+            pending = dict(futures)
+            abandoned = {}
+            while pending:
+                now = time.monotonic()
+                for name, future in list(pending.items()):
+                    spec = CHECK_REGISTRY[name]
+                    if future.done():
+                        # Its done callback may still be on the way; finishing twice is a no-op
+                        finish_future(spec)(future)
+                        del pending[name]
+                        continue
+                    expires, error = expiry(spec)
+                    if now >= expires:
+                        future.cancel()
+                        finish(spec, 'timed_out', begun.get(name, now), error=error)
+                        del pending[name]
+                        abandoned[name] = future
+                if pending:
+                    # Poll as well, since a queued check's budget only becomes known once it starts
+                    timeout = min(min(expiry(CHECK_REGISTRY[name])[0] for name in pending) - now, CHECK_POLL_SECONDS)
+                    wait(list(pending.values()), timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+            
+            # Timed-out checks stop at their next watched() step; say so if one has not yet
+            if abandoned:
+                wait(list(abandoned.values()), timeout=CHECK_STOP_GRACE_SECONDS)
+                for name, future in abandoned.items():
+                    if future.running():
+                        self.check_status[name]['still_running'] = True
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+        
+        return [issue for spec in specs for issue in issues_by_check[spec.name]]
+    
+    def requirements(self, names):
+        needs = {requirement for name in names for requirement in CHECK_REGISTRY[name].requires}
+        if 'color_contrast' in names and self.contrast_mode != 'computed':
+            needs.add(REQUIRES_SCREENSHOT)
+        return needs
+    
+    def build_results(self, url, names, all_issues, summary, deadline):
+        """Organize results, including whatever finished before a failure"""
+        # Checks that never ran are reported rather than silently dropped
+        for name in names:
+            if name not in self.check_status:
+                self.check_status[name] = {
+                    'status': 'timed_out' if deadline.expired() else 'failed',
+                    'elapsed': 0.0,
+                    'issue_count': 0,
+                    'error': 'Not run'
+                }
+        self.check_status = {name: self.check_status[name] for name in names}
+        fingerprint_issues(all_issues)
+        
+        return {
+            'run_id': uuid.uuid4().hex,
+            'url': url,
+            'timestamp': datetime.now().isoformat(),
+            'total_issues': len(all_issues),
+            'issues_by_severity': {
+                'high': len([i for i in all_issues if i.get('severity') == 'high']),
+                'medium': len([i for i in all_issues if i.get('severity') == 'medium']),
+                'low': len([i for i in all_issues if i.get('severity') == 'low'])
+            },
+            'checks': names,
+            'check_status': self.check_status,
+            'issues': all_issues,
+            'tab_order': self.tab_order,
+            'mode': self.mode,
+            'readiness': self.readiness,
+            'network_profile': self.network_profile,
+            'viewports': self.viewports,
+            'screenshots': self.screenshots,
+            'ai_summary': summary,
+            'elapsed_seconds': round(deadline.elapsed(), 3),
+            'deadline_seconds': deadline.seconds,
+            'cached': False
+        }
+    
+    def run_full_test(self, url, diff=False, **options):
+        """Run comprehensive accessibility test and record it in the history"""
+        results = self.audit(url, **options)
+        if self.summary_mode == 'async' and 'error' not in results:
+            # The issues go out now; the summary streams from summary_url and is never part of a cached result
+            results['summary_status'] = 'pending'
+            results['summary_url'] = f"/summaries/{results['run_id']}"
+        
+        if history_store and not results.get('cached'):
+            try:
+                history_store.record(results)
             except Exception as e:
-                continue
+                print(f"Failed to record run history: {e}")
+        
+        # Started once the run is on record, so the finished summary has a history row to land in
+        if results.get('summary_status') == 'pending':
+            if results.get('cached'):
+                # A cached result keeps the run_id it was recorded under, so it shares that run's summary
+                results.update(reuse_summary(results['run_id'], results['url'], results['issues']))
+                results['summary_reused'] = True
+            else:
+                results.update(summary_manager.submit(results['run_id'], results['url'], results['issues']).state())
+            self.report('summary_pending', run_id=results['run_id'], summary_url=results['summary_url'])
+        
+        # Repeat audits only need what changed since the previous run
+        delta = history_store.diff(results['run_id']) if diff and history_store and results.get('run_id') else None
+        if delta is None:
+            return results
+        for key in ('cached', 'error', 'timings', 'ai_summary', 'summary_status', 'summary_url', 'summary_reused'):
+            if key in results:
+                delta[key] = results[key]
+        return delta
+    
+    def audit(self, url, force=False, contrast_mode='computed', checks=None, ai_summary=True,
+              deadline=None, timings=False, readiness=READINESS_MODE, network_profile=NETWORK_PROFILE, viewports=None,
+              mode='full'):
+        """Run the checks against a page, serving unchanged pages from the cache"""
+        pool = self.pool or driver_pool
+        deadline = Deadline(min(deadline or TEST_DEADLINE_SECONDS, TEST_MAX_DEADLINE_SECONDS))
+        self.mode = mode
+        self.summary_mode = summary_mode(ai_summary)
+        self.contrast_mode = contrast_mode
+        self.network_profile = network_profile if mode == 'full' else None
+        self.check_status = {}
+        # A targeted run only pays for the checks (and data) it asks for
+        names = [name for name in CHECK_REGISTRY if checks is None or name in checks]
+        if mode == 'quick':
+            # No browser: only markup checks, on a snapshot parsed from the served HTML
+            names = [name for name in names if CHECK_REGISTRY[name].static]
+            needs = set()
+            viewports = None
+        else:
+            needs = self.requirements(names)
+            if checks is None:
+                needs.add(REQUIRES_SCREENSHOT)
+        variant = {'contrast_mode': contrast_mode, 'checks': names, 'ai_summary': self.summary_mode,
+                   'readiness': readiness, 'network_profile': self.network_profile, 'viewports': viewports,
+                   'mode': mode}
+        cache = None if force else result_cache
+        cache_key = None
+        lease = None
+        all_issues = []
+        summary = None
+        results = None
+        try:
+            # Unchanged pages (same ETag/Last-Modified) are answered from the cache
+            if cache:
+                with self.timed('cache_lookup'):
+                    validator = fetch_http_validator(url)
+                if validator:
+                    cache_key = cache.key(url, validator, variant)
+                    results = cache.get(cache_key)
+                    if results:
+                        return results
+            
+            page_hash = None
+            if mode == 'quick':
+                self.report('page_loading', url=url)
+                with self.timed('fetch'):
+                    self.snapshot, page_hash = fetch_static_snapshot(
+                        url, timeout=max(deadline.budget(STATIC_FETCH_TIMEOUT_SECONDS), 1)
+                    )
+                page_hash = 'html:' + page_hash
+            else:
+                # Borrow a warm browser instead of launching one per test
+                with self.timed('driver_acquire'):
+                    lease = pool.acquire(timeout=deadline.budget(pool.checkout_timeout))
+                self.driver = lease.driver
+                self.report('page_loading', url=url)
+                with self.timed('page_load'):
+                    self.apply_network_profile(network_profile)
+                    self.driver.set_page_load_timeout(max(deadline.budget(PAGE_LOAD_TIMEOUT_SECONDS), 1))
+                    try:
+                        self.driver.get(url)
+                    except TimeoutException:
+                        # Audit whatever has rendered so far rather than giving up
+                        self.driver.execute_script('window.stop();')
                 
-        return issues
+                # Wait until the page has rendered and gone quiet, not just until <body> exists
+                with self.timed('page_ready'):
+                    self.readiness = self.wait_until_ready(deadline, readiness)
+            
+            # Without HTTP validators, fall back to a hash of the served HTML or rendered DOM
+            if cache and not cache_key:
+                if page_hash is None:
+                    with self.timed('dom_hash'):
+                        dom = self.driver.execute_script('return document.documentElement.outerHTML;') or ''
+                    page_hash = 'dom:' + hashlib.sha256(dom.encode('utf-8')).hexdigest()
+                cache_key = cache.key(url, page_hash, variant)
+                results = cache.get(cache_key)
+                if results:
+                    return results
+            
+            # Capture initial screenshot
+            if REQUIRES_SCREENSHOT in needs:
+                with self.timed('screenshot'):
+                    self.capture_screenshot("initial_page")
+            
+            # Collect everything the checks need in one round-trip
+            if REQUIRES_SNAPSHOT in needs:
+                with self.timed('snapshot'):
+                    self.driver.set_script_timeout(max(deadline.budget(CHECK_BUDGET_SECONDS), 1))
+                    self.take_snapshot()
+            
+            # The computed accessibility tree of every frame, in bulk, for the naming and structure checks
+            if REQUIRES_AX_TREE in needs:
+                with self.timed('ax_tree'):
+                    self.ax_tree = self.fetch_ax_tree()
+            
+            # Run the selected tests
+            primary_viewport = None
+            if viewports:
+                primary_viewport = self.current_viewport()
+                self.viewports.append({'viewport': primary_viewport, 'primary': True})
+            all_issues = self.run_checks(names, deadline, viewport=primary_viewport)
+            
+            # Other viewports reuse this page load and re-run only what depends on layout
+            extra = [viewport for viewport in viewports or [] if f'{viewport[0]}x{viewport[1]}' != primary_viewport]
+            if extra:
+                with self.timed('viewports'):
+                    all_issues += self.audit_viewports(extra, names, needs, deadline)
+            
+            # Generate AI summary here only when the caller asked to wait for it
+            if self.summary_mode == 'sync':
+                if deadline.remaining() < AI_SUMMARY_MIN_SECONDS:
+                    summary = "AI summary skipped: test deadline reached"
+                else:
+                    self.report('summary_started')
+                    with self.timed('ai_summary'):
+                        summary = self.generate_ai_summary(all_issues, url, timeout=deadline.remaining())
+                self.report('summary_completed', ai_summary=summary)
+            
+            results = self.build_results(url, names, all_issues, summary, deadline)
+            
+            # Only complete runs are worth serving again
+            statuses = list(self.check_status.values())
+            statuses += [status for entry in self.viewports for status in entry.get('check_status', {}).values()]
+            if cache_key and all(status['status'] == 'completed' for status in statuses):
+                cache.set(cache_key, results)
+            
+            return results
+            
+        except Exception as e:
+            results = self.build_results(url, names, all_issues, summary, deadline)
+            results['error'] = str(e)
+            return results
+            
+        finally:
+            if lease:
+                pool.release(lease)
+            self.driver = None
+            self.timings['total_seconds'] = round(deadline.elapsed(), 4)
+            metrics.observe('accessibility_phase_seconds', deadline.elapsed(), phase='total')
+            if results is None or 'error' in results:
+                outcome = 'error'
+            else:
+                outcome = 'cached' if results.get('cached') else 'ok'
+            metrics.inc('accessibility_tests_total', outcome=outcome)
+            if timings and results is not None:
+                results['timings'] = self.timings
+
+driver_pool = DriverPool()
+atexit.register(driver_pool.close)
+metrics.gauge('accessibility_driver_pool', 'WebDriver pool capacity and occupancy',
+              lambda: [({'state': state}, value) for state, value in driver_pool.stats().items()])
+
+# Admission control settings
+ADMISSION_MAX_QUEUE = int(os.getenv('ADMISSION_MAX_QUEUE', str(DRIVER_POOL_SIZE * 4)))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_SECONDS', str(DRIVER_CHECKOUT_TIMEOUT)))
+ADMISSION_MIN_FREE_MEMORY_MB = int(os.getenv('ADMISSION_MIN_FREE_MEMORY_MB', '512'))
+ADMISSION_MEMORY_POLL_SECONDS = 1
+ADMISSION_DEFAULT_TEST_SECONDS = 30
+
+
+def read_int_file(path):
+    try:
+        with open(path) as handle:
+            return int(handle.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def memory_available_mb():
+    """Memory left for new browsers: the tighter of the host and the container (cgroup) limit"""
+    available = []
+    try:
+        with open('/proc/meminfo') as handle:
+            for line in handle:
+                if line.startswith('MemAvailable:'):
+                    available.append(int(line.split()[1]) / 1024)
+                    break
+    except (OSError, ValueError):
+        pass
+    for limit_path, usage_path in (('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory.current'),
+                                   ('/sys/fs/cgroup/memory/memory.limit_in_bytes',
+                                    '/sys/fs/cgroup/memory/memory.usage_in_bytes')):
+        limit, usage = read_int_file(limit_path), read_int_file(usage_path)
+        # "max" and the v1 no-limit sentinel do not parse or are absurdly large
+        if limit and usage is not None and limit < 1 << 60:
+            available.append((limit - usage) / (1024 * 1024))
+            break
+    return min(available) if available else None
+
+
+class AdmissionRejected(Exception):
+    """Raised when no place in the test queue is free; retry_after is a hint in seconds"""
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """A place in the test queue, then the browser sessions held while the test runs"""
+    def __init__(self, controller, weight):
+        self.controller = controller
+        self.weight = weight
+        self.state = 'queued'
+        self.started = None
+    
+    def __enter__(self):
+        self.controller.start(self)
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.release()
+    
+    def release(self):
+        """Give back the queue place or the sessions; safe to call more than once"""
+        self.controller.release(self)
+
+
+class AdmissionController:
+    """Caps concurrent browser sessions at the pool size and bounds the queue in front of them
+
+    Tests beyond the pool size wait in the queue; once the queue is full,
+    new tests are refused so a burst cannot launch Chrome after Chrome.
+    A test also waits while free memory is below the floor, unless nothing
+    else is running.
+    """
+    def __init__(self, capacity, max_queue=ADMISSION_MAX_QUEUE, queue_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS,
+                 min_free_memory_mb=ADMISSION_MIN_FREE_MEMORY_MB):
+        self.capacity = max(capacity, 1)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.min_free_memory_mb = min_free_memory_mb
+        self.running = 0
+        self.queued = 0
+        self.rejected = 0
+        self.average_seconds = ADMISSION_DEFAULT_TEST_SECONDS
+        self._cond = threading.Condition()
+    
+    def admit(self, weight=1):
+        """Take a place in the queue, or raise AdmissionRejected when it is full"""
+        with self._cond:
+            self._refuse_if_full()
+            self.queued += 1
+        return AdmissionTicket(self, max(1, min(weight, self.capacity)))
+    
+    def check(self, waiting=0):
+        """Raise AdmissionRejected if the queue is full, counting tests about to join it, without queueing"""
+        with self._cond:
+            self._refuse_if_full(waiting)
+    
+    def _refuse_if_full(self, waiting=0):
+        queued = self.queued + waiting
+        # Tests that can start at once do not count against the queue
+        if queued >= self.max_queue + max(self.capacity - self.running, 0):
+            self.rejected += 1
+            metrics.inc('accessibility_admission_rejected_total', reason='queue_full')
+            raise AdmissionRejected(f'Test queue is full ({queued} waiting)', self.retry_after(waiting))
+    
+    def start(self, ticket):
+        """Wait until the ticket's sessions fit in the capacity and memory allows another browser"""
+        until = time.monotonic() + self.queue_timeout
+        with self._cond:
+            while not self._has_room(ticket.weight):
+                remaining = until - time.monotonic()
+                if remaining <= 0:
+                    self.queued -= 1
+                    ticket.state = 'released'
+                    self.rejected += 1
+                    self._cond.notify_all()
+                    metrics.inc('accessibility_admission_rejected_total', reason='queue_timeout')
+                    raise AdmissionRejected(f'No browser capacity after {self.queue_timeout:.0f}s in the queue',
+                                            self.retry_after())
+                # Memory is polled, since nothing signals when it frees up
+                self._cond.wait(min(remaining, ADMISSION_MEMORY_POLL_SECONDS))
+            self.queued -= 1
+            self.running += ticket.weight
+            ticket.state = 'running'
+            ticket.started = time.monotonic()
+    
+    def release(self, ticket):
+        with self._cond:
+            if ticket.state == 'queued':
+                self.queued -= 1
+            elif ticket.state == 'running':
+                self.running -= ticket.weight
+                # Moving average of test duration, for Retry-After
+                elapsed = time.monotonic() - ticket.started
+                self.average_seconds = 0.8 * self.average_seconds + 0.2 * elapsed
+            else:
+                return
+            ticket.state = 'released'
+            self._cond.notify_all()
+    
+    def _has_room(self, weight):
+        if self.running + weight > self.capacity:
+            return False
+        if self.running and self.min_free_memory_mb:
+            available = memory_available_mb()
+            if available is not None and available < self.min_free_memory_mb:
+                return False
+        return True
+    
+    def retry_after(self, waiting=0):
+        """Seconds until the queue has likely drained enough to take another test"""
+        return max(1, math.ceil(self.average_seconds * (self.queued + waiting + 1) / self.capacity))
+    
+    def stats(self):
+        with self._cond:
+            return {
+                'capacity': self.capacity,
+                'running': self.running,
+                'queued': self.queued,
+                'queue_limit': self.max_queue,
+                'rejected': self.rejected,
+                'memory_available_mb': round(memory_available_mb() or 0)
+            }
+
+
+admission = AdmissionController(driver_pool.size)
+metrics.counter('accessibility_admission_rejected_total', 'Tests refused by admission control, by reason')
+metrics.gauge('accessibility_admission', 'Browser sessions in use, tests waiting and their limits',
+              lambda: [({'state': state}, value) for state, value in admission.stats().items() if state != 'rejected'])
+
+
+def admit_test(options, weight=1):
+    """Queue a test for a browser; quick mode needs none and is not queued"""
+    if (options or {}).get('mode') == 'quick':
+        return None
+    return admission.admit(weight)
+
+
+def check_admission(options):
+    """Refuse a job up front when the queue is full; it takes its place once a job worker runs it"""
+    if (options or {}).get('mode') != 'quick':
+        admission.check(job_manager.waiting())
+
+
+def admission_error(error):
+    """429 response telling the client when to retry"""
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after, 'admission': admission.stats()})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+
+# Browsers are launched after the worker is up, not while it imports
+driver_pool_warmed = threading.Event()
+
+
+@app.before_request
+def warm_driver_pool():
+    if DRIVER_POOL_PREWARM and not driver_pool_warmed.is_set():
+        driver_pool_warmed.set()
+        driver_pool.warm()
+
+# Background job settings
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', str(DRIVER_POOL_SIZE)))
+JOB_RETENTION_SECONDS = int(os.getenv('JOB_RETENTION_SECONDS', '3600'))
+# Crawls run for minutes, so they get their own workers instead of holding up single-page tests
+CRAWL_JOB_WORKERS = int(os.getenv('CRAWL_JOB_WORKERS', '1'))
+SSE_KEEPALIVE_SECONDS = 15
+
+
+class Job:
+    """A queued or running accessibility test and its progress events"""
+    def __init__(self, url, options=None):
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.options = options or {}
+        self.status = 'queued'
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+        self.events = []
+        self.runner = None
+    
+    def to_dict(self, include_result=True):
+        data = {
+            'id': self.id,
+            'url': self.url,
+            'status': self.status,
+            'created': datetime.fromtimestamp(self.created).isoformat(),
+            'started': datetime.fromtimestamp(self.started).isoformat() if self.started else None,
+            'finished': datetime.fromtimestamp(self.finished).isoformat() if self.finished else None,
+        }
+        if self.error:
+            data['error'] = self.error
+        if include_result and self.result is not None:
+            data['result'] = self.result
+        return data
+
+
+class JobManager:
+    """Runs accessibility tests on an in-process worker pool"""
+    def __init__(self, workers=JOB_WORKERS, crawl_workers=CRAWL_JOB_WORKERS, retention=JOB_RETENTION_SECONDS):
+        self.retention = retention
+        self._executors = {
+            'test': ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job'),
+            'crawl': ThreadPoolExecutor(max_workers=crawl_workers, thread_name_prefix='crawl-job')
+        }
+        self._jobs = {}
+        self._cond = threading.Condition()
+    
+    def submit(self, url, options=None, runner=None, queue='test'):
+        """Queue a test of url; runner(progress) replaces the single-page test for other kinds of job"""
+        job = Job(url, options)
+        job.runner = runner
+        with self._cond:
+            self._expire()
+            self._jobs[job.id] = job
+        self._publish(job, 'queued', {'url': url})
+        self._executors[queue].submit(self._run, job)
+        return job
+    
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+    
+    def waiting(self):
+        """Single-page tests still waiting for a job worker (and so not yet in the admission queue)"""
+        with self._cond:
+            return sum(1 for job in self._jobs.values() if job.status == 'queued' and not job.runner)
+    
+    def follow(self, job, last_id=0, keepalive=SSE_KEEPALIVE_SECONDS):
+        """Yield the job's events after last_id until it finishes (None = keepalive)"""
+        while True:
+            with self._cond:
+                if len(job.events) <= last_id and job.finished is None:
+                    self._cond.wait(keepalive)
+                pending = job.events[last_id:]
+                done = job.finished is not None
+            
+            if not pending and not done:
+                yield None
+            for event in pending:
+                yield event
+            last_id += len(pending)
+            if done and last_id >= len(job.events):
+                return
+    
+    def _run(self, job):
+        with self._cond:
+            job.status = 'running'
+            job.started = time.time()
+        self._publish(job, 'started', {'url': job.url})
+        
+        try:
+            progress = lambda event, data: self._publish(job, event, data)
+            if job.runner:
+                result = job.runner(progress)
+            else:
+                # The queue place is taken by the worker, so waiting for a job thread does not use up the queue wait
+                with admit_test(job.options) or nullcontext():
+                    result = AccessibilityTester(progress=progress).run_full_test(job.url, **job.options)
+        except AdmissionRejected as e:
+            result = {'error': str(e), 'retry_after': e.retry_after}
+        except Exception as e:
+            result = {'error': str(e)}
+        
+        with self._cond:
+            job.result = result
+            job.error = result.get('error')
+            job.status = 'failed' if job.error else 'completed'
+            job.finished = time.time()
+        self._publish(job, job.status, {'error': job.error} if job.error else {
+            'total_issues': result.get('total_issues'),
+            'issues_by_severity': result.get('issues_by_severity')
+        })
+    
+    def _publish(self, job, event, data):
+        # Listeners serialize events on their own threads while the test keeps annotating its issues
+        data = copy.deepcopy(data)
+        with self._cond:
+            job.events.append({'id': len(job.events) + 1, 'event': event, 'data': data})
+            self._cond.notify_all()
+    
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished < cutoff]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
+
+
+class SummaryRun:
+    """The AI summary of one test run, generated after its results were returned"""
+    def __init__(self, run_id, url):
+        self.run_id = run_id
+        self.url = url
+        self.status = 'pending'
+        self.text = ''
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+    
+    def state(self):
+        """The summary fields of a test result"""
+        return {'summary_status': self.status, 'ai_summary': self.text if self.status == 'completed' else None}
+    
+    def to_dict(self):
+        data = {
+            'run_id': self.run_id,
+            'url': self.url,
+            'status': self.status,
+            'ai_summary': self.text or None,
+            'created': datetime.fromtimestamp(self.created).isoformat(),
+            'finished': datetime.fromtimestamp(self.finished).isoformat() if self.finished else None,
+        }
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+class SummaryManager:
+    """Generates AI summaries off the request path and streams them to readers by run id"""
+    def __init__(self, workers=AI_SUMMARY_WORKERS, retention=AI_SUMMARY_RETENTION_SECONDS,
+                 timeout=AI_SUMMARY_TIMEOUT_SECONDS):
+        self.retention = retention
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='summary')
+        self._runs = {}
+        self._cond = threading.Condition()
+    
+    def submit(self, run_id, url, issues):
+        """Start summarising a run, unless its summary is already under way or done"""
+        with self._cond:
+            self._expire()
+            run = self._runs.get(run_id)
+            if run and run.status != 'failed':
+                return run
+            run = self._runs[run_id] = SummaryRun(run_id, url)
+        self._executor.submit(self._run, run, issues)
+        return run
+    
+    def get(self, run_id):
+        with self._cond:
+            return self._runs.get(run_id)
+    
+    def follow(self, run, offset=0, keepalive=SSE_KEEPALIVE_SECONDS):
+        """Yield the text added after offset until the summary finishes (None = keepalive)"""
+        while True:
+            with self._cond:
+                if len(run.text) <= offset and run.finished is None:
+                    self._cond.wait(keepalive)
+                text = run.text[offset:]
+                done = run.finished is not None
+            
+            if text:
+                offset += len(text)
+                yield text
+            elif not done:
+                yield None
+            if done and offset >= len(run.text):
+                return
+    
+    def _run(self, run, issues):
+        with self._cond:
+            run.status = 'streaming'
+            self._cond.notify_all()
+        
+        try:
+            summary, usage = generate_summary(issues, timeout=self.timeout, on_delta=lambda text: self._append(run, text))
+        except Exception as e:
+            with self._cond:
+                run.status = 'failed'
+                run.error = f"Error generating AI summary: {str(e)}"
+                run.finished = time.time()
+                self._cond.notify_all()
+        else:
+            with self._cond:
+                # A cached summary arrives whole, without deltas
+                run.text = summary
+                run.status = 'completed'
+                run.finished = time.time()
+                self._cond.notify_all()
+        
+        if history_store:
+            try:
+                history_store.set_summary(run.run_id, run.status, run.text if run.status == 'completed' else None, run.error)
+            except Exception as e:
+                print(f"Failed to record AI summary: {e}")
+    
+    def _append(self, run, text):
+        with self._cond:
+            run.text += text
+            self._cond.notify_all()
+    
+    def _expire(self):
+        cutoff = time.time() - self.retention
+        for run_id in [run_id for run_id, run in self._runs.items() if run.finished and run.finished < cutoff]:
+            del self._runs[run_id]
+
+
+summary_manager = SummaryManager()
+
+
+def resume_summary(run_id):
+    """Restart a summary the history left unfinished (the process stopped while it streamed)"""
+    stored = history_store.summary(run_id) if history_store else None
+    if not stored or stored['status'] not in ('pending', 'streaming'):
+        return None
+    record = history_store.run(run_id)
+    return summary_manager.submit(run_id, record['url'], record['issues'])
+
+
+def reuse_summary(run_id, url, issues):
+    """Summary fields of an earlier run served from the cache, summarising it again only if it never finished"""
+    run = summary_manager.get(run_id)
+    if not run or run.status == 'failed':
+        stored = history_store.summary(run_id) if history_store else None
+        if stored and stored['status'] == 'completed':
+            return {'summary_status': 'completed', 'ai_summary': stored['ai_summary']}
+        run = summary_manager.submit(run_id, url, issues)
+    return run.state()
+
+
+def normalize_input_url(url):
+    """Add a scheme to user supplied URLs that lack one"""
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def parse_viewports(value):
+    """[[width, height], ...] from widths, 'WIDTHxHEIGHT' strings or a comma-separated string"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = [part.strip() for part in value.split(',') if part.strip()]
+    if not isinstance(value, list):
+        raise ValueError('viewports must be a list of widths or WIDTHxHEIGHT strings')
+    
+    viewports = []
+    for item in value:
+        try:
+            if isinstance(item, str) and 'x' in item.lower():
+                width, height = (int(part) for part in item.lower().split('x', 1))
+            else:
+                width, height = int(item), VIEWPORT_DEFAULT_HEIGHT
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid viewport: {item}')
+        if not (VIEWPORT_MIN_SIZE <= width <= VIEWPORT_MAX_SIZE and VIEWPORT_MIN_SIZE <= height <= VIEWPORT_MAX_SIZE):
+            raise ValueError(f'Viewport {width}x{height} is outside {VIEWPORT_MIN_SIZE}-{VIEWPORT_MAX_SIZE} pixels')
+        if [width, height] not in viewports:
+            viewports.append([width, height])
+    
+    if len(viewports) > VIEWPORT_MAX_COUNT:
+        raise ValueError(f'At most {VIEWPORT_MAX_COUNT} viewports per test')
+    return viewports
+
+
+def test_options(data):
+    """Keyword arguments for run_full_test taken from a request body"""
+    data = data or {}
+    contrast_mode = data.get('contrast_mode', 'computed')
+    if contrast_mode not in CONTRAST_MODES:
+        raise ValueError(f"Unknown contrast mode: {contrast_mode} (expected one of {', '.join(CONTRAST_MODES)})")
+    readiness = data.get('readiness', READINESS_MODE)
+    if readiness not in READINESS_MODES:
+        raise ValueError(f"Unknown readiness mode: {readiness} (expected one of {', '.join(READINESS_MODES)})")
+    
+    viewports = parse_viewports(data.get('viewports'))
+    
+    mode = data.get('mode', 'full')
+    if mode not in AUDIT_MODES:
+        raise ValueError(f"Unknown mode: {mode} (expected one of {', '.join(AUDIT_MODES)})")
+    if mode == 'quick' and viewports:
+        raise ValueError('viewports need a browser and cannot be used in quick mode')
+    
+    diff = bool(data.get('diff', False))
+    if diff and not history_store:
+        raise ValueError('diff needs the run history, which is disabled (set HISTORY_DB)')
+    
+    network_profile = data.get('network_profile', NETWORK_PROFILE)
+    if not isinstance(network_profile, str) or network_profile not in NETWORK_PROFILES:
+        raise ValueError(f"Unknown network profile: {network_profile} (expected one of {', '.join(NETWORK_PROFILES)})")
+    
+    checks = data.get('checks')
+    if isinstance(checks, str):
+        checks = [name.strip() for name in checks.split(',') if name.strip()]
+    if checks is not None:
+        if not isinstance(checks, list) or not checks:
+            raise ValueError('checks must be a non-empty list of check names')
+        unknown = [name for name in checks if name not in CHECK_REGISTRY]
+        if unknown:
+            raise ValueError(f"Unknown checks: {', '.join(map(str, unknown))}")
+        rendered = [name for name in checks if not CHECK_REGISTRY[name].static]
+        if mode == 'quick' and rendered:
+            raise ValueError(f"Checks that need a browser cannot run in quick mode: {', '.join(rendered)}")
+    
+    deadline = data.get('deadline')
+    if deadline is not None:
+        try:
+            deadline = float(deadline)
+        except (TypeError, ValueError):
+            raise ValueError('deadline must be a number of seconds')
+        if deadline <= 0:
+            raise ValueError('deadline must be positive')
+    
+    return {
+        'force': bool(data.get('force', False)),
+        'deadline': deadline,
+        'contrast_mode': contrast_mode,
+        'checks': checks,
+        'ai_summary': summary_mode(data.get('ai_summary', True)),
+        'timings': bool(data.get('timings', False)),
+        'readiness': readiness,
+        'network_profile': network_profile,
+        'viewports': viewports,
+        'mode': mode,
+        'diff': diff
+    }
+
+
+def request_url(data):
+    """Extract and normalize the URL submitted in a request body"""
+    url = (data or {}).get('url')
+    if not url:
+        return None
+    
+    # Validate URL
+    return normalize_input_url(url)
+
+
+# Batch settings
+BATCH_MAX_URLS = int(os.getenv('BATCH_MAX_URLS', '1000'))
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', str(DRIVER_POOL_SIZE)))
+
+
+def run_batch(urls, concurrency, options=None):
+    """Test URLs on parallel browser sessions, yielding results as they finish"""
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='batch')
+    try:
+        futures = {
+            executor.submit(AccessibilityTester().run_full_test, url, **(options or {})): (index, url)
+            for index, url in enumerate(urls)
+        }
+        for future in as_completed(futures):
+            index, url = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'error': str(e)}
+            yield index, url, result
+    finally:
+        # Stop queued URLs if the client went away mid-batch
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def batch_summary(records, started):
+    """Aggregate per-URL results into the final batch record"""
+    results = [result for _, _, result in records]
+    succeeded = [result for result in results if 'error' not in result]
+    return {
+        'type': 'summary',
+        'total_urls': len(results),
+        'succeeded': len(succeeded),
+        'failed': len(results) - len(succeeded),
+        'total_issues': sum(result.get('total_issues', 0) for result in succeeded),
+        'issues_by_severity': {
+            severity: sum(result['issues_by_severity'][severity] for result in succeeded)
+            for severity in ('high', 'medium', 'low')
+        },
+        'elapsed_seconds': round(time.time() - started, 3)
+    }
+
+
+# Crawl settings
+CRAWL_MAX_PAGES = int(os.getenv('CRAWL_MAX_PAGES', '500'))
+CRAWL_MAX_DEPTH = int(os.getenv('CRAWL_MAX_DEPTH', '5'))
+CRAWL_CONCURRENCY = int(os.getenv('CRAWL_CONCURRENCY', '8'))
+CRAWL_HOST_CONCURRENCY = int(os.getenv('CRAWL_HOST_CONCURRENCY', '2'))
+CRAWL_REPRESENTATIVES = int(os.getenv('CRAWL_REPRESENTATIVES', '2'))
+CRAWL_DEADLINE_SECONDS = float(os.getenv('CRAWL_DEADLINE_SECONDS', '1800'))
+CRAWL_FINGERPRINT_DEPTH = int(os.getenv('CRAWL_FINGERPRINT_DEPTH', '6'))
+CRAWL_MAX_SITEMAPS = 20
+# Links to these are not pages worth auditing
+CRAWL_SKIP_EXTENSIONS = ('.pdf', '.zip', '.gz', '.tar', '.rar', '.7z', '.exe', '.dmg', '.msi', '.apk',
+                         '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.svg', '.ico', '.bmp',
+                         '.mp3', '.mp4', '.webm', '.mov', '.avi', '.wav', '.ogg',
+                         '.css', '.js', '.json', '.xml', '.rss', '.atom', '.txt', '.csv',
+                         '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', '.woff', '.woff2', '.ttf')
+# Left out of the structural fingerprint: they do not change how a page is laid out
+FINGERPRINT_SKIP_TAGS = {'head', 'script', 'style', 'noscript', 'template', 'link', 'meta', 'br', 'wbr'}
+
+
+def structure_fingerprint(snapshot, max_depth=CRAWL_FINGERPRINT_DEPTH):
+    """Hash of a page's tag skeleton; pages rendered from one template share it
+
+    Text and attributes are ignored, a run of identical sibling shapes counts
+    once and nothing below max_depth is considered, so differing content
+    (three paragraphs or thirty, one list item or ten) leaves it unchanged.
+    """
+    children = {}
+    for node in snapshot.nodes:
+        if node['tag'] not in FINGERPRINT_SKIP_TAGS and not node.get('frame') and not node.get('shadow'):
+            children.setdefault(node['parent'], []).append(node)
+    
+    def shape(node, depth):
+        if depth >= max_depth:
+            return node['tag']
+        parts = [part for part, _ in groupby(shape(child, depth + 1) for child in children.get(node['index'], []))]
+        return node['tag'] + ('(' + ','.join(parts) + ')' if parts else '')
+    
+    skeleton = ','.join(shape(node, 0) for node in children.get(-1, []))
+    return hashlib.sha1(skeleton.encode('utf-8')).hexdigest()[:16]
+
+
+def load_sitemap(url, limit=CRAWL_MAX_PAGES, timeout=STATIC_FETCH_TIMEOUT_SECONDS):
+    """Page URLs listed in a sitemap, following sitemap indexes"""
+    pages = []
+    queue = deque([url])
+    fetched = 0
+    while queue and len(pages) < limit and fetched < CRAWL_MAX_SITEMAPS:
+        sitemap = queue.popleft()
+        fetched += 1
+        with static_fetch_slots:
+            response = http_session.get(sitemap, timeout=timeout)
+        response.raise_for_status()
+        root = ElementTree.fromstring(response.content)
+        # Namespaced tags: {http://www.sitemaps.org/schemas/sitemap/0.9}loc
+        locations = [element.text.strip() for element in root.iter() if element.tag.endswith('loc') and element.text]
+        if root.tag.endswith('sitemapindex'):
+            queue.extend(locations)
+        else:
+            pages.extend(locations[:limit - len(pages)])
+    return pages
+
+
+class SiteCrawler:
+    """Discovers a site's pages over HTTP, groups them by template and audits a few pages per group
+
+    Discovery only fetches and parses the served HTML. Each page gets a
+    structural fingerprint; pages sharing one form a cluster, and only the
+    first few pages of each cluster get the full audit. Issues every audited
+    representative shares are template-level and are assigned to the rest of
+    the cluster.
+    """
+    def __init__(self, seeds, options=None, max_pages=CRAWL_MAX_PAGES, max_depth=CRAWL_MAX_DEPTH,
+                 representatives=CRAWL_REPRESENTATIVES, audit_concurrency=1, progress=None):
+        self.seeds = seeds
+        self.options = options or {}
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.representatives = representatives
+        self.audit_concurrency = audit_concurrency
+        self.progress = progress
+        self.hosts = {urlsplit(seed).hostname for seed in seeds}
+        self.deadline = Deadline(CRAWL_DEADLINE_SECONDS)
+        self._host_slots = {}
+        self._robots = {}
+        self._lock = threading.Lock()
+        self.skipped_seeds = []
+        self.admission_error = None
     
-    def check_keyboard_navigation(self):
-        """Check for keyboard navigation issues"""
-        issues = []
-        
-        # Check for focusable elements without visible focus
-        focusable_elements = []
-        
-        # Get all focusable elements separately
-        focusable_elements.extend(self.driver.find_elements(By.TAG_NAME, "a"))
-        focusable_elements.extend(self.driver.find_elements(By.TAG_NAME, "button"))
-        focusable_elements.extend(self.driver.find_elements(By.TAG_NAME, "input"))
-        focusable_elements.extend(self.driver.find_elements(By.TAG_NAME, "textarea"))
-        focusable_elements.extend(self.driver.find_elements(By.TAG_NAME, "select"))
-        focusable_elements.extend(self.driver.find_elements(By.XPATH, "//*[@tabindex]"))
-        
-        focus_issues = 0
-        for element in focusable_elements[:20]:  # Limit to avoid timeout
-            try:
-                if element.is_displayed() and element.is_enabled():
-                    # Focus the element
-                    self.driver.execute_script("arguments[0].focus();", element)
-                    
-                    # Check if focus is visible
-                    outline = self.driver.execute_script(
-                        "return window.getComputedStyle(arguments[0]).outline;", element
-                    )
-                    box_shadow = self.driver.execute_script(
-                        "return window.getComputedStyle(arguments[0]).boxShadow;", element
-                    )
-                    
-                    if outline == 'none' and 'none' in box_shadow:
-                        focus_issues += 1
-                        
-            except Exception as e:
-                continue
-        
-        if focus_issues > 0:
-            issues.append({
-                'type': 'Focus Visibility Issues',
-                'count': focus_issues,
-                'severity': 'high',
-                'description': f'{focus_issues} elements lack visible focus indicators'
-            })
-        
-        return issues
+    def report(self, event, **data):
+        if self.progress:
+            self.progress(event, data)
     
-    def check_semantic_markup(self):
-        """Check for semantic HTML usage"""
-        issues = []
-        
-        # Check for landmark elements
-        landmarks = ['main', 'nav', 'header', 'footer', 'aside', 'section']
-        found_landmarks = []
-        
-        for landmark in landmarks:
-            elements = self.driver.find_elements(By.TAG_NAME, landmark)
-            if elements:
-                found_landmarks.append(landmark)
-        
-        if len(found_landmarks) < 3:
-            issues.append({
-                'type': 'Limited Semantic Markup',
-                'found_landmarks': found_landmarks,
-                'severity': 'medium',
-                'description': 'Page uses limited semantic HTML5 elements'
-            })
-        
-        # Check for lists used for navigation
-        nav_elements = self.driver.find_elements(By.TAG_NAME, "nav")
-        if nav_elements:
-            nav_lists = []
-            for nav in nav_elements:
-                try:
-                    nav_lists.extend(nav.find_elements(By.TAG_NAME, "ul"))
-                    nav_lists.extend(nav.find_elements(By.TAG_NAME, "ol"))
-                except:
-                    continue
-            
-            if not nav_lists:
-                issues.append({
-                    'type': 'Navigation Not Using Lists',
-                    'severity': 'low',
-                    'description': 'Navigation elements should use list markup'
-                })
-        
-        return issues
+    def run(self):
+        pages = self.discover()
+        clusters = self.cluster(pages)
+        self.audit(clusters)
+        return self.build_results(pages, clusters)
     
-    def check_aria_attributes(self):
-        """Check ARIA attributes usage"""
-        issues = []
-        
-        # Check for elements with aria-label but no role
-        aria_labeled = self.driver.find_elements(By.XPATH, "//*[@aria-label]")
+    def allowed(self, url):
+        """Whether a link belongs to the crawl: same host, a page, and not disallowed by robots.txt"""
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or parts.hostname not in self.hosts:
+            return False
+        if parts.path.lower().endswith(CRAWL_SKIP_EXTENSIONS):
+            return False
+        robots = self.robots(parts)
+        return robots is None or robots.can_fetch(STATIC_USER_AGENT, url)
+    
+    def robots(self, parts):
+        origin = f'{parts.scheme}://{parts.netloc}'
+        with self._lock:
+            if origin in self._robots:
+                return self._robots[origin]
+        robots = None
+        try:
+            response = http_session.get(origin + '/robots.txt', timeout=STATIC_FETCH_TIMEOUT_SECONDS)
+            if response.status_code == 200:
+                robots = RobotFileParser()
+                robots.parse(response.text.splitlines())
+        except requests.RequestException:
+            pass
+        with self._lock:
+            return self._robots.setdefault(origin, robots)
+    
+    def host_slot(self, url):
+        """Per-host semaphore, so one site is never hit by more than CRAWL_HOST_CONCURRENCY fetches"""
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(CRAWL_HOST_CONCURRENCY)
+            return self._host_slots[host]
+    
+    def fetch(self, url):
+        with self.host_slot(url):
+            snapshot, _ = fetch_static_snapshot(url)
+        links = [node['href'] for node in snapshot.by_tag('a', 'area') if node.get('href')]
+        return snapshot, links
+    
+    def discover(self):
+        """Breadth-first crawl of the frontier; returns pages in discovery order"""
+        frontier = deque()
+        seen = set()
+        for seed in self.seeds:
+            key = normalize_cache_url(seed)
+            if key in seen:
+                continue
+            seen.add(key)
+            # Seeds (sitemap entries especially) obey the same rules as discovered links
+            if self.allowed(seed):
+                frontier.append((seed, 0))
+            else:
+                self.skipped_seeds.append(seed)
+                self.report('seed_skipped', url=seed)
         
-        for element in aria_labeled:
-            try:
-                role = element.get_attribute("role")
-                tag_name = element.tag_name.lower()
+        pages = []
+        pending = {}
+        executor = ThreadPoolExecutor(max_workers=CRAWL_CONCURRENCY, thread_name_prefix='crawl')
+        try:
+            while frontier or pending:
+                while (frontier and len(pending) < CRAWL_CONCURRENCY
+                       and len(pages) + len(pending) < self.max_pages and not self.deadline.expired()):
+                    url, depth = frontier.popleft()
+                    pending[executor.submit(self.fetch, url)] = (url, depth)
+                if not pending:
+                    break
                 
-                if not role and tag_name in ['div', 'span']:
-                    issues.append({
-                        'type': 'ARIA Label Without Role',
-                        'element': tag_name,
-                        'aria_label': element.get_attribute("aria-label"),
-                        'severity': 'medium'
-                    })
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = pending.pop(future)
+                    page = {'url': url, 'depth': depth}
+                    pages.append(page)
+                    try:
+                        snapshot, links = future.result()
+                    except Exception as e:
+                        page['error'] = str(e)
+                        continue
+                    page['url'] = snapshot.url or url
+                    page['title'] = snapshot.title
+                    page['fingerprint'] = structure_fingerprint(snapshot)
+                    self.report('page_discovered', url=page['url'], depth=depth,
+                                fingerprint=page['fingerprint'], discovered=len(pages))
                     
-            except Exception as e:
-                continue
-        
-        return issues
+                    if depth >= self.max_depth:
+                        continue
+                    for link in links:
+                        key = normalize_cache_url(link)
+                        if key not in seen and self.allowed(link):
+                            seen.add(key)
+                            frontier.append((urlunsplit(urlsplit(link)._replace(fragment='')), depth + 1))
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return pages
     
-    def check_page_structure(self):
-        """Check overall page structure"""
-        issues = []
-        
-        # Check for skip links
-        all_links = self.driver.find_elements(By.TAG_NAME, "a")
-        skip_links = [link for link in all_links if link.get_attribute("href") and '#' in link.get_attribute("href")]
-        has_skip_link = any('skip' in link.text.lower() for link in skip_links if link.text)
-        
-        if not has_skip_link:
-            issues.append({
-                'type': 'Missing Skip Link',
-                'severity': 'medium',
-                'description': 'Page should have a skip to main content link'
-            })
-        
-        # Check page title
-        title = self.driver.title
-        if not title or len(title.strip()) < 3:
-            issues.append({
-                'type': 'Missing or Inadequate Page Title',
-                'current_title': title,
-                'severity': 'high'
-            })
+    def cluster(self, pages):
+        """Group fetched pages by fingerprint, shallowest pages first"""
+        clusters = OrderedDict()
+        for page in pages:
+            if 'fingerprint' in page:
+                clusters.setdefault(page['fingerprint'], []).append(page)
+        clusters = [
+            {'fingerprint': fingerprint, 'pages': sorted(members, key=lambda page: page['depth'])}
+            for fingerprint, members in clusters.items()
+        ]
+        self.report('pages_clustered', pages=len(pages), clusters=len(clusters))
+        return clusters
+    
+    def audit(self, clusters):
+        """Fully audit the representatives of every cluster, then derive the template-level issues"""
+        targets = [(cluster, page) for cluster in clusters for page in cluster['pages'][:self.representatives]]
+        for cluster in clusters:
+            cluster['results'] = []
         
-        # Check for language attribute
+        urls = [page['url'] for _, page in targets]
         try:
-            html_lang = self.driver.find_element(By.TAG_NAME, "html").get_attribute("lang")
-            if not html_lang:
-                issues.append({
-                    'type': 'Missing Language Attribute',
-                    'severity': 'medium',
-                    'description': 'HTML element should have lang attribute'
-                })
-        except:
-            issues.append({
-                'type': 'Missing Language Attribute',
-                'severity': 'medium',
-                'description': 'HTML element should have lang attribute'
-            })
+            # Browser sessions are only queued for and held once discovery is over
+            ticket = admit_test(self.options, weight=self.audit_concurrency) if urls else None
+            with ticket or nullcontext():
+                for index, url, result in run_batch(urls, self.audit_concurrency, self.options):
+                    cluster, page = targets[index]
+                    page['result'] = result
+                    cluster['results'].append(result)
+                    self.report('representative_completed', url=url, cluster=cluster['fingerprint'],
+                                total_issues=result.get('total_issues'), error=result.get('error'))
+        except AdmissionRejected as e:
+            # The discovered pages and clusters are still worth returning
+            self.admission_error = {'error': str(e), 'retry_after': e.retry_after}
+            self.report('audit_rejected', **self.admission_error)
         
-        return issues
-    
-    def generate_ai_summary(self, all_issues, url):
-        """Generate AI summary of accessibility issues"""
-        try:
-            issues_text = json.dumps(all_issues, indent=2)
-            
-            prompt = f"""
-            Analyze the following accessibility issues found on the webpage: {url}
-            
-            Issues found:
-            {issues_text}
-            
-            Please provide:
-            1. A brief executive summary of the accessibility status
-            2. Top 3 priority issues that should be fixed first
-            3. Specific recommendations for each major issue category
-            4. Impact on different user groups (vision, motor, cognitive disabilities)
-            5. Estimated effort level (Low/Medium/High) for fixes
-            
-            Format the response as a structured report.
-            """
-            
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an accessibility expert providing detailed analysis and recommendations for web accessibility issues."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000
-            )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            return f"Error generating AI summary: {str(e)}"
+        for cluster in clusters:
+            audited = [result for result in cluster['results'] if 'error' not in result]
+            # With a single representative nothing separates the template from that page's content
+            cluster['estimated'] = len(audited) >= 2
+            if not cluster['estimated']:
+                cluster['template_issues'] = []
+                continue
+            # An issue every representative has comes from the template, not the page's content
+            shared = set.intersection(*[
+                {issue.get('fingerprint') for issue in result.get('issues', [])} for result in audited
+            ])
+            cluster['template_issues'] = [issue for issue in audited[0].get('issues', [])
+                                          if issue.get('fingerprint') in shared]
     
-    def run_full_test(self, url):
-        """Run comprehensive accessibility test"""
+    def build_results(self, pages, clusters):
+        page_records = []
+        for cluster in clusters:
+            template_counts = {severity: sum(1 for issue in cluster['template_issues'] if issue.get('severity') == severity)
+                               for severity in SEVERITIES}
+            for page in cluster['pages']:
+                result = page.get('result')
+                record = {'url': page['url'], 'title': page.get('title'), 'depth': page['depth'],
+                          'cluster': cluster['fingerprint'], 'audited': result is not None}
+                if result is not None:
+                    record.update({key: result.get(key) for key in ('run_id', 'total_issues', 'issues_by_severity')})
+                    if result.get('error'):
+                        record['error'] = result['error']
+                elif cluster['estimated']:
+                    record['total_issues'] = len(cluster['template_issues'])
+                    record['issues_by_severity'] = template_counts
+                    record['inherited'] = True
+                else:
+                    record['estimated'] = False
+                page_records.append(record)
+        failed = [{'url': page['url'], 'depth': page['depth'], 'error': page['error']} for page in pages if 'error' in page]
+        
+        results = {
+            'seeds': self.seeds,
+            'seeds_skipped': self.skipped_seeds,
+            'pages_discovered': len(pages),
+            'pages_fetched': len(pages) - len(failed),
+            'pages_audited': sum(len(cluster['results']) for cluster in clusters),
+            'clusters': [
+                {
+                    'fingerprint': cluster['fingerprint'],
+                    'size': len(cluster['pages']),
+                    'representatives': [page['url'] for page in cluster['pages'] if 'result' in page],
+                    'template_issues': cluster['template_issues'],
+                    'estimated': cluster['estimated'],
+                    'results': cluster['results']
+                }
+                for cluster in clusters
+            ],
+            'pages': page_records,
+            'failed_pages': failed,
+            'total_issues': sum(record.get('total_issues') or 0 for record in page_records),
+            'deadline_reached': self.deadline.expired(),
+            'elapsed_seconds': round(self.deadline.elapsed(), 3),
+            'timestamp': datetime.now().isoformat()
+        }
+        if self.admission_error:
+            results['admission_rejected'] = self.admission_error
+        return results
+
+
+def crawl_options(data):
+    """SiteCrawler arguments taken from a request body"""
+    data = data or {}
+    options = {}
+    # (minimum, maximum) for each setting a request may lower
+    for key, (low, high) in (('max_pages', (1, CRAWL_MAX_PAGES)), ('max_depth', (0, CRAWL_MAX_DEPTH)),
+                             ('representatives', (1, CRAWL_REPRESENTATIVES))):
+        if data.get(key) is None:
+            continue
         try:
-            self.setup_driver()
-            self.driver.get(url)
-            
-            # Wait for page to load
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.TAG_NAME, "body"))
-            )
-            
-            # Capture initial screenshot
-            self.capture_screenshot("initial_page")
-            
-            # Run all tests
-            all_issues = []
-            
-            print("Checking color contrast...")
-            all_issues.extend(self.check_color_contrast())
-            
-            print("Checking alt text...")
-            all_issues.extend(self.check_alt_text())
-            
-            print("Checking headings structure...")
-            all_issues.extend(self.check_headings_structure())
-            
-            print("Checking form labels...")
-            all_issues.extend(self.check_form_labels())
-            
-            print("Checking keyboard navigation...")
-            all_issues.extend(self.check_keyboard_navigation())
-            
-            print("Checking semantic markup...")
-            all_issues.extend(self.check_semantic_markup())
-            
-            print("Checking ARIA attributes...")
-            all_issues.extend(self.check_aria_attributes())
-            
-            print("Checking page structure...")
-            all_issues.extend(self.check_page_structure())
-            
-            # Generate AI summary
-            print("Generating AI summary...")
-            ai_summary = self.generate_ai_summary(all_issues, url)
-            
-            # Organize results
-            results = {
-                'url': url,
-                'timestamp': datetime.now().isoformat(),
-                'total_issues': len(all_issues),
-                'issues_by_severity': {
-                    'high': len([i for i in all_issues if i.get('severity') == 'high']),
-                    'medium': len([i for i in all_issues if i.get('severity') == 'medium']),
-                    'low': len([i for i in all_issues if i.get('severity') == 'low'])
-                },
-                'issues': all_issues,
-                'screenshots': self.screenshots,
-                'ai_summary': ai_summary
-            }
-            
-            return results
-            
-        except Exception as e:
-            return {'error': str(e)}
-            
-        finally:
-            if self.driver:
-                self.driver.quit()
+            value = int(data[key])
+        except (TypeError, ValueError):
+            raise ValueError(f'{key} must be an integer')
+        if not low <= value <= high:
+            raise ValueError(f'{key} must be between {low} and {high}')
+        options[key] = value
+    return options
+
 
 # Flask routes
 @app.route('/')
@@ -520,7 +4472,7 @@ def index():
             body { font-family: Arial, sans-serif; margin: 40px; }
             .container { max-width: 800px; margin: 0 auto; }
             .form-group { margin: 20px 0; }
-            input[type="url"] { width: 100%; padding: 10px; font-size: 16px; }
+            input[type="url"], input[type="text"] { width: 100%; padding: 10px; font-size: 16px; }
             button { background: #007cba; color: white; padding: 12px 24px; font-size: 16px; border: none; cursor: pointer; }
             button:hover { background: #005a87; }
             .results { margin-top: 30px; }
@@ -541,11 +4493,57 @@ def index():
                     <label for="url">Website URL:</label>
                     <input type="url" id="url" name="url" required placeholder="https://example.com">
                 </div>
+                <div class="form-group">
+                    <label for="mode">Mode:</label>
+                    <select id="mode">
+                        <option value="full">Full (rendered in Chrome)</option>
+                        <option value="quick">Quick (markup checks only, no browser)</option>
+                    </select>
+                </div>
+                <div class="form-group">
+                    <label for="contrastMode">Contrast analysis:</label>
+                    <select id="contrastMode">
+                        <option value="computed">Computed styles</option>
+                        <option value="pixels">Rendered pixels</option>
+                        <option value="both">Both (report the worse)</option>
+                    </select>
+                </div>
+                <div class="form-group">
+                    <label for="readiness">Start auditing when:</label>
+                    <select id="readiness">
+                        <option value="settled" {% if readiness == 'settled' %}selected{% endif %}>Network and DOM have settled</option>
+                        <option value="load" {% if readiness == 'load' %}selected{% endif %}>The load event has fired</option>
+                        <option value="none" {% if readiness == 'none' %}selected{% endif %}>The body exists</option>
+                    </select>
+                </div>
+                <div class="form-group">
+                    <label for="networkProfile">Network profile:</label>
+                    <select id="networkProfile">
+                        {% for profile, description in network_profiles %}
+                        <option value="{{ profile }}" {% if profile == network_profile %}selected{% endif %}>{{ description }}</option>
+                        {% endfor %}
+                    </select>
+                </div>
+                <div class="form-group">
+                    <label for="viewports">Also audit at viewport widths:</label>
+                    <input type="text" id="viewports" placeholder="375, 768">
+                </div>
+                <div class="form-group">
+                    <p>Checks:</p>
+                    {% for check in checks %}
+                    <label><input type="checkbox" name="checks" value="{{ check.name }}" data-static="{{ 'true' if check.static else 'false' }}" checked> {{ check.label }}</label><br>
+                    {% endfor %}
+                </div>
+                <div class="form-group">
+                    <label><input type="checkbox" id="aiSummary" checked> Generate AI summary</label><br>
+                    <label><input type="checkbox" id="force"> Ignore cached results</label>
+                </div>
                 <button type="submit">Run Accessibility Test</button>
             </form>
             
             <div id="loading" class="loading" style="display: none;">
                 <p>Testing in progress... This may take a few minutes.</p>
+                <p id="status"></p>
             </div>
             
             <div id="results" class="results"></div>
@@ -556,6 +4554,21 @@ def index():
                 e.preventDefault();
                 
                 const url = document.getElementById('url').value;
+                const force = document.getElementById('force').checked;
+                const contrastMode = document.getElementById('contrastMode').value;
+                const readiness = document.getElementById('readiness').value;
+                const networkProfile = document.getElementById('networkProfile').value;
+                const mode = document.getElementById('mode').value;
+                const quick = mode === 'quick';
+                const viewports = quick ? null : document.getElementById('viewports').value.trim() || null;
+                const aiSummary = document.getElementById('aiSummary').checked;
+                const checkboxes = Array.from(document.querySelectorAll('input[name="checks"]'));
+                // Quick mode skips the checks that need a rendered page
+                const selected = checkboxes
+                    .filter(box => box.checked && (!quick || box.dataset.static === 'true'))
+                    .map(box => box.value);
+                // Send no list when everything is selected so the full run (and screenshot) happens
+                const checks = selected.length === checkboxes.length ? null : selected;
                 const loading = document.getElementById('loading');
                 const results = document.getElementById('results');
                 
@@ -563,22 +4576,29 @@ def index():
                 results.innerHTML = '';
                 
                 try {
-                    const response = await fetch('/test', {
+                    const response = await fetch('/jobs', {
                         method: 'POST',
                         headers: {
                             'Content-Type': 'application/json',
                         },
-                        body: JSON.stringify({ url: url })
+                        body: JSON.stringify({
+                            url: url,
+                            mode: mode,
+                            force: force,
+                            contrast_mode: contrastMode,
+                            readiness: readiness,
+                            network_profile: networkProfile,
+                            viewports: viewports,
+                            checks: checks,
+                            ai_summary: aiSummary
+                        })
                     });
                     
-                    const data = await response.json();
-                    loading.style.display = 'none';
-                    
-                    if (data.error) {
-                        results.innerHTML = `<div class="issue high">Error: ${data.error}</div>`;
-                    } else {
-                        displayResults(data);
+                    const job = await response.json();
+                    if (job.error) {
+                        throw new Error(job.error);
                     }
+                    followJob(job);
                     
                 } catch (error) {
                     loading.style.display = 'none';
@@ -586,12 +4606,146 @@ def index():
                 }
             });
             
+            function followJob(job) {
+                const loading = document.getElementById('loading');
+                const results = document.getElementById('results');
+                const status = document.getElementById('status');
+                const events = new EventSource(job.events_url);
+                
+                const showError = (message) => {
+                    events.close();
+                    loading.style.display = 'none';
+                    results.innerHTML = `<div class="issue high">Error: ${message}</div>`;
+                };
+                
+                events.addEventListener('started', () => {
+                    status.textContent = 'Starting browser...';
+                    results.innerHTML = `
+                        <h2>Accessibility Test Results</h2>
+                        <div id="liveSummary"></div>
+                        <h3>Issues found so far</h3>
+                        <div id="liveIssues"></div>
+                    `;
+                });
+                events.addEventListener('page_loading', () => {
+                    status.textContent = 'Loading page...';
+                });
+                events.addEventListener('check_started', (e) => {
+                    const data = JSON.parse(e.data);
+                    const at = data.viewport ? ` at ${data.viewport}` : '';
+                    status.textContent = `Checking ${data.label}${at}... (${data.position}/${data.total})`;
+                });
+                // Show each check's issues as soon as it finishes
+                events.addEventListener('check_completed', (e) => {
+                    const data = JSON.parse(e.data);
+                    const live = document.getElementById('liveIssues');
+                    if (live) {
+                        live.insertAdjacentHTML('beforeend', data.issues.map(renderIssue).join(''));
+                    }
+                });
+                events.addEventListener('summary_started', () => {
+                    status.textContent = 'Generating AI summary...';
+                });
+                let summaryText = '';
+                events.addEventListener('summary_delta', (e) => {
+                    const live = document.getElementById('liveSummary');
+                    summaryText += JSON.parse(e.data).text;
+                    if (live) {
+                        live.innerHTML = renderSummary(summaryText);
+                    }
+                });
+                events.addEventListener('summary_completed', (e) => {
+                    const data = JSON.parse(e.data);
+                    const live = document.getElementById('liveSummary');
+                    if (live && data.ai_summary) {
+                        live.innerHTML = renderSummary(data.ai_summary);
+                    }
+                });
+                events.addEventListener('failed', async (e) => {
+                    events.close();
+                    const error = JSON.parse(e.data).error;
+                    // Partial results are still worth showing
+                    try {
+                        const response = await fetch(job.status_url);
+                        const data = await response.json();
+                        if (data.result && data.result.checks) {
+                            loading.style.display = 'none';
+                            displayResults(data.result);
+                            results.insertAdjacentHTML('afterbegin', `<div class="issue high">Error: ${error}</div>`);
+                            return;
+                        }
+                    } catch (ignored) {}
+                    showError(error);
+                });
+                events.addEventListener('completed', async () => {
+                    events.close();
+                    try {
+                        const response = await fetch(job.status_url);
+                        const data = await response.json();
+                        loading.style.display = 'none';
+                        displayResults(data.result);
+                    } catch (error) {
+                        showError(error.message);
+                    }
+                });
+            }
+            
+            // An asynchronous summary streams in after the results, a few tokens at a time
+            function followSummary(summaryUrl) {
+                const panel = document.getElementById('summaryPanel');
+                const events = new EventSource(`${summaryUrl}/events`);
+                let text = '';
+                panel.innerHTML = renderSummary('Generating AI summary...');
+                
+                events.addEventListener('delta', (e) => {
+                    text += JSON.parse(e.data).text;
+                    panel.innerHTML = renderSummary(text);
+                });
+                events.addEventListener('completed', (e) => {
+                    events.close();
+                    panel.innerHTML = renderSummary(JSON.parse(e.data).ai_summary || text);
+                });
+                events.addEventListener('failed', (e) => {
+                    events.close();
+                    panel.innerHTML = renderSummary(JSON.parse(e.data).error);
+                });
+            }
+            
+            function renderSummary(summary) {
+                return `
+                    <h3>AI Summary</h3>
+                    <div class="issue">
+                        <pre>${summary}</pre>
+                    </div>
+                `;
+            }
+            
+            function renderIssue(issue) {
+                return `
+                    <div class="issue ${issue.severity || 'medium'}">
+                        <h4>${issue.type}</h4>
+                        <p><strong>Severity:</strong> ${issue.severity || 'medium'}</p>
+                        ${issue.description ? `<p><strong>Description:</strong> ${issue.description}</p>` : ''}
+                        ${issue.element ? `<p><strong>Element:</strong> ${issue.element}</p>` : ''}
+                        ${issue.viewport ? `<p><strong>Viewport:</strong> ${issue.viewport}</p>` : ''}
+                        ${issue.text ? `<p><strong>Text:</strong> ${issue.text}</p>` : ''}
+                        ${issue.contrast_ratio ? `<p><strong>Contrast Ratio:</strong> ${issue.contrast_ratio.toFixed(2)}</p>` : ''}
+                        ${issue.screenshot_crop ? `<img src="${issue.screenshot_crop}" loading="lazy" style="max-width: 100%; border: 1px solid #ccc;">` : ''}
+                    </div>
+                `;
+            }
+            
             function displayResults(data) {
                 const results = document.getElementById('results');
+                const incomplete = Object.entries(data.check_status || {})
+                    .filter(([name, status]) => status.status !== 'completed')
+                    .map(([name, status]) => `${name} (${status.status.replace('_', ' ')} after ${status.elapsed}s)`);
                 
                 let html = `
                     <h2>Accessibility Test Results</h2>
                     <p><strong>URL:</strong> ${data.url}</p>
+                    ${data.cached ? `<p><em>Cached result from ${data.cached_at}</em></p>` : ''}
+                    ${incomplete.length ? `<div class="issue medium"><strong>Incomplete checks:</strong> ${incomplete.join(', ')}</div>` : ''}
                     <p><strong>Total Issues:</strong> ${data.total_issues}</p>
                     <p><strong>Issues by Severity:</strong> 
                         High: ${data.issues_by_severity.high}, 
@@ -599,62 +4753,360 @@ def index():
                         Low: ${data.issues_by_severity.low}
                     </p>
                     
-                    <h3>AI Summary</h3>
-                    <div class="issue">
-                        <pre>${data.ai_summary}</pre>
-                    </div>
+                    <div id="summaryPanel">${data.ai_summary ? renderSummary(data.ai_summary) : ''}</div>
                     
                     <h3>Detailed Issues</h3>
                 `;
                 
-                data.issues.forEach(issue => {
-                    html += `
-                        <div class="issue ${issue.severity || 'medium'}">
-                            <h4>${issue.type}</h4>
-                            <p><strong>Severity:</strong> ${issue.severity || 'medium'}</p>
-                            ${issue.description ? `<p><strong>Description:</strong> ${issue.description}</p>` : ''}
-                            ${issue.element ? `<p><strong>Element:</strong> ${issue.element}</p>` : ''}
-                            ${issue.text ? `<p><strong>Text:</strong> ${issue.text}</p>` : ''}
-                            ${issue.contrast_ratio ? `<p><strong>Contrast Ratio:</strong> ${issue.contrast_ratio.toFixed(2)}</p>` : ''}
-                        </div>
-                    `;
-                });
+                html += data.issues.map(renderIssue).join('');
                 
                 if (data.screenshots && data.screenshots.length > 0) {
                     html += `
                         <h3>Screenshots</h3>
-                        <img src="data:image/png;base64,${data.screenshots[0].data}" style="max-width: 100%; border: 1px solid #ccc;">
+                        <a href="${data.screenshots[0].url}"><img src="${data.screenshots[0].thumbnail_url}?width=800" style="max-width: 100%; border: 1px solid #ccc;"></a>
                     `;
                 }
                 
                 results.innerHTML = html;
+                if (data.summary_url && !data.ai_summary) {
+                    followSummary(data.summary_url);
+                }
             }
         </script>
     </body>
     </html>
-    """)
+    """, checks=CHECK_REGISTRY.values(), readiness=READINESS_MODE,
+       network_profile=NETWORK_PROFILE, network_profiles=NETWORK_PROFILE_LABELS.items())
 
 @app.route('/test', methods=['POST'])
 def test_accessibility():
     try:
         data = request.get_json()
-        url = data.get('url')
+        url = request_url(data)
         
         if not url:
             return jsonify({'error': 'URL is required'}), 400
         
-        # Validate URL
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
+        try:
+            options = test_options(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        try:
+            check_admission(options)
+        except AdmissionRejected as e:
+            return admission_error(e)
+        
+        # Stream each check's issues as NDJSON the moment the check finishes
+        if data.get('stream'):
+            job = job_manager.submit(url, options)
+            
+            def stream():
+                for event in job_manager.follow(job):
+                    if event is None:
+                        continue
+                    yield json.dumps(dict(event['data'], type=event['event'])) + '\n'
+                yield json.dumps({'type': 'result', 'result': job.result}) + '\n'
+                
+                # The summary tokens follow the result on the same stream
+                run = summary_manager.get((job.result or {}).get('run_id', ''))
+                if run:
+                    for text in summary_manager.follow(run):
+                        if text is not None:
+                            yield json.dumps({'type': 'summary_delta', 'text': text}) + '\n'
+                    yield json.dumps({'type': 'summary_' + run.status, **run.to_dict()}) + '\n'
+            
+            return Response(stream_with_context(stream()), mimetype='application/x-ndjson',
+                            headers={'X-Accel-Buffering': 'no'})
         
-        tester = AccessibilityTester()
-        results = tester.run_full_test(url)
+        try:
+            with admit_test(options) or nullcontext():
+                tester = AccessibilityTester()
+                results = tester.run_full_test(url, **options)
+        except AdmissionRejected as e:
+            return admission_error(e)
         
         return jsonify(results)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/summaries/<run_id>', methods=['GET'])
+def get_summary(run_id):
+    run = summary_manager.get(run_id) or resume_summary(run_id)
+    if run:
+        return jsonify(run.to_dict())
+    stored = history_store.summary(run_id) if history_store else None
+    if not stored or stored['status'] == 'off':
+        return jsonify({'error': 'Summary not found'}), 404
+    return jsonify(stored)
+
+@app.route('/summaries/<run_id>/events', methods=['GET'])
+def summary_events(run_id):
+    run = summary_manager.get(run_id) or resume_summary(run_id)
+    stored = None if run or not history_store else history_store.summary(run_id)
+    if not run and (not stored or stored['status'] == 'off'):
+        return jsonify({'error': 'Summary not found'}), 404
+    
+    # Event ids are offsets into the summary text, so a reconnect resumes mid-stream
+    try:
+        offset = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        offset = 0
+    
+    def stream():
+        position = offset
+        if run:
+            for text in summary_manager.follow(run, offset):
+                if text is None:
+                    yield ': keepalive\n\n'
+                    continue
+                position += len(text)
+                yield f"id: {position}\nevent: delta\ndata: {json.dumps({'text': text})}\n\n"
+            data = run.to_dict()
+        else:
+            data = stored
+        yield f"id: {position}\nevent: {data['status']}\ndata: {json.dumps(data)}\n\n"
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/healthz', methods=['GET'])
+def health():
+    # Cheap enough for load balancer probes: no browser, no OpenAI
+    return jsonify({'status': 'ok', 'admission': admission.stats(), 'driver_pool': driver_pool.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/checks', methods=['GET'])
+def list_checks():
+    return jsonify({'checks': [spec.to_dict() for spec in CHECK_REGISTRY.values()]})
+
+def parse_history_time(value):
+    """Epoch seconds or an ISO 8601 date/time from a query string"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+@app.route('/history', methods=['GET'])
+def list_history():
+    if not history_store:
+        return jsonify({'error': 'Run history is disabled'}), 404
+    
+    severity = request.args.get('severity')
+    if severity and severity not in SEVERITIES:
+        return jsonify({'error': f"severity must be one of {', '.join(SEVERITIES)}"}), 400
+    try:
+        since = parse_history_time(request.args.get('since'))
+        until = parse_history_time(request.args.get('until'))
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        return jsonify({'error': 'since/until must be ISO dates or epoch seconds, limit an integer'}), 400
+    
+    runs = history_store.runs(url=request.args.get('url'), since=since, until=until, severity=severity, limit=limit)
+    return jsonify({'runs': runs})
+
+@app.route('/history/<run_id>', methods=['GET'])
+def get_history_run(run_id):
+    if not history_store:
+        return jsonify({'error': 'Run history is disabled'}), 404
+    run = history_store.run(run_id, severity=request.args.get('severity'))
+    if run is None:
+        return jsonify({'error': 'Run not found'}), 404
+    return jsonify(run)
+
+@app.route('/history/<run_id>/diff', methods=['GET'])
+def get_history_diff(run_id):
+    if not history_store:
+        return jsonify({'error': 'Run history is disabled'}), 404
+    delta = history_store.diff(run_id, against=request.args.get('against'))
+    if delta is None:
+        return jsonify({'error': 'Run not found'}), 404
+    return jsonify(delta)
+
+@app.route('/batch', methods=['POST'])
+def test_batch():
+    data = request.get_json(silent=True) or {}
+    urls = [normalize_input_url(url) for url in data.get('urls') or [] if isinstance(url, str) and url.strip()]
+    
+    if not urls:
+        return jsonify({'error': 'A non-empty list of URLs is required'}), 400
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({'error': f'At most {BATCH_MAX_URLS} URLs are allowed per batch'}), 400
+    
+    try:
+        options = test_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    default_concurrency = STATIC_FETCH_CONCURRENCY if options['mode'] == 'quick' else BATCH_MAX_CONCURRENCY
+    try:
+        concurrency = int(data.get('concurrency', default_concurrency))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'concurrency must be an integer'}), 400
+    if options['mode'] == 'quick':
+        # Quick mode only holds an HTTP connection per URL
+        concurrency = max(1, min(concurrency, STATIC_FETCH_CONCURRENCY, len(urls)))
+    else:
+        # More sessions than pooled browsers would only queue on checkout
+        concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY, driver_pool.size, len(urls)))
+    # The whole batch takes one queue place holding `concurrency` sessions
+    try:
+        ticket = admit_test(options, weight=concurrency)
+    except AdmissionRejected as e:
+        return admission_error(e)
+    
+    def stream():
+        started = time.time()
+        records = []
+        try:
+            with ticket or nullcontext():
+                for index, url, result in run_batch(urls, concurrency, options):
+                    records.append((index, url, result))
+                    yield json.dumps({'type': 'result', 'index': index, 'url': url, 'result': result}) + '\n'
+        except AdmissionRejected as e:
+            yield json.dumps({'type': 'error', 'error': str(e), 'retry_after': e.retry_after}) + '\n'
+            return
+        yield json.dumps(batch_summary(records, started)) + '\n'
+    
+    response = Response(stream_with_context(stream()), mimetype='application/x-ndjson',
+                        headers={'X-Accel-Buffering': 'no'})
+    if ticket:
+        # Frees the queue place even if the client leaves before the stream starts
+        response.call_on_close(ticket.release)
+    return response
+
+@app.route('/crawl', methods=['POST'])
+def create_crawl():
+    data = request.get_json(silent=True) or {}
+    sitemap = data.get('sitemap')
+    url = request_url(data)
+    if not url and not sitemap:
+        return jsonify({'error': 'A seed URL or a sitemap URL is required'}), 400
+    
+    try:
+        options = test_options(data)
+        settings = crawl_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if options.pop('diff'):
+        return jsonify({'error': 'diff is not supported for crawls'}), 400
+    
+    if options['mode'] == 'quick':
+        concurrency = STATIC_FETCH_CONCURRENCY
+    else:
+        concurrency = max(1, min(BATCH_MAX_CONCURRENCY, driver_pool.size))
+    
+    def crawl(progress):
+        seeds = [url] if url else []
+        if sitemap:
+            seeds += load_sitemap(normalize_input_url(sitemap), limit=settings.get('max_pages', CRAWL_MAX_PAGES))
+        if not seeds:
+            raise ValueError('The sitemap lists no pages')
+        crawler = SiteCrawler(seeds, options, audit_concurrency=concurrency, progress=progress, **settings)
+        return crawler.run()
+    
+    # The crawler takes its admission ticket itself, once discovery is over
+    job = job_manager.submit(url or normalize_input_url(sitemap), options, runner=crawl, queue='crawl')
+    return jsonify({
+        'id': job.id,
+        'status': job.status,
+        'status_url': f'/jobs/{job.id}',
+        'events_url': f'/jobs/{job.id}/events'
+    }), 202
+
+@app.route('/screenshots/<image_id>', methods=['GET'])
+def get_screenshot(image_id):
+    try:
+        path = screenshot_store.path(image_id)
+    except ValueError:
+        return jsonify({'error': 'Screenshot not found'}), 404
+    if not os.path.exists(path):
+        return jsonify({'error': 'Screenshot not found'}), 404
+    return send_file(path, mimetype=screenshot_store.mimetype, max_age=31536000)
+
+@app.route('/screenshots/<image_id>/thumbnail', methods=['GET'])
+def get_screenshot_thumbnail(image_id):
+    try:
+        width = min(max(int(request.args.get('width', THUMBNAIL_WIDTH)), THUMBNAIL_MIN_WIDTH), THUMBNAIL_MAX_WIDTH)
+        image = screenshot_store.thumbnail(image_id, width)
+    except (ValueError, FileNotFoundError):
+        return jsonify({'error': 'Screenshot not found'}), 404
+    return send_file(image, mimetype=screenshot_store.mimetype, max_age=31536000)
+
+@app.route('/screenshots/<image_id>/crop', methods=['GET'])
+def get_screenshot_crop(image_id):
+    try:
+        x, y, w, h = (int(request.args[key]) for key in ('x', 'y', 'w', 'h'))
+    except (KeyError, ValueError):
+        return jsonify({'error': 'x, y, w and h are required integers'}), 400
+    # Only the regions linked from issues are rendered (and cached)
+    if not screenshot_store.verify(image_id, x, y, w, h, request.args.get('sig')):
+        return jsonify({'error': 'Invalid crop signature'}), 403
+    try:
+        path = screenshot_store.crop(image_id, x, y, w, h)
+    except (ValueError, FileNotFoundError):
+        return jsonify({'error': 'Screenshot not found'}), 404
+    return send_file(path, mimetype=screenshot_store.mimetype, max_age=31536000)
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    data = request.get_json(silent=True)
+    url = request_url(data)
+    
+    if not url:
+        return jsonify({'error': 'URL is required'}), 400
+    
+    try:
+        options = test_options(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        check_admission(options)
+    except AdmissionRejected as e:
+        return admission_error(e)
+    
+    job = job_manager.submit(url, options)
+    return jsonify({
+        'id': job.id,
+        'status': job.status,
+        'status_url': f'/jobs/{job.id}',
+        'events_url': f'/jobs/{job.id}/events'
+    }), 202
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    try:
+        last_id = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        last_id = 0
+    
+    def stream():
+        for event in job_manager.follow(job, last_id):
+            if event is None:
+                yield ': keepalive\n\n'
+                continue
+            yield f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+    
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 if __name__ == '__main__':
     # Make sure to set your OpenAI API key
     if not os.getenv('OPENAI_API_KEY'):
@@ -0,0 +1,355 @@
+"""Benchmark AccessibilityTester against generated fixture pages served locally
+
+Runs offline: fixtures are served from a local HTTP server, the AI summary
+uses a stub client and caches are disabled so every run does the full work.
+
+    python benchmark.py                     # compare against the baseline
+    python benchmark.py --update-baseline   # record a new baseline
+    python benchmark.py --sizes 1000 --fixtures forms,mixed --repeat 5
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Configure the app before importing it: no cache hits, no history, no browsers launched on import
+os.environ['RESULT_CACHE_BACKEND'] = 'none'
+os.environ['DRIVER_POOL_PREWARM'] = 'false'
+os.environ['HISTORY_DB'] = ''
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+import app as accessibility_app
+
+FIXTURE_SIZES = [1000, 10000, 100000]
+FIXTURE_SEED = 1234
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+
+# 1x1 transparent PNG shared by every <img> in the fixtures
+PIXEL_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082'
+)
+
+
+def forms_units(rng):
+    """Yield chunks of form markup, a third of the fields without labels"""
+    field = 0
+    while True:
+        field += 1
+        kind = rng.choice(['text', 'email', 'checkbox', 'textarea', 'select'])
+        labelled = field % 3 != 0
+        label = f'<label for="f{field}">Field {field}</label>' if labelled else ''
+        if kind == 'textarea':
+            control = f'<textarea id="f{field}" name="f{field}"></textarea>'
+        elif kind == 'select':
+            control = f'<select id="f{field}"><option>One</option><option>Two</option></select>'
+        else:
+            control = f'<input type="{kind}" id="f{field}" name="f{field}">'
+        markup = f'<div class="row">{label}{control}</div>'
+        if field % 10 == 1:
+            markup = f'<form action="#"><fieldset><legend>Group {field}</legend>{markup}'
+        elif field % 10 == 0:
+            markup += '<button type="submit">Send</button></fieldset></form>'
+        yield markup
+
+
+def headings_units(rng):
+    """Yield deeply nested sections whose headings occasionally skip a level"""
+    level = 1
+    depth = 0
+    section = 0
+    while True:
+        section += 1
+        level = max(2, min(6, level + rng.choice([-2, -1, 0, 1, 1, 2])))
+        # Close sibling and deeper sections so nesting follows the heading level
+        closing = '</section>' * max(0, depth - level + 2)
+        depth = min(depth, level - 2) + 1
+        text = f'Section {section} ' + ' '.join(rng.choice(['alpha', 'beta', 'gamma', 'delta']) for _ in range(4))
+        yield f'{closing}<section><h{level}>Heading {section}</h{level}><p>{text}</p>'
+
+
+def images_units(rng):
+    """Yield figures with missing, short and descriptive alt text"""
+    image = 0
+    while True:
+        image += 1
+        alt = rng.choice([None, '', 'x', f'Photo {image} of the product'])
+        alt_attr = '' if alt is None else f' alt="{alt}"'
+        yield f'<figure><img src="/pixel.png?i={image}"{alt_attr} width="40" height="40"><figcaption>Image {image}</figcaption></figure>'
+
+
+def mixed_units(rng):
+    """Interleave every fixture kind with low-contrast text, links and ARIA"""
+    kinds = [forms_units(rng), headings_units(rng), images_units(rng)]
+    item = 0
+    while True:
+        item += 1
+        if item % 4:
+            yield next(kinds[item % 4 - 1])
+            continue
+        color = rng.choice(['#777', '#999', '#333', 'rgba(0, 0, 0, 0.4)'])
+        yield (
+            f'<div aria-label="Card {item}"><span style="color: {color}">Card {item} text</span>'
+            f'<a href="/page/{item}" tabindex="{rng.choice([0, 0, 0, 1])}">Link {item}</a></div>'
+        )
+
+
+FIXTURE_KINDS = {
+    'forms': forms_units,
+    'headings': headings_units,
+    'images': images_units,
+    'mixed': mixed_units
+}
+
+
+def build_fixture(kind, size):
+    """Render a deterministic fixture page of roughly `size` elements"""
+    rng = random.Random(f'{FIXTURE_SEED}:{kind}:{size}')
+    parts = []
+    nodes = 12  # page chrome below
+    for markup in FIXTURE_KINDS[kind](rng):
+        if nodes >= size:
+            break
+        parts.append(markup)
+        nodes += markup.count('<') - markup.count('</')
+
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        f'<title>Benchmark {kind} {size}</title>'
+        '<style>body { font-family: sans-serif; color: #222; background: #fff; }</style></head><body>'
+        '<a href="#main">Skip to content</a><header><nav><ul><li><a href="/">Home</a></li></ul></nav></header>'
+        f'<main id="main"><h1>Benchmark {kind}</h1>{"".join(parts)}</main>'
+        '<footer><p>Fixture footer</p></footer></body></html>'
+    )
+
+
+def fixture_name(kind, size):
+    return f'{kind}-{size}'
+
+
+class FixtureServer:
+    """Serve generated fixture pages from memory on a local port"""
+    def __init__(self, pages):
+        self.pages = pages
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/pixel.png':
+                    body, content_type = PIXEL_PNG, 'image/png'
+                elif path.lstrip('/') in pages:
+                    body, content_type = pages[path.lstrip('/')].encode('utf-8'), 'text/html; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'no-store')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, name):
+        return f'http://127.0.0.1:{self.server.server_address[1]}/{name}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubOpenAI:
+    """Offline replacement for the OpenAI client used by generate_ai_summary"""
+    def __init__(self):
+        self.calls = 0
+
+    @property
+    def chat(self):
+        return self
+
+    @property
+    def completions(self):
+        return self
+
+    def with_options(self, **kwargs):
+        return self
+
+    def create(self, **kwargs):
+        self.calls += 1
+        prompt = ''.join(message['content'] for message in kwargs.get('messages', []))
+        chunks = []
+        for text in ('Benchmark ', 'summary.'):
+            delta = type('Delta', (), {'content': text})()
+            chunks.append(type('Chunk', (), {'choices': [type('Choice', (), {'delta': delta})()], 'usage': None})())
+        usage = type('Usage', (), {
+            'prompt_tokens': accessibility_app.estimate_tokens(prompt),
+            'completion_tokens': 3
+        })()
+        chunks.append(type('Chunk', (), {'choices': [], 'usage': usage})())
+        return iter(chunks)
+
+
+def run_fixture(pool, url, repeat, deadline, checks=None):
+    """Run one fixture `repeat` times and return the median timings"""
+    runs = []
+    for _ in range(repeat):
+        tester = accessibility_app.AccessibilityTester(pool=pool, progress=lambda event, data: None)
+        # The summary runs inline so its phase stays comparable with earlier baselines
+        results = tester.run_full_test(url, force=True, checks=checks, deadline=deadline, timings=True,
+                                       ai_summary='sync')
+        if results.get('error'):
+            raise RuntimeError(f'{url}: {results["error"]}')
+        runs.append(results)
+
+    def median(values):
+        return round(statistics.median(values), 4)
+
+    timings = [run['timings'] for run in runs]
+    checks = {}
+    for name in runs[0]['check_status']:
+        checks[name] = median([timing['checks'].get(name, {}).get('seconds', 0) for timing in timings])
+    phases = {}
+    for name in timings[0]['phases']:
+        phases[name] = median([timing['phases'].get(name, {}).get('seconds', 0) for timing in timings])
+
+    return {
+        'total_seconds': median([timing['total_seconds'] for timing in timings]),
+        'phases': phases,
+        'checks': checks,
+        'webdriver_commands': sum(phase['webdriver_commands'] for phase in timings[0]['phases'].values())
+            + sum(check['webdriver_commands'] for check in timings[0]['checks'].values()),
+        'total_issues': runs[0]['total_issues'],
+        'check_status': {name: status['status'] for name, status in runs[0]['check_status'].items()}
+    }
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """List timings that grew by more than `threshold` (and `min_seconds`) over the baseline"""
+    regressions = []
+
+    def check(fixture, metric, current, previous):
+        if previous is None or current is None:
+            return
+        if current - previous > min_seconds and current > previous * (1 + threshold):
+            regressions.append({
+                'fixture': fixture,
+                'metric': metric,
+                'baseline': previous,
+                'current': current,
+                'change': f'+{(current / previous - 1) * 100:.0f}%' if previous else 'new'
+            })
+
+    for fixture, current in results.items():
+        previous = baseline.get('results', {}).get(fixture)
+        if not previous:
+            continue
+        check(fixture, 'total', current['total_seconds'], previous.get('total_seconds'))
+        for group in ('phases', 'checks'):
+            for name, seconds in current[group].items():
+                check(fixture, f'{group[:-1]}:{name}', seconds, previous.get(group, {}).get(name))
+
+    return regressions
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count()
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the accessibility tester on local fixture pages')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in FIXTURE_SIZES),
+                        help='comma-separated fixture sizes in elements')
+    parser.add_argument('--fixtures', default=','.join(FIXTURE_KINDS), help='comma-separated fixture kinds')
+    parser.add_argument('--checks', default=None, help='comma-separated checks to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per fixture; the median is reported')
+    parser.add_argument('--deadline', type=float, default=accessibility_app.TEST_MAX_DEADLINE_SECONDS)
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='baseline JSON file')
+    parser.add_argument('--output', default=None, help='also write this run to a JSON file')
+    parser.add_argument('--update-baseline', action='store_true', help='overwrite the baseline with this run')
+    parser.add_argument('--threshold', type=float, default=0.2, help='relative slowdown reported as a regression')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='ignore slowdowns smaller than this')
+    args = parser.parse_args(argv)
+
+    kinds = [kind.strip() for kind in args.fixtures.split(',') if kind.strip()]
+    unknown = [kind for kind in kinds if kind not in FIXTURE_KINDS]
+    if unknown:
+        parser.error(f'unknown fixtures: {", ".join(unknown)}')
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    checks = [name.strip() for name in args.checks.split(',')] if args.checks else None
+    if checks and not set(checks) <= set(accessibility_app.CHECK_REGISTRY):
+        parser.error(f'unknown checks: {", ".join(sorted(set(checks) - set(accessibility_app.CHECK_REGISTRY)))}')
+
+    accessibility_app.client = StubOpenAI()
+    pages = {fixture_name(kind, size): build_fixture(kind, size) for size in sizes for kind in kinds}
+    pool = accessibility_app.DriverPool(size=1)
+    results = {}
+
+    try:
+        with FixtureServer(pages) as server:
+            # Launch Chrome and load a page once so the first fixture is not charged for it
+            pool.warm()
+            run_fixture(pool, server.url(fixture_name(kinds[0], sizes[0])), 1, args.deadline, checks)
+
+            for name in pages:
+                print(f'Benchmarking {name}...')
+                results[name] = run_fixture(pool, server.url(name), args.repeat, args.deadline, checks)
+                print(f'  {results[name]["total_seconds"]:.3f}s total, '
+                      f'{results[name]["webdriver_commands"]} WebDriver commands, '
+                      f'{results[name]["total_issues"]} issues')
+    finally:
+        pool.close()
+
+    run = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': environment(),
+        'repeat': args.repeat,
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f'Baseline written to {args.baseline}')
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(results, baseline, args.threshold, args.min_seconds)
+    if not regressions:
+        print(f'No regressions against {args.baseline}')
+        return 0
+
+    print(f'{len(regressions)} regressions against {args.baseline}:')
+    for regression in regressions:
+        print(f'  {regression["fixture"]} {regression["metric"]}: '
+              f'{regression["baseline"]:.3f}s -> {regression["current"]:.3f}s ({regression["change"]})')
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
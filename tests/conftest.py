@@ -0,0 +1,45 @@
+import functools
+import os
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# The app reads its settings at import time: no browser prewarm, no shared caches or history
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ['DRIVER_POOL_PREWARM'] = 'false'
+os.environ['RESULT_CACHE_BACKEND'] = 'none'
+os.environ['HISTORY_DB'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def node(tag, parent=-1, attrs=None, **extra):
+    """A DomSnapshot node record, visible and enabled unless overridden"""
+    data = {'tag': tag, 'parent': parent, 'attrs': attrs or {}, 'own_text': '', 'visible': True,
+            'enabled': True, 'rect': [0, 0, 10, 10]}
+    data.update(extra)
+    return data
+
+
+class QuietFiles(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    """serve(directory) or serve(handler=...) -> base URL of a local HTTP server, shut down after the test"""
+    servers = []
+
+    def start(directory=None, handler=None):
+        handler = handler or functools.partial(QuietFiles, directory=str(directory))
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f'http://127.0.0.1:{server.server_port}'
+
+    yield start
+    for server in servers:
+        server.shutdown()
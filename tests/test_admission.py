@@ -0,0 +1,133 @@
+import threading
+
+import pytest
+
+import app
+
+
+def controller(capacity=1, max_queue=1, queue_timeout=5):
+    return app.AdmissionController(capacity, max_queue=max_queue, queue_timeout=queue_timeout, min_free_memory_mb=0)
+
+
+def test_tests_run_up_to_capacity():
+    admission = controller(capacity=2)
+    first, second = admission.admit(), admission.admit()
+    with first, second:
+        assert admission.stats()['running'] == 2
+        assert admission.stats()['queued'] == 0
+    assert admission.stats()['running'] == 0
+
+
+def test_queue_is_bounded():
+    admission = controller(capacity=1, max_queue=1)
+    running = admission.admit()
+    admission.start(running)
+    admission.admit()
+    with pytest.raises(app.AdmissionRejected) as error:
+        admission.admit()
+    assert error.value.retry_after >= 1
+    assert admission.stats()['rejected'] == 1
+
+
+def test_check_counts_tests_about_to_queue():
+    admission = controller(capacity=1, max_queue=2)
+    admission.check()
+    admission.check(waiting=2)
+    with pytest.raises(app.AdmissionRejected, match=r'\(3 waiting\)'):
+        admission.check(waiting=3)
+    # Checking never takes a place
+    assert admission.stats()['queued'] == 0
+
+
+def test_queued_test_times_out():
+    admission = controller(capacity=1, queue_timeout=0.2)
+    with admission.admit():
+        waiting = admission.admit()
+        with pytest.raises(app.AdmissionRejected, match='No browser capacity'):
+            admission.start(waiting)
+        assert waiting.state == 'released'
+    assert admission.stats()['queued'] == 0
+
+
+def test_waiting_test_starts_when_a_session_frees_up():
+    admission = controller(capacity=1)
+    first = admission.admit()
+    admission.start(first)
+    second = admission.admit()
+    threading.Timer(0.1, first.release).start()
+    with second:
+        assert second.state == 'running'
+
+
+def test_weight_is_capped_at_capacity():
+    admission = controller(capacity=2)
+    with admission.admit(weight=5) as ticket:
+        assert ticket.weight == 2
+        assert admission.stats()['running'] == 2
+
+
+def test_release_is_idempotent():
+    admission = controller(capacity=1)
+    ticket = admission.admit()
+    ticket.release()
+    ticket.release()
+    assert admission.stats()['queued'] == 0
+    with admission.admit() as ticket:
+        pass
+    ticket.release()
+    assert admission.stats()['running'] == 0
+
+
+def test_quick_mode_needs_no_ticket():
+    assert app.admit_test({'mode': 'quick'}) is None
+
+
+def test_jobs_take_their_place_once_a_worker_runs_them(monkeypatch):
+    admission = controller(capacity=1, max_queue=4)
+    monkeypatch.setattr(app, 'admission', admission)
+    manager = app.JobManager(workers=1)
+    monkeypatch.setattr(app, 'job_manager', manager)
+    release = threading.Event()
+    started = threading.Event()
+    queued_at_start = []
+
+    def test(self, url, **options):
+        queued_at_start.append(admission.stats()['queued'])
+        started.set()
+        release.wait(5)
+        return {'total_issues': 0}
+
+    monkeypatch.setattr(app.AccessibilityTester, 'run_full_test', test)
+    first = manager.submit('https://example.com/1', {'mode': 'full'})
+    assert started.wait(5)
+    second = manager.submit('https://example.com/2', {'mode': 'full'})
+    # The second job is waiting for the only worker, not in the admission queue
+    assert admission.stats()['queued'] == 0
+    assert manager.waiting() == 1
+    release.set()
+    for job in (first, second):
+        assert [event for event in manager.follow(job, keepalive=1) if event is not None][-1]['event'] == 'completed'
+    assert admission.stats()['running'] == 0
+
+
+def test_job_rejected_by_admission_fails_with_a_retry_hint(monkeypatch):
+    def reject(options, weight=1):
+        raise app.AdmissionRejected('No browser capacity after 5s in the queue', 9)
+
+    monkeypatch.setattr(app, 'admit_test', reject)
+    manager = app.JobManager(workers=1)
+    job = manager.submit('https://example.com', {'mode': 'full'})
+    list(manager.follow(job, keepalive=1))
+    assert job.status == 'failed'
+    assert job.result['retry_after'] == 9
+
+
+def test_full_queue_is_a_429(monkeypatch):
+    admission = controller(capacity=1, max_queue=0)
+    monkeypatch.setattr(app, 'admission', admission)
+    running = admission.admit()
+    admission.start(running)
+    response = app.app.test_client().post('/jobs', json={'url': 'https://example.com'})
+    assert response.status_code == 429
+    assert response.headers['Retry-After']
+    running.release()
@@ -0,0 +1,160 @@
+import app
+
+
+class Capture:
+    """Builds DOMSnapshot.captureSnapshot documents with a shared string table"""
+    def __init__(self):
+        self.strings = []
+        self.documents = []
+
+    def string(self, value):
+        if value not in self.strings:
+            self.strings.append(value)
+        return self.strings.index(value)
+
+    def document(self, frame_id, elements, frames=None, shadow_roots=()):
+        """elements: (parent index, tag or None for a shadow root, attrs, backend id, box)"""
+        nodes = {'parentIndex': [], 'nodeName': [], 'nodeType': [], 'backendNodeId': [], 'attributes': [],
+                 'shadowRootType': {'index': list(shadow_roots), 'value': [0] * len(shadow_roots)},
+                 'contentDocumentIndex': {'index': list((frames or {}).keys()), 'value': list((frames or {}).values())}}
+        layout = {'nodeIndex': [], 'bounds': []}
+        for index, (parent, tag, attrs, backend_id, box) in enumerate(elements):
+            nodes['parentIndex'].append(parent)
+            nodes['nodeName'].append(self.string((tag or '#document-fragment').upper()))
+            nodes['nodeType'].append(1 if tag else 11)
+            nodes['backendNodeId'].append(backend_id)
+            nodes['attributes'].append([self.string(item) for pair in attrs.items() for item in pair])
+            if box:
+                layout['nodeIndex'].append(index)
+                layout['bounds'].append(box)
+        self.documents.append({'frameId': self.string(frame_id), 'nodes': nodes, 'layout': layout})
+
+
+def ax(node_id, role, name='', parent=None, children=(), backend_id=None, ignored=False, sources=(), **properties):
+    return {'nodeId': str(node_id), 'parentId': str(parent) if parent else None,
+            'childIds': [str(child) for child in children], 'role': {'value': role},
+            'name': {'value': name, 'sources': list(sources)},
+            'ignored': ignored, 'backendDOMNodeId': backend_id,
+            'properties': [{'name': key, 'value': {'value': value}} for key, value in properties.items()]}
+
+
+class FakeDriver:
+    def __init__(self, capture, trees):
+        self.capture = capture
+        self.trees = trees
+        self.commands = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append(command)
+        if command == 'DOMSnapshot.captureSnapshot':
+            return {'strings': self.capture.strings, 'documents': self.capture.documents}
+        frame = params.get('frameId')
+        if frame not in self.trees:
+            raise RuntimeError('out-of-process frame')
+        return {'nodes': self.trees[frame]}
+
+
+def page_tree():
+    capture = Capture()
+    capture.document('main', [
+        (-1, 'html', {'lang': 'en'}, 1, None),
+        (0, 'body', {}, 2, None),
+        (1, 'div', {'role': 'heading', 'aria-level': '1'}, 3, [0, 0, 100, 20]),
+        (1, 'div', {'aria-label': 'Promo'}, 4, [0, 20, 100, 20]),
+        (1, 'iframe', {'id': 'pay'}, 5, [10, 100, 300, 200]),
+        (1, 'my-card', {}, 6, [0, 300, 10, 10]),
+        (5, None, {}, 7, None),
+        (6, 'input', {'id': 'n'}, 8, [0, 300, 10, 10]),
+    ], frames={4: 1}, shadow_roots=(6,))
+    capture.document('payment', [
+        (-1, 'html', {}, 20, None),
+        (0, 'body', {}, 21, None),
+        (1, 'input', {'type': 'text'}, 22, [5, 5, 50, 10]),
+    ])
+    trees = {
+        'main': [
+            ax(1, 'RootWebArea', 'Shop', children=[2, 3, 4, 5], backend_id=1),
+            ax(2, 'heading', 'Welcome', parent=1, backend_id=3, level=1),
+            ax(3, 'generic', 'Promo', parent=1, backend_id=4),
+            ax(4, 'Iframe', parent=1, backend_id=5),
+            ax(5, 'textbox', '', parent=1, backend_id=8),
+        ],
+        'payment': [
+            ax(1, 'RootWebArea', 'Pay', children=[2], backend_id=20),
+            ax(2, 'textbox', 'Card number', parent=1, backend_id=22, sources=[
+                {'type': 'attribute', 'attribute': 'aria-labelledby'},
+                {'type': 'relatedElement', 'nativeSource': 'labelfor', 'value': {'value': 'Card number'}},
+                {'type': 'placeholder', 'attribute': 'placeholder', 'superseded': True,
+                 'value': {'value': '1234 5678'}},
+            ]),
+        ],
+    }
+    return capture, trees
+
+
+def test_tree_joins_every_frame_to_its_elements():
+    capture, trees = page_tree()
+    driver = FakeDriver(capture, trees)
+    tree = app.AXTree.fetch(driver)
+    assert driver.commands == ['DOMSnapshot.captureSnapshot', 'Accessibility.getFullAXTree',
+                               'Accessibility.getFullAXTree']
+    fields = tree.by_role('textbox')
+    assert [node['name'] for node in fields] == ['', 'Card number']
+    main_field, framed_field = (tree.element(node) for node in fields)
+    assert main_field['shadow'] == 'my-card:nth-of-type(1)'
+    assert framed_field['frame'] == 'iframe#pay'
+    # Rects inside the frame are offset by the iframe's position
+    assert framed_field['rect'] == [15, 105, 50, 10]
+    assert tree.by_id(main_field, 'n') is main_field
+    assert tree.by_id(framed_field, 'n') is None
+
+
+def test_out_of_process_frames_are_skipped():
+    capture, trees = page_tree()
+    del trees['payment']
+    tree = app.AXTree.fetch(FakeDriver(capture, trees))
+    assert [node['name'] for node in tree.by_role('textbox')] == ['']
+
+
+def test_checks_read_the_computed_tree():
+    capture, trees = page_tree()
+    tester = app.AccessibilityTester()
+    tester.ax_tree = app.AXTree.fetch(FakeDriver(capture, trees))
+    assert tester.check_headings_structure() == []
+    labels = tester.check_form_labels()
+    assert [(issue['element'], issue.get('shadow')) for issue in labels] == [('input', 'my-card:nth-of-type(1)')]
+    aria = tester.check_aria_attributes()
+    assert [(issue['type'], issue['aria_label']) for issue in aria] == [('ARIA Label Without Role', 'Promo')]
+
+
+def test_placeholder_is_not_a_label():
+    capture = Capture()
+    capture.document('main', [
+        (-1, 'html', {}, 1, None),
+        (0, 'body', {}, 2, None),
+        (1, 'input', {'placeholder': 'Email'}, 3, [0, 0, 100, 20]),
+        (1, 'input', {'title': 'Phone'}, 4, [0, 20, 100, 20]),
+        (1, 'input', {'aria-label': 'Name'}, 5, [0, 40, 100, 20]),
+    ])
+    trees = {'main': [
+        ax(1, 'RootWebArea', 'Form', children=[2, 3, 4], backend_id=1),
+        ax(2, 'textbox', 'Email', parent=1, backend_id=3, sources=[
+            {'type': 'attribute', 'attribute': 'aria-label'},
+            {'type': 'placeholder', 'attribute': 'placeholder', 'value': {'value': 'Email'}},
+        ]),
+        ax(3, 'textbox', 'Phone', parent=1, backend_id=4, sources=[
+            {'type': 'attribute', 'attribute': 'title', 'value': {'value': 'Phone'}},
+        ]),
+        ax(4, 'textbox', 'Name', parent=1, backend_id=5, sources=[
+            {'type': 'attribute', 'attribute': 'aria-label', 'value': {'value': 'Name'}},
+        ]),
+    ]}
+    tester = app.AccessibilityTester()
+    tester.ax_tree = app.AXTree.fetch(FakeDriver(capture, trees))
+    # Email and Phone have names, but only from the placeholder and title
+    labels = tester.check_form_labels()
+    assert [issue['rect'] for issue in labels] == [[0, 0, 100, 20], [0, 20, 100, 20]]
+
+
+def test_no_documents_means_no_tree():
+    assert app.AXTree.fetch(FakeDriver(Capture(), {})) is None
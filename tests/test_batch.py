@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def site(tmp_path, serve):
+    for name, body in (('good', '<h1>Good</h1><img src="a.png" alt="A chart">'), ('bad', '<img src="a.png">')):
+        (tmp_path / f'{name}.html').write_text(f'<html lang="en"><head><title>{name}</title></head><body>{body}</body></html>')
+    return serve(tmp_path)
+
+
+def post(client, **data):
+    response = client.post('/batch', json=dict({'mode': 'quick', 'ai_summary': False}, **data))
+    return response, [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_batch_streams_a_line_per_url_then_a_summary(site):
+    urls = [site + '/good.html', site + '/bad.html', site + '/missing.html']
+    response, lines = post(app.app.test_client(), urls=urls, concurrency=2)
+    assert response.mimetype == 'application/x-ndjson'
+    results = {line['url']: line['result'] for line in lines if line['type'] == 'result'}
+    assert set(results) == set(urls)
+    assert sorted(line['index'] for line in lines[:-1]) == [0, 1, 2]
+    assert 'error' in results[site + '/missing.html']
+
+    summary = lines[-1]
+    assert summary['type'] == 'summary'
+    assert (summary['total_urls'], summary['succeeded'], summary['failed']) == (3, 2, 1)
+    assert summary['total_issues'] == results[site + '/good.html']['total_issues'] + results[site + '/bad.html']['total_issues']
+
+
+def test_run_batch_yields_in_completion_order(monkeypatch):
+    def run_full_test(self, url, **options):
+        if url == 'boom':
+            raise RuntimeError('failed')
+        return {'url': url}
+
+    monkeypatch.setattr(app.AccessibilityTester, 'run_full_test', run_full_test)
+    results = sorted(app.run_batch(['a', 'boom', 'c'], 2))
+    assert results == [(0, 'a', {'url': 'a'}), (1, 'boom', {'error': 'failed'}), (2, 'c', {'url': 'c'})]
+
+
+@pytest.mark.parametrize('data, message', [
+    ({'urls': []}, 'non-empty list'),
+    ({'urls': ['https://example.com'], 'concurrency': 'many'}, 'concurrency must be an integer'),
+    ({'urls': ['https://example.com'], 'mode': 'fast'}, 'Unknown mode'),
+])
+def test_invalid_batches_are_rejected(data, message):
+    response = app.app.test_client().post('/batch', json=data)
+    assert response.status_code == 400
+    assert message in response.get_json()['error']
+
+
+def test_batch_size_is_capped(monkeypatch):
+    monkeypatch.setattr(app, 'BATCH_MAX_URLS', 2)
+    response = app.app.test_client().post('/batch', json={'urls': ['a.com', 'b.com', 'c.com']})
+    assert response.status_code == 400
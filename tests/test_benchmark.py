@@ -0,0 +1,46 @@
+import pytest
+
+import app
+import benchmark
+
+
+@pytest.mark.parametrize('kind', sorted(benchmark.FIXTURE_KINDS))
+def test_fixtures_are_deterministic_and_sized(kind):
+    page = benchmark.build_fixture(kind, 1000)
+    assert page == benchmark.build_fixture(kind, 1000)
+    parser = app.StaticSnapshotParser('http://127.0.0.1/')
+    parser.feed(page)
+    elements = len(parser.snapshot().nodes)
+    assert 900 <= elements <= 1200
+
+
+def test_fixture_server_serves_pages_and_the_pixel():
+    pages = {'forms-1000': benchmark.build_fixture('forms', 1000)}
+    with benchmark.FixtureServer(pages) as server:
+        snapshot, _ = app.fetch_static_snapshot(server.url('forms-1000'))
+        assert snapshot.title == 'Benchmark forms 1000'
+        assert app.http_session.get(server.url('pixel.png')).content == benchmark.PIXEL_PNG
+        assert app.http_session.get(server.url('missing')).status_code == 404
+
+
+def test_stub_client_streams_a_summary(monkeypatch):
+    stub = benchmark.StubOpenAI()
+    monkeypatch.setattr(app, 'get_openai_client', lambda: stub)
+    monkeypatch.setattr(app, 'summary_cache', None)
+    summary, usage = app.generate_summary([{'type': 'Missing Alt Text', 'severity': 'high'}])
+    assert summary == 'Benchmark summary.'
+    assert usage['completion_tokens'] == 3
+    assert stub.calls == 1
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {'results': {'forms-1000': {'total_seconds': 1.0, 'phases': {'page_load': 0.2},
+                                           'checks': {'form_labels': 0.01}}}}
+    results = {
+        'forms-1000': {'total_seconds': 1.5, 'phases': {'page_load': 0.21}, 'checks': {'form_labels': 0.03, 'new': 1}},
+        'images-1000': {'total_seconds': 9, 'phases': {}, 'checks': {}}
+    }
+    regressions = benchmark.compare(results, baseline, threshold=0.2, min_seconds=0.05)
+    # page_load is within the threshold, form_labels below min_seconds, the rest have no baseline
+    assert regressions == [{'fixture': 'forms-1000', 'metric': 'total', 'baseline': 1.0, 'current': 1.5,
+                            'change': '+50%'}]
@@ -0,0 +1,107 @@
+import time
+
+import pytest
+
+import app
+
+
+@pytest.fixture(params=['memory', 'disk'])
+def backend(request, tmp_path):
+    if request.param == 'disk':
+        return app.DiskCacheBackend(str(tmp_path), max_entries=2)
+    return app.MemoryCacheBackend(max_entries=2)
+
+
+def result(**extra):
+    data = {
+        'run_id': 'run-1',
+        'url': 'https://example.com/',
+        'issues': [{'type': 'Missing Alt Text', 'severity': 'high'}],
+        'ai_summary': None,
+        'cached': False
+    }
+    data.update(extra)
+    return data
+
+
+def test_normalize_cache_url():
+    assert app.normalize_cache_url('HTTPS://Example.com:443?b=2&a=1#top') == 'https://example.com/?a=1&b=2'
+    assert app.normalize_cache_url('http://example.com:8080/x') == 'http://example.com:8080/x'
+
+
+def test_key_depends_on_validator_and_variant():
+    cache = app.ResultCache(app.MemoryCacheBackend())
+    key = cache.key('https://example.com', 'etag:"1"', {'mode': 'full'})
+    assert key == cache.key('https://EXAMPLE.com/', 'etag:"1"', {'mode': 'full'})
+    assert key != cache.key('https://example.com', 'etag:"2"', {'mode': 'full'})
+    assert key != cache.key('https://example.com', 'etag:"1"', {'mode': 'quick'})
+
+
+def test_hit_is_marked_cached(backend):
+    cache = app.ResultCache(backend)
+    cache.set('k', result())
+    hit = cache.get('k')
+    assert hit['cached'] is True
+    assert hit['cached_at']
+    assert hit['issues'] == result()['issues']
+
+
+def test_expired_entries_are_misses(backend):
+    cache = app.ResultCache(backend, ttl=-1)
+    cache.set('k', result())
+    assert cache.get('k') is None
+
+
+def test_least_recently_used_entry_is_evicted(backend):
+    cache = app.ResultCache(backend)
+    cache.set('a', result(run_id='a'))
+    time.sleep(0.01)
+    cache.set('b', result(run_id='b'))
+    time.sleep(0.01)
+    assert cache.get('a')['run_id'] == 'a'
+    time.sleep(0.01)
+    cache.set('c', result(run_id='c'))
+    assert cache.get('b') is None
+    assert cache.get('a') and cache.get('c')
+
+
+def test_run_fields_are_not_cached(backend):
+    cache = app.ResultCache(backend)
+    cache.set('k', result(timings={'total': 1.0}, summary_status='pending', summary_url='/summaries/run-1'))
+    hit = cache.get('k')
+    assert 'timings' not in hit
+    assert 'summary_status' not in hit
+    assert 'summary_url' not in hit
+
+
+def test_hits_do_not_share_state(backend):
+    cache = app.ResultCache(backend)
+    value = result()
+    cache.set('k', value)
+    # Neither the stored dict nor an earlier hit leaks into the next hit
+    value['issues'][0]['severity'] = 'low'
+    first = cache.get('k')
+    first['issues'][0]['fingerprint'] = 'abc'
+    first['issues'].append({'type': 'Extra'})
+    second = cache.get('k')
+    assert second['issues'] == [{'type': 'Missing Alt Text', 'severity': 'high'}]
+
+
+def test_async_summary_fields_are_set_per_run(monkeypatch):
+    submitted = []
+
+    class FakeRun:
+        def state(self):
+            return {'summary_status': 'pending', 'ai_summary': None}
+
+    def audit(self, url, **options):
+        self.summary_mode = 'async'
+        return result(cached=True)
+
+    monkeypatch.setattr(app.AccessibilityTester, 'audit', audit)
+    monkeypatch.setattr(app.summary_manager, 'submit', lambda *args: submitted.append(args) or FakeRun())
+    tester = app.AccessibilityTester()
+    results = tester.run_full_test('https://example.com/')
+    assert results['summary_url'] == '/summaries/run-1'
+    assert results['summary_status'] == 'pending'
+    assert submitted[0][0] == 'run-1'
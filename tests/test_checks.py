@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+class FakeChecks(app.AccessibilityTester):
+    def check_fast(self):
+        return [{'type': 'Fast', 'severity': 'low'}]
+
+    def check_slow(self):
+        time.sleep(0.4)
+        return [{'type': 'Slow', 'severity': 'low'}]
+
+    def check_watched(self):
+        self.steps = 0
+        for _ in self.watched(range(1000)):
+            self.steps += 1
+            time.sleep(0.01)
+        return [{'type': 'Watched', 'severity': 'low'}]
+
+
+@pytest.fixture
+def fake_registry(monkeypatch):
+    monkeypatch.setitem(app.CHECK_REGISTRY, 'slow', app.CheckSpec('slow', 'slow', 'check_slow', (), budget=0.2))
+    monkeypatch.setitem(app.CHECK_REGISTRY, 'fast', app.CheckSpec('fast', 'fast', 'check_fast', (), budget=0.2))
+    monkeypatch.setitem(app.CHECK_REGISTRY, 'watched', app.CheckSpec('watched', 'watched', 'check_watched', (), budget=0.2))
+
+
+def run(names, deadline=None):
+    tester = FakeChecks(progress=lambda event, data: None)
+    issues = tester.run_checks(names, deadline or app.Deadline(10))
+    return tester, issues
+
+
+def test_budget_starts_when_a_worker_picks_the_check_up(fake_registry, monkeypatch):
+    monkeypatch.setattr(app, 'CHECK_WORKERS', 1)
+    tester, issues = run(['slow', 'fast'])
+    assert tester.check_status['slow']['status'] == 'timed_out'
+    assert tester.check_status['fast']['status'] == 'completed'
+    assert [issue['type'] for issue in issues] == ['Fast']
+
+
+def test_concurrent_runs_do_not_share_workers(fake_registry, monkeypatch):
+    monkeypatch.setattr(app, 'CHECK_WORKERS', 2)
+    statuses = []
+
+    def audit():
+        tester, _ = run(['slow', 'fast'])
+        statuses.append(tester.check_status['fast']['status'])
+
+    threads = [threading.Thread(target=audit) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert statuses == ['completed'] * 4
+
+
+def test_deadline_reached_before_a_queued_check_starts(fake_registry, monkeypatch):
+    monkeypatch.setattr(app, 'CHECK_WORKERS', 1)
+    tester, _ = run(['slow', 'fast'], app.Deadline(0.1))
+    assert tester.check_status['slow']['status'] == 'timed_out'
+    assert tester.check_status['fast']['status'] == 'timed_out'
+    assert tester.check_status['fast']['error'] == 'Test deadline reached before the check started'
+
+
+def test_timed_out_check_stops_at_its_next_step(fake_registry):
+    started = time.monotonic()
+    tester, issues = run(['watched', 'fast'])
+    assert time.monotonic() - started < 1
+    assert tester.check_status['watched']['status'] == 'timed_out'
+    assert 'still_running' not in tester.check_status['watched']
+    assert tester.steps < 100
+    assert [issue['type'] for issue in issues] == ['Fast']
+
+
+def test_check_that_ignores_its_budget_is_reported_as_still_running(fake_registry, monkeypatch):
+    monkeypatch.setattr(app, 'CHECK_STOP_GRACE_SECONDS', 0.05)
+    tester, _ = run(['slow'])
+    assert tester.check_status['slow']['status'] == 'timed_out'
+    assert tester.check_status['slow']['still_running'] is True
@@ -0,0 +1,153 @@
+import numpy as np
+import pytest
+
+import app
+
+
+def canvas(width=200, height=100, color=(255, 255, 255)):
+    return np.tile(np.array(color, dtype=np.uint8), (height, width, 1))
+
+
+def draw_text(pixels, x, y, w, h, color=(0, 0, 0)):
+    # Horizontal strokes, like lines of glyphs, over the box's own background
+    for row in range(y + 2, y + h - 2, 4):
+        pixels[row:row + 2, x + 2:x + w - 2] = color
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('rgb(255, 0, 0)', (255.0, 0.0, 0.0, 1.0)),
+    ('rgba(0, 0, 0, 0.5)', (0.0, 0.0, 0.0, 0.5)),
+    ('#fff', (255.0, 255.0, 255.0, 1.0)),
+    ('#00000080', (0.0, 0.0, 0.0, 128 / 255)),
+    ('transparent', (0.0, 0.0, 0.0, 0.0)),
+    ('color(srgb 1 0.5 0 / 0.25)', (255.0, 127.5, 0.0, 0.25)),
+])
+def test_parse_css_color(value, expected):
+    assert parse(value) == pytest.approx(expected)
+
+
+def parse(value):
+    return app.parse_css_color(value)
+
+
+def test_contrast_ratio_extremes():
+    black = np.array([[0.0, 0.0, 0.0]])
+    white = np.array([[255.0, 255.0, 255.0]])
+    assert app.contrast_ratios(black, white)[0] == pytest.approx(21.0)
+    assert app.contrast_ratios(white, white)[0] == pytest.approx(1.0)
+
+
+def test_semi_transparent_text_is_composited_over_its_background():
+    foreground = app.composite(np.array([[0.0, 0.0, 0.0, 0.5]]), np.array([[255.0, 255.0, 255.0]]))
+    assert foreground[0] == pytest.approx([127.5, 127.5, 127.5])
+
+
+def test_effective_background_composites_down_to_the_canvas():
+    snapshot = app.DomSnapshot({'nodes': [
+        {'tag': 'body', 'attrs': {}, 'parent': -1, 'background': 'rgb(0, 0, 0)'},
+        {'tag': 'div', 'attrs': {}, 'parent': 0, 'background': 'rgba(255, 255, 255, 0.5)'},
+        {'tag': 'p', 'attrs': {}, 'parent': 1, 'background': 'transparent'},
+    ]})
+    backgrounds = app.effective_backgrounds(snapshot)
+    assert backgrounds[2] == pytest.approx([127.5, 127.5, 127.5])
+
+
+def test_pixel_contrast_of_dark_text_on_white():
+    pixels = canvas()
+    draw_text(pixels, 20, 20, 100, 20)
+    assert app.pixel_contrast_ratios(pixels, [[20, 20, 100, 20]])[0] == pytest.approx(21.0, rel=0.01)
+
+
+def test_pixel_contrast_reads_the_background_from_outside_the_box():
+    # The text's highlight covers its whole box; the page around it is white
+    pixels = canvas()
+    pixels[20:40, 20:120] = (119, 119, 119)
+    draw_text(pixels, 20, 20, 100, 20, color=(0, 0, 0))
+    ratio = app.pixel_contrast_ratios(pixels, [[20, 20, 100, 20]])[0]
+    assert ratio > 4.5
+
+
+def test_box_with_no_visible_text_is_not_measured():
+    pixels = canvas(color=(119, 119, 119))
+    assert np.isnan(app.pixel_contrast_ratios(pixels, [[20, 20, 100, 20]])[0])
+
+
+def test_boxes_outside_the_screenshot_are_not_measured():
+    ratios = app.pixel_contrast_ratios(canvas(), [[500, 500, 10, 10], [10, 10, 1, 1]])
+    assert np.isnan(ratios).all()
+
+
+def test_many_boxes_match_their_individual_measurements():
+    pixels = canvas(400, 400)
+    boxes = []
+    for i in range(10):
+        x, y = 10 + (i % 3) * 120, 10 + (i // 3) * 90
+        grey = 20 * i
+        draw_text(pixels, x, y, 100, 30, color=(grey, grey, grey))
+        boxes.append([x, y, 100, 30])
+    batched = app.pixel_contrast_ratios(pixels, boxes)
+    single = [app.pixel_contrast_ratios(pixels, [box])[0] for box in boxes]
+    assert batched == pytest.approx(single)
+    assert list(batched) == sorted(batched, reverse=True)
+
+
+def test_pixel_mode_falls_back_to_computed_contrast_without_visible_text():
+    tester = app.AccessibilityTester()
+    tester.contrast_mode = 'pixels'
+    tester.snapshot = app.DomSnapshot({'nodes': [
+        {'tag': 'body', 'attrs': {}, 'parent': -1, 'background': 'rgb(255, 255, 255)', 'color': 'rgb(0, 0, 0)',
+         'own_text': False, 'visible': True, 'rect': [0, 0, 200, 100]},
+        {'tag': 'p', 'attrs': {}, 'parent': 0, 'background': 'transparent', 'color': 'rgb(89, 89, 89)',
+         'own_text': True, 'visible': True, 'text': 'Grey text', 'font_size': '16px', 'rect': [20, 20, 100, 20]},
+    ]})
+    tester._screenshot_pixels = canvas(color=(89, 89, 89))
+    issues = tester.check_color_contrast()
+    assert issues == []
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('oklch(0.627955 0.257683 29.2339)', (255.0, 0.0, 0.0, 1.0)),
+    ('oklab(1 0 0 / 0.5)', (255.0, 255.0, 255.0, 0.5)),
+    ('lab(54.2917 80.8125 69.8851)', (255.0, 0.0, 0.0, 1.0)),
+    ('lch(54.2917 106.8390 40.8526deg)', (255.0, 0.0, 0.0, 1.0)),
+    ('color(display-p3 0 0 0)', (0.0, 0.0, 0.0, 1.0)),
+    ('color(display-p3 1 0 0)', (255.0, 0.0, 0.0, 1.0)),
+    ('color(srgb-linear 1 1 1)', (255.0, 255.0, 255.0, 1.0)),
+    ('color(xyz-d65 0.9505 1 1.089)', (255.0, 255.0, 255.0, 1.0)),
+])
+def test_parse_modern_color_spaces(value, expected):
+    assert parse(value) == pytest.approx(expected, abs=0.6)
+
+
+@pytest.mark.parametrize('value', ['color(unknown-space 1 0 0)', 'oklch(0.5 0.1)', 'light-dark(red, blue)', ''])
+def test_unparseable_colors_are_none(value):
+    assert parse(value) is None
+
+
+def text_node(index, parent, color, background='transparent'):
+    return {'tag': 'p', 'attrs': {}, 'parent': parent, 'background': background, 'color': color,
+            'own_text': True, 'visible': True, 'text': f'Text {index}', 'font_size': '16px', 'rect': [0, 0, 10, 10]}
+
+
+def test_unparseable_colors_are_reported_not_guessed():
+    tester = app.AccessibilityTester()
+    tester.snapshot = app.DomSnapshot({'nodes': [
+        {'tag': 'body', 'attrs': {}, 'parent': -1, 'background': 'rgb(255, 255, 255)', 'color': 'rgb(0, 0, 0)',
+         'own_text': False, 'visible': True, 'rect': [0, 0, 100, 100]},
+        text_node(1, 0, 'oklch(0.2 0 0)'),
+        text_node(2, 0, 'oklch(0.95 0 0)'),
+        text_node(3, 0, 'device-cmyk(0 0 0 1)'),
+        {'tag': 'div', 'attrs': {}, 'parent': 0, 'background': 'device-cmyk(0 0 0 1)', 'color': 'rgb(0, 0, 0)',
+         'own_text': False, 'visible': True, 'rect': [0, 0, 100, 100]},
+        text_node(5, 4, 'rgb(255, 255, 255)', background='rgba(0, 0, 0, 0.5)'),
+    ]})
+    issues = tester.check_color_contrast()
+    by_text = {issue['text']: issue for issue in issues}
+    assert set(by_text) == {'Text 2', 'Text 3', 'Text 5'}
+    assert by_text['Text 2']['type'] == 'Low Color Contrast'
+    assert by_text['Text 3']['type'] == 'Contrast Not Evaluated'
+    assert 'text color' in by_text['Text 3']['description']
+    assert by_text['Text 5']['type'] == 'Contrast Not Evaluated'
+    assert 'background color' in by_text['Text 5']['description']
+    assert tester.calculate_contrast_ratio('oklch(0 0 0)', 'white') is None
+    assert tester.calculate_contrast_ratio('oklch(0 0 0)', '#fff') == pytest.approx(21.0)
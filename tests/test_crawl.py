@@ -0,0 +1,135 @@
+import threading
+
+import pytest
+
+import app
+
+ARTICLE = '''<html lang="en"><head><title>{title}</title></head><body>
+<nav><a href="/index.html">Home</a></nav>
+<main><h1>{title}</h1>{paragraphs}<img src="photo.png"></main>
+</body></html>'''
+
+HOME = '''<html lang="en"><head><title>Home</title></head><body>
+<header><h1>Home</h1></header>
+<ul><li><a href="/a.html">A</a><li><a href="/b.html">B</a><li><a href="/c.html">C</a>
+<li><a href="/private/d.html">D</a><li><a href="/file.pdf">PDF</a><li><a href="https://elsewhere.test/">Out</a></ul>
+</body></html>'''
+
+
+def parse(html):
+    parser = app.StaticSnapshotParser('https://example.com/')
+    parser.feed(html)
+    return parser.snapshot()
+
+
+def fingerprint(html):
+    return app.structure_fingerprint(parse(html))
+
+
+def article(title, paragraphs):
+    return ARTICLE.format(title=title, paragraphs='<p>text</p>' * paragraphs)
+
+
+def test_fingerprint_ignores_content():
+    assert fingerprint(article('One', 1)) == fingerprint(article('Two', 30))
+    assert fingerprint(article('One', 1)) != fingerprint(HOME)
+
+
+def test_fingerprint_only_collapses_consecutive_siblings():
+    assert fingerprint('<div><p>a</p><p>b</p><ul></ul></div>') == fingerprint('<div><p>a</p><ul></ul></div>')
+    # The same shapes in a different order are a different layout
+    assert fingerprint('<div><p>a</p><ul></ul><p>b</p></div>') != fingerprint('<div><p>a</p><ul></ul></div>')
+
+
+def test_fingerprint_stops_at_max_depth():
+    shallow = '<div><section><p>a</p></section></div>'
+    deep = '<div><section><p><b>a</b></p></section></div>'
+    assert app.structure_fingerprint(parse(shallow), max_depth=2) == app.structure_fingerprint(parse(deep), max_depth=2)
+    assert app.structure_fingerprint(parse(shallow)) != app.structure_fingerprint(parse(deep))
+
+
+@pytest.fixture
+def site(tmp_path, serve):
+    (tmp_path / 'index.html').write_text(HOME)
+    for name, paragraphs in (('a', 1), ('b', 3), ('c', 8)):
+        (tmp_path / f'{name}.html').write_text(article(name.upper(), paragraphs))
+    (tmp_path / 'private').mkdir()
+    (tmp_path / 'private' / 'd.html').write_text(article('D', 2))
+    (tmp_path / 'robots.txt').write_text('User-agent: *\nDisallow: /private/\n')
+    base = serve(tmp_path)
+    # The sitemaps hold absolute URLs, so they are written once the port is known
+    (tmp_path / 'sitemap.xml').write_text(
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f'<sitemap><loc>{base}/pages.xml</loc></sitemap></sitemapindex>'
+    )
+    (tmp_path / 'pages.xml').write_text(
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f'<url><loc>{base}/a.html</loc></url><url><loc> {base}/private/d.html </loc></url></urlset>'
+    )
+    return base
+
+
+OPTIONS = {'mode': 'quick', 'ai_summary': False}
+
+
+def test_load_sitemap_follows_indexes(site):
+    assert app.load_sitemap(site + '/sitemap.xml') == [site + '/a.html', site + '/private/d.html']
+    assert app.load_sitemap(site + '/sitemap.xml', limit=1) == [site + '/a.html']
+
+
+def test_crawl_clusters_pages_and_audits_representatives(site):
+    crawler = app.SiteCrawler([site + '/index.html'], OPTIONS, representatives=2)
+    results = crawler.run()
+    assert sorted(page['url'] for page in results['pages']) == [site + path for path in
+                                                                ('/a.html', '/b.html', '/c.html', '/index.html')]
+    articles = next(cluster for cluster in results['clusters'] if cluster['size'] == 3)
+    assert len(articles['representatives']) == 2
+    # The image without alt text is on every article, so it belongs to the template
+    assert 'Missing Alt Text' in [issue['type'] for issue in articles['template_issues']]
+    inherited = [page for page in results['pages'] if page.get('inherited')]
+    assert len(inherited) == 1
+    assert inherited[0]['total_issues'] == len(articles['template_issues'])
+    assert results['pages_audited'] == 3
+
+
+def test_a_single_representative_does_not_estimate_its_cluster(site):
+    results = app.SiteCrawler([site + '/index.html'], OPTIONS, representatives=1).run()
+    articles = next(cluster for cluster in results['clusters'] if cluster['size'] == 3)
+    assert len(articles['representatives']) == 1
+    assert articles['estimated'] is False
+    assert articles['template_issues'] == []
+    unaudited = [page for page in results['pages'] if page['cluster'] == articles['fingerprint'] and not page['audited']]
+    assert len(unaudited) == 2
+    assert all(page['estimated'] is False and 'total_issues' not in page for page in unaudited)
+    assert not any(page.get('inherited') for page in results['pages'])
+
+
+def test_seeds_obey_robots_and_host_rules(site):
+    seeds = app.load_sitemap(site + '/sitemap.xml') + [site + '/file.pdf']
+    crawler = app.SiteCrawler(seeds, OPTIONS, max_depth=0)
+    results = crawler.run()
+    assert [page['url'] for page in results['pages']] == [site + '/a.html']
+    assert results['seeds_skipped'] == [site + '/private/d.html', site + '/file.pdf']
+
+
+def test_admission_rejection_returns_the_discovered_pages(site, monkeypatch):
+    def reject(options, weight=1):
+        raise app.AdmissionRejected('Test queue is full (3 waiting)', 7)
+
+    monkeypatch.setattr(app, 'admit_test', reject)
+    results = app.SiteCrawler([site + '/index.html'], OPTIONS).run()
+    assert results['admission_rejected'] == {'error': 'Test queue is full (3 waiting)', 'retry_after': 7}
+    assert results['pages_discovered'] == 4
+    assert results['pages_audited'] == 0
+    assert not any(page['audited'] or page.get('inherited') for page in results['pages'])
+
+
+def test_crawls_do_not_hold_up_test_jobs():
+    manager = app.JobManager(workers=1, crawl_workers=1)
+    release = threading.Event()
+    crawl = manager.submit('https://example.com', runner=lambda progress: release.wait(5) and {}, queue='crawl')
+    test = manager.submit('https://example.com', runner=lambda progress: {'total_issues': 0})
+    events = [event['event'] for event in manager.follow(test, keepalive=1) if event is not None]
+    assert events[-1] == 'completed'
+    assert crawl.status == 'running'
+    release.set()
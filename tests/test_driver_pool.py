@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+import app
+
+
+class FakeSwitch:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def window(self, handle):
+        self.driver.current = handle
+
+
+class FakeDriver:
+    """Just enough of a WebDriver for the pool: health checks, resets and quit"""
+    def __init__(self):
+        self.healthy = True
+        self.quit_called = False
+        self.window_handles = ['main', 'popup']
+        self.switch_to = FakeSwitch(self)
+        self.cdp = []
+        self.visited = []
+
+    def execute_script(self, script, *args):
+        if not self.healthy:
+            raise app.WebDriverException('browser crashed')
+        if 'origin' in script:
+            return 'https://example.com'
+        return 1
+
+    def execute_cdp_cmd(self, command, params):
+        self.cdp.append(command)
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def close(self):
+        self.window_handles.remove(self.current)
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def launched():
+    return []
+
+
+@pytest.fixture
+def pool(launched):
+    def factory():
+        launched.append(FakeDriver())
+        return launched[-1]
+    return app.DriverPool(size=2, max_uses=3, max_memory_mb=0, checkout_timeout=1, factory=factory)
+
+
+def test_drivers_are_reused_and_reset(pool, launched):
+    with pool.checkout() as driver:
+        pass
+    with pool.checkout() as again:
+        assert again is driver
+    assert len(launched) == 1
+    assert driver.window_handles == ['main']
+    assert 'Network.clearBrowserCookies' in driver.cdp
+    assert driver.visited[-1] == 'about:blank'
+    assert pool.stats() == {'size': 2, 'open': 1, 'idle': 1}
+
+
+def test_worn_out_drivers_are_recycled(pool, launched):
+    for _ in range(4):
+        with pool.checkout():
+            pass
+    assert launched[0].quit_called
+    assert len(launched) == 2
+
+
+def test_dead_drivers_are_replaced(pool, launched):
+    with pool.checkout() as driver:
+        pass
+    driver.healthy = False
+    with pool.checkout() as replacement:
+        assert replacement is not driver
+    assert driver.quit_called
+    assert pool.stats()['open'] == 1
+
+
+def test_checkout_waits_for_a_free_driver(pool):
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(app.DriverPoolTimeout):
+        pool.acquire(timeout=0.1)
+    threading.Timer(0.1, pool.release, [first]).start()
+    started = time.monotonic()
+    assert pool.acquire(timeout=2) is first
+    assert time.monotonic() - started < 1.5
+    pool.release(second)
+
+
+def test_failed_launch_frees_its_slot():
+    def factory():
+        raise app.WebDriverException('no chrome')
+    pool = app.DriverPool(size=1, factory=factory, checkout_timeout=1)
+    with pytest.raises(app.WebDriverException):
+        pool.acquire()
+    assert pool.stats()['open'] == 0
+
+
+def test_warm_fills_the_pool(pool, launched):
+    pool.warm()
+    for _ in range(50):
+        if pool.stats()['idle'] == 2:
+            break
+        time.sleep(0.01)
+    assert pool.stats() == {'size': 2, 'open': 2, 'idle': 2}
+
+
+def test_close_quits_idle_drivers(pool, launched):
+    with pool.checkout():
+        pass
+    pool.close()
+    assert launched[0].quit_called
+    with pytest.raises(RuntimeError):
+        pool.acquire()
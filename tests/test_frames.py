@@ -0,0 +1,68 @@
+from conftest import node
+
+import app
+
+FRAME = 'iframe#checkout'
+SHADOW = 'my-widget#w1'
+
+
+def snapshot(*nodes):
+    return app.DomSnapshot({'url': 'https://example.com/', 'title': 'Shop', 'lang': 'en', 'nodes': list(nodes)})
+
+
+def test_ids_resolve_within_their_own_scope():
+    page = snapshot(
+        node('body'),
+        node('span', 0, {'id': 'name'}),
+        node('label', 0, {'for': 'card'}, own_text='Card'),
+        node('input', -1, {'id': 'card'}, frame=FRAME, type='text'),
+        node('span', -1, {'id': 'name'}, shadow=SHADOW),
+        node('input', -1, {'aria-labelledby': 'name'}, shadow=SHADOW, type='text'),
+    )
+    top, framed, shadowed = page.nodes[1], page.nodes[3], page.nodes[5]
+    assert app.DomSnapshot.scope(top) == ('', '')
+    assert app.DomSnapshot.scope(framed) == (FRAME, '')
+    assert page.by_id(shadowed, 'name') is page.nodes[4]
+    assert page.by_id(page.nodes[0], 'name') is top
+    # A label in the top document does not name a control inside the frame
+    assert page.labels_for(framed) == []
+    assert app.DomSnapshot.location(framed) == {'frame': FRAME}
+    assert app.DomSnapshot.location(shadowed) == {'shadow': SHADOW}
+    assert app.DomSnapshot.location(top) == {}
+
+
+def checks_on(page):
+    tester = app.AccessibilityTester()
+    tester.snapshot = page
+    return tester
+
+
+def test_issues_inside_frames_and_shadow_roots_say_where_they_are():
+    tester = checks_on(snapshot(
+        node('body'),
+        node('label', 0, {'for': 'card'}, own_text='Card'),
+        node('input', -1, {'id': 'card'}, frame=FRAME, type='text'),
+        node('img', -1, {}, shadow=SHADOW, src='https://example.com/logo.png'),
+        node('div', -1, {'aria-labelledby': 'missing'}, shadow=SHADOW),
+    ))
+    labels = tester.check_form_labels()
+    assert [(issue['type'], issue['frame']) for issue in labels] == [('Form Field Missing Label', FRAME)]
+    assert tester.check_alt_text()[0]['shadow'] == SHADOW
+    aria = tester.check_aria_attributes()
+    assert [(issue['type'], issue['shadow']) for issue in aria] == [('ARIA Reference To Missing Id', SHADOW)]
+
+
+def test_framed_documents_have_their_own_heading_outline():
+    tester = checks_on(snapshot(
+        node('h1', -1, own_text='Shop'),
+        node('h2', -1, own_text='Basket'),
+        node('h1', -1, own_text='Payment', frame=FRAME),
+        node('h2', -1, own_text='Card', frame=FRAME),
+    ))
+    assert tester.check_headings_structure() == []
+
+
+def test_the_same_issue_in_two_frames_has_two_fingerprints():
+    issue = {'type': 'Missing Alt Text', 'element': 'img', 'src': 'logo.png'}
+    first, second = app.fingerprint_issues([dict(issue, frame=FRAME), dict(issue, frame='iframe#ads')])
+    assert first['fingerprint'] != second['fingerprint']
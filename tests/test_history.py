@@ -0,0 +1,90 @@
+import time
+import uuid
+
+import pytest
+
+import app
+
+
+@pytest.fixture
+def store(tmp_path):
+    return app.HistoryStore(str(tmp_path / 'history.sqlite3'))
+
+
+def issue(check, element, severity='high'):
+    return {'check': check, 'type': f'{check} issue', 'severity': severity, 'element': element}
+
+
+def record(store, issues, statuses=None, url='https://example.com/'):
+    issues = app.fingerprint_issues(issues)
+    checks = statuses or {'images': 'completed', 'headings': 'completed'}
+    results = {
+        'run_id': uuid.uuid4().hex,
+        'url': url,
+        'timestamp': 'now',
+        'total_issues': len(issues),
+        'issues_by_severity': {level: len([i for i in issues if i['severity'] == level]) for level in app.SEVERITIES},
+        'check_status': {name: {'status': status} for name, status in checks.items()},
+        'issues': issues,
+        'ai_summary': None,
+        'timings': {'total': 1.0}
+    }
+    store.record(results)
+    # Runs of the same URL are ordered by their creation time
+    time.sleep(0.01)
+    return results['run_id']
+
+
+def test_fingerprints_are_stable_and_number_repeats():
+    first = app.fingerprint_issues([issue('images', 'img'), issue('images', 'img')])
+    second = app.fingerprint_issues([issue('images', 'img', severity='low')])
+    assert first[1]['fingerprint'] == first[0]['fingerprint'] + '-2'
+    assert second[0]['fingerprint'] == first[0]['fingerprint']
+
+
+def test_record_and_query_runs(store):
+    first = record(store, [issue('images', 'img')])
+    second = record(store, [issue('headings', 'h3', severity='low')], url='https://example.com/other')
+    assert [run['run_id'] for run in store.runs()] == [second, first]
+    assert [run['run_id'] for run in store.runs(url='https://EXAMPLE.com')] == [first]
+    assert [run['run_id'] for run in store.runs(severity='low')] == [second]
+    stored = store.run(first)
+    assert stored['issues'][0]['element'] == 'img'
+    assert 'timings' not in stored
+    assert store.run(second, severity='high')['issues'] == []
+    assert store.run('missing') is None
+
+
+def test_diff_reports_new_fixed_and_unchanged(store):
+    record(store, [issue('images', 'a'), issue('images', 'b')])
+    current = record(store, [issue('images', 'b'), issue('images', 'c')])
+    delta = store.diff(current)
+    assert delta['diff'] == {'new': 1, 'fixed': 1, 'unchanged': 1}
+    assert delta['new_issues'][0]['element'] == 'c'
+    assert delta['fixed_issues'][0]['element'] == 'a'
+
+
+def test_first_run_is_all_new(store):
+    current = record(store, [issue('images', 'a')])
+    delta = store.diff(current)
+    assert delta['previous_run_id'] is None
+    assert delta['diff'] == {'new': 1, 'fixed': 0, 'unchanged': 0}
+
+
+def test_diff_ignores_checks_that_did_not_finish_in_both_runs(store):
+    previous = record(store, [issue('images', 'a'), issue('headings', 'h1')],
+                      {'images': 'completed', 'headings': 'timed_out'})
+    current = record(store, [issue('images', 'a'), issue('headings', 'h2')])
+    delta = store.diff(current, against=previous)
+    # The headings issue is neither new nor unchanged: the previous run never finished that check
+    assert delta['diff'] == {'new': 0, 'fixed': 0, 'unchanged': 1}
+    assert store.diff(previous, against=current)['diff'] == {'new': 0, 'fixed': 0, 'unchanged': 1}
+
+
+def test_late_summary_is_attached_to_the_run(store):
+    run_id = record(store, [])
+    assert store.summary(run_id)['status'] == 'off'
+    assert store.set_summary(run_id, 'completed', 'All good')
+    assert store.summary(run_id)['ai_summary'] == 'All good'
+    assert store.run(run_id)['summary_status'] == 'completed'
+    assert store.set_summary('missing', 'completed', 'x') is False
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+import app
+
+
+def finished(manager, job):
+    return [event for event in manager.follow(job, keepalive=1) if event is not None]
+
+
+def test_events_are_snapshots_of_the_published_data():
+    manager = app.JobManager(workers=1)
+    issue = {'type': 'Missing Alt Text', 'severity': 'high'}
+
+    def runner(progress):
+        progress('check_completed', {'issues': [issue]})
+        # The test goes on to fingerprint and annotate the same dicts
+        issue['fingerprint'] = 'abc'
+        return {'total_issues': 1}
+
+    job = manager.submit('https://example.com', runner=runner)
+    events = finished(manager, job)
+    completed = next(event for event in events if event['event'] == 'check_completed')
+    assert completed['data']['issues'] == [{'type': 'Missing Alt Text', 'severity': 'high'}]
+    assert [event['event'] for event in events] == ['queued', 'started', 'check_completed', 'completed']
+    assert job.to_dict()['status'] == 'completed'
+
+
+def test_failed_runner_marks_the_job_failed():
+    manager = app.JobManager(workers=1)
+
+    def runner(progress):
+        raise RuntimeError('boom')
+
+    job = manager.submit('https://example.com', runner=runner)
+    events = finished(manager, job)
+    assert events[-1] == {'id': len(events), 'event': 'failed', 'data': {'error': 'boom'}}
+    assert manager.get(job.id) is job
+
+
+@pytest.fixture
+def page(tmp_path, serve):
+    (tmp_path / 'index.html').write_text('<html lang="en"><head><title>Home</title></head>'
+                                         '<body><h1>Home</h1><img src="a.png"></body></html>')
+    return serve(tmp_path) + '/index.html'
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'job_manager', app.JobManager(workers=1))
+    return app.app.test_client()
+
+
+def sse(body):
+    """(id, event, data) of each event in a text/event-stream body"""
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_job_runs_in_the_background(page, client):
+    response = client.post('/jobs', json={'url': page, 'mode': 'quick', 'ai_summary': False})
+    assert response.status_code == 202
+    job = response.get_json()
+    assert job['status_url'] == f"/jobs/{job['id']}"
+
+    events = sse(client.get(job['events_url']).get_data(as_text=True))
+    names = [event for _, event, _ in events]
+    assert names[:2] == ['queued', 'started']
+    assert names[-1] == 'completed'
+    assert 'check_completed' in names
+    assert [event_id for event_id, _, _ in events] == list(range(1, len(events) + 1))
+
+    status = client.get(job['status_url']).get_json()
+    assert status['status'] == 'completed'
+    assert status['result']['url'] == page
+    assert status['result']['issues_by_severity']['high'] >= 1
+
+
+def test_events_resume_after_last_event_id(page, client):
+    job = client.post('/jobs', json={'url': page, 'mode': 'quick', 'ai_summary': False}).get_json()
+    events = sse(client.get(job['events_url']).get_data(as_text=True))
+    resumed = sse(client.get(job['events_url'], headers={'Last-Event-ID': '2'}).get_data(as_text=True))
+    assert resumed == events[2:]
+
+
+def test_unknown_job_and_missing_url(client):
+    assert client.get('/jobs/nope').status_code == 404
+    assert client.get('/jobs/nope/events').status_code == 404
+    assert client.post('/jobs', json={}).status_code == 400
@@ -0,0 +1,54 @@
+import app
+
+
+def element(position, focus_visible=True, tabindex=0, **extra):
+    data = {'position': position, 'tag': 'a', 'tabindex': tabindex, 'selector': f'a:nth-of-type({position})',
+            'text': f'Link {position}', 'rect': [0, 0, 10, 10], 'focused': True, 'focus_visible': focus_visible,
+            'changed': ['outlineStyle'] if focus_visible else []}
+    data.update(extra)
+    return data
+
+
+class FakeDriver:
+    def __init__(self, report):
+        self.report = report
+        self.scripts = []
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        return self.report
+
+
+def audit(report):
+    tester = app.AccessibilityTester()
+    tester.driver = FakeDriver(report)
+    return tester, tester.check_keyboard_navigation()
+
+
+def test_tab_order_is_walked_in_one_script_call():
+    tester, issues = audit({'elements': [element(1), element(2)]})
+    assert tester.driver.scripts == [app.KEYBOARD_AUDIT_SCRIPT]
+    assert [item['position'] for item in tester.tab_order] == [1, 2]
+    assert tester.inspected['keyboard_navigation'] == 2
+    assert issues == []
+
+
+def test_keyboard_issues():
+    tester, issues = audit({'elements': [
+        element(1, tabindex=3),
+        element(2, focus_visible=False, frame='iframe#checkout'),
+        element(3, trap='Tab key is intercepted and focus does not move forward'),
+    ]})
+    by_type = {issue['type']: issue for issue in issues}
+    assert set(by_type) == {'Focus Visibility Issues', 'Keyboard Focus Trap', 'Positive Tabindex'}
+    assert by_type['Focus Visibility Issues']['elements'] == [
+        {'selector': 'a:nth-of-type(2)', 'element': 'a', 'text': 'Link 2', 'frame': 'iframe#checkout'}
+    ]
+    assert by_type['Keyboard Focus Trap']['selector'] == 'a:nth-of-type(3)'
+    assert by_type['Positive Tabindex']['elements'] == [{'selector': 'a:nth-of-type(1)', 'tabindex': 3}]
+
+
+def test_empty_report():
+    tester, issues = audit(None)
+    assert tester.tab_order == []
+    assert issues == []
@@ -0,0 +1,50 @@
+import app
+
+
+def test_render_counters_histograms_and_gauges():
+    metrics = app.Metrics()
+    metrics.counter('requests_total', 'Requests, by outcome')
+    metrics.histogram('latency_seconds', 'Latency', buckets=(0.1, 1))
+    metrics.gauge('queue', 'Queue depth', lambda: [({'state': 'waiting'}, 3)])
+    metrics.inc('requests_total', status='ok')
+    metrics.inc('requests_total', 2, status='ok')
+    metrics.inc('requests_total', status='say "hi"\n')
+    metrics.observe('latency_seconds', 0.05)
+    metrics.observe('latency_seconds', 0.5)
+    metrics.observe('latency_seconds', 5)
+
+    lines = metrics.render().splitlines()
+    assert lines[:2] == ['# HELP requests_total Requests, by outcome', '# TYPE requests_total counter']
+    assert 'requests_total{status="ok"} 3' in lines
+    assert 'requests_total{status="say \\"hi\\"\\n"} 1' in lines
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 2' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum 5.55' in lines
+    assert 'latency_seconds_count 3' in lines
+    assert 'queue{state="waiting"} 3' in lines
+
+
+def test_failing_gauge_is_skipped():
+    metrics = app.Metrics()
+    metrics.gauge('broken', 'Broken', lambda: 1 / 0)
+    assert metrics.render() == '# HELP broken Broken\n# TYPE broken gauge\n'
+
+
+def test_phases_are_timed_with_their_round_trips():
+    class Driver:
+        command_count = 0
+
+    tester = app.AccessibilityTester()
+    tester.driver = Driver()
+    with tester.timed('page_load'):
+        tester.driver.command_count += 4
+    assert tester.timings['phases']['page_load']['webdriver_commands'] == 4
+    assert 'accessibility_webdriver_commands_total{phase="page_load"}' in app.metrics.render()
+
+
+def test_metrics_endpoint():
+    response = app.app.test_client().get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert '# TYPE accessibility_admission gauge' in response.get_data(as_text=True)
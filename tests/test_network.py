@@ -0,0 +1,65 @@
+import re
+
+import pytest
+
+import app
+
+
+class FakeDriver:
+    def __init__(self):
+        self.cdp = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.cdp.append((command, params))
+
+
+def test_profile_is_applied_once_per_driver():
+    tester = app.AccessibilityTester()
+    tester.driver = FakeDriver()
+    tester.apply_network_profile('minimal')
+    tester.apply_network_profile('minimal')
+    assert tester.driver.cdp == [('Network.enable', {}),
+                                 ('Network.setBlockedURLs', {'urls': app.NETWORK_PROFILES['minimal']})]
+    tester.apply_network_profile('full')
+    assert tester.driver.cdp[-1] == ('Network.setBlockedURLs', {'urls': []})
+
+
+def blocked_by(pattern, url):
+    # Chrome's blocked URL patterns only treat '*' as a wildcard
+    return re.fullmatch('.*'.join(map(re.escape, pattern.split('*'))), url) is not None
+
+
+@pytest.mark.parametrize('url, blocked', [
+    ('https://www.google-analytics.com/analytics.js', {'lean', 'minimal', 'text'}),
+    ('https://example.com/intro.mp4', {'lean', 'minimal', 'text'}),
+    ('https://example.com/font.woff2', {'minimal', 'text'}),
+    ('https://example.com/photo.jpg?w=200', {'text'}),
+    ('https://cdn.segment.com/analytics.js', {'lean', 'minimal', 'text'}),
+    ('https://example.com/app.js', set()),
+    # Extensions and tracker names only count in the path and the host respectively
+    ('https://www.webmd.com/', set()),
+    ('https://www.movies.com/trailers', set()),
+    ('https://www.oggi.it/', set()),
+    ('https://notsegment.com/', set()),
+])
+def test_profiles_block_progressively_more(url, blocked):
+    matching = {name for name, patterns in app.NETWORK_PROFILES.items()
+                if any(blocked_by(pattern, url) for pattern in patterns)}
+    assert matching == blocked
+
+
+def test_every_profile_has_a_label():
+    assert set(app.NETWORK_PROFILE_LABELS) == set(app.NETWORK_PROFILES)
+
+
+def test_browser_cache_slots_are_exclusive(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'BROWSER_CACHE_DIR', str(tmp_path))
+    first_dir, first_lock = app.claim_browser_cache_dir()
+    second_dir, second_lock = app.claim_browser_cache_dir()
+    assert first_dir != second_dir
+    first_lock.close()
+    # A released slot is handed out again
+    third_dir, third_lock = app.claim_browser_cache_dir()
+    assert third_dir == first_dir
+    second_lock.close()
+    third_lock.close()
@@ -0,0 +1,61 @@
+import pytest
+
+import app
+
+
+def test_defaults():
+    options = app.test_options({})
+    assert options['contrast_mode'] == 'computed'
+    assert options['readiness'] == app.READINESS_MODE
+    assert options['network_profile'] == app.NETWORK_PROFILE
+    assert options['mode'] == 'full'
+    assert options['checks'] is None
+    assert options['viewports'] is None
+
+
+def test_valid_values_are_kept():
+    options = app.test_options({'contrast_mode': 'pixels', 'readiness': 'settled', 'network_profile': 'text',
+                                'checks': 'alt_text, headings_structure', 'deadline': '12.5', 'ai_summary': 'sync'})
+    assert options['contrast_mode'] == 'pixels'
+    assert options['readiness'] == 'settled'
+    assert options['network_profile'] == 'text'
+    assert options['checks'] == ['alt_text', 'headings_structure']
+    assert options['deadline'] == 12.5
+    assert options['ai_summary'] == 'sync'
+
+
+@pytest.mark.parametrize('data, message', [
+    ({'contrast_mode': 'fancy'}, 'Unknown contrast mode'),
+    ({'readiness': 'idle'}, 'Unknown readiness mode'),
+    ({'network_profile': 'slow'}, 'Unknown network profile'),
+    ({'network_profile': ['full']}, 'Unknown network profile'),
+    ({'mode': 'fast'}, 'Unknown mode'),
+    ({'ai_summary': 'later'}, 'Unknown ai_summary mode'),
+    ({'checks': ['alt_text', 'nope']}, 'Unknown checks: nope'),
+    ({'checks': []}, 'checks must be a non-empty list'),
+    ({'deadline': 'soon'}, 'deadline must be a number'),
+    ({'deadline': 0}, 'deadline must be positive'),
+    ({'viewports': ['wide']}, 'Invalid viewport'),
+    ({'mode': 'quick', 'viewports': [320]}, 'cannot be used in quick mode'),
+    ({'mode': 'quick', 'checks': ['color_contrast']}, 'cannot run in quick mode'),
+    ({'diff': True}, 'diff needs the run history'),
+])
+def test_invalid_values_are_rejected(data, message):
+    with pytest.raises(ValueError, match=message):
+        app.test_options(data)
+
+
+def test_invalid_option_is_a_bad_request():
+    client = app.app.test_client()
+    response = client.post('/test', json={'url': 'https://example.com', 'readiness': 'idle'})
+    assert response.status_code == 400
+    assert 'Unknown readiness mode' in response.get_json()['error']
+
+
+def test_parse_viewports():
+    assert app.parse_viewports(None) is None
+    assert app.parse_viewports('375, 1280x800, 375') == [[375, app.VIEWPORT_DEFAULT_HEIGHT], [1280, 800]]
+    with pytest.raises(ValueError, match='outside'):
+        app.parse_viewports([app.VIEWPORT_MAX_SIZE + 1])
+    with pytest.raises(ValueError, match='At most'):
+        app.parse_viewports(list(range(400, 400 + app.VIEWPORT_MAX_COUNT + 1)))
@@ -0,0 +1,58 @@
+import json
+import shutil
+import subprocess
+
+import pytest
+
+import app
+
+# Runs READINESS_SCRIPT in a bare Node VM with just enough of a document to drive it
+HARNESS = """
+const vm = require('vm');
+const [script, page] = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const context = {
+    performance: {now: () => Date.now() - start, getEntriesByType: () => []},
+    document: Object.assign({body: {}}, page),
+    location: {href: 'https://example.com/'},
+    XMLHttpRequest: function () {},
+    MutationObserver: class { observe() {} },
+    setInterval, clearInterval,
+    done: result => console.log(JSON.stringify(result))
+};
+const start = Date.now();
+context.window = context;
+vm.createContext(context);
+vm.runInContext('(function () {' + script + '}).apply(null, ["settled", 0, 0, 300, done])', context);
+"""
+
+pytestmark = pytest.mark.skipif(not shutil.which('node'), reason='needs node to run the in-page script')
+
+
+def settle(**page):
+    output = subprocess.run(['node', '-e', HARNESS], input=json.dumps([app.READINESS_SCRIPT, page]),
+                            capture_output=True, text=True, timeout=10, check=True).stdout
+    return json.loads(output)
+
+
+def test_settled_waits_for_the_load_event():
+    report = settle(readyState='interactive', images=[])
+    assert report['ready'] is False
+    assert report['ready_state'] == 'interactive'
+
+
+def test_settled_waits_for_images_still_downloading():
+    report = settle(readyState='complete', images=[{'complete': False, 'src': 'hero.jpg'},
+                                                   {'complete': False, 'src': 'below.jpg', 'loading': 'lazy'}])
+    assert report['ready'] is False
+    assert report['pending_images'] == 1
+
+
+def test_settled_waits_for_fonts():
+    report = settle(readyState='complete', images=[], fonts={'status': 'loading'})
+    assert report['ready'] is False
+    assert report['fonts_loading'] is True
+
+
+def test_settled_once_everything_has_loaded():
+    report = settle(readyState='complete', images=[{'complete': True, 'src': 'hero.jpg'}], fonts={'status': 'loaded'})
+    assert report['ready'] is True
@@ -0,0 +1,127 @@
+import base64
+import io
+import os
+import time
+
+import pytest
+from PIL import Image
+
+import app
+
+
+def png(width=200, height=100, color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = app.ScreenshotStore(str(tmp_path), secret='test-secret')
+    # Pruning is exercised directly, not from a background thread
+    store._pruned = time.monotonic()
+    monkeypatch.setattr(app, 'screenshot_store', store)
+    return store
+
+
+def stored_files(store):
+    return sorted(name for _, _, names in os.walk(store.directory) for name in names if not name.startswith('.'))
+
+
+def test_save_is_content_addressed(store):
+    first = store.save(png(), 'initial_page')
+    second = store.save(png(), 'again')
+    assert first['id'] == second['id']
+    assert (first['width'], first['height'], first['format']) == (200, 100, 'webp')
+    assert len(stored_files(store)) == 1
+
+
+def test_only_signed_crops_are_served(store):
+    reference = store.save(png())
+    client = app.app.test_client()
+    url = app.crop_url(reference, [10, 10, 50, 20])
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.mimetype == 'image/webp'
+
+    forged = url.replace('w=50', 'w=51')
+    assert client.get(forged).status_code == 403
+    assert client.get(url.split('&sig=')[0]).status_code == 403
+    assert len(stored_files(store)) == 2
+
+
+def test_odd_thumbnail_widths_are_not_cached(store):
+    reference = store.save(png(400, 200))
+    client = app.app.test_client()
+    for width in (17, 18, 19):
+        response = client.get(f"{reference['thumbnail_url']}?width={width}")
+        assert response.status_code == 200
+        assert Image.open(io.BytesIO(response.data)).width == width
+    assert len(stored_files(store)) == 1
+
+    assert client.get(reference['thumbnail_url']).status_code == 200
+    assert len(stored_files(store)) == 2
+
+
+def test_prune_drops_expired_then_oldest_files(store):
+    old = store.save(png(color=(1, 2, 3)))
+    middle = store.save(png(color=(4, 5, 6)))
+    new = store.save(png(color=(7, 8, 9)))
+    now = time.time()
+    os.utime(store.path(old['id']), (now - 10 * 86400, now - 10 * 86400))
+    os.utime(store.path(middle['id']), (now - 60, now - 60))
+
+    store.ttl = 86400
+    assert store.prune() == 1
+    assert not os.path.exists(store.path(old['id']))
+
+    store.max_bytes = os.path.getsize(store.path(new['id']))
+    assert store.prune() == 1
+    assert not os.path.exists(store.path(middle['id']))
+    assert os.path.exists(store.path(new['id']))
+
+
+def test_saving_again_keeps_the_file_from_pruning(store):
+    reference = store.save(png())
+    path = store.path(reference['id'])
+    week_ago = time.time() - 7 * 86400
+    os.utime(path, (week_ago, week_ago))
+
+    store.save(png())
+    store.ttl = 86400
+    assert store.prune() == 0
+    assert os.path.exists(path)
+
+
+class FakeDriver:
+    def __init__(self, width, height, fail=False):
+        self.size = {'width': width, 'height': height}
+        self.fail = fail
+        self.clip = None
+
+    def execute_cdp_cmd(self, command, params):
+        if command == 'Page.getLayoutMetrics':
+            return {'cssContentSize': self.size}
+        self.clip = params['clip']
+        if self.fail:
+            raise RuntimeError('capture failed')
+        return {'data': base64.b64encode(png(20, 10)).decode('ascii')}
+
+    def get_screenshot_as_png(self):
+        raise RuntimeError('browser went away')
+
+
+def test_full_page_capture_is_clipped_in_both_directions(store):
+    tester = app.AccessibilityTester()
+    tester.driver = FakeDriver(40000, 50000)
+    assert tester.capture_screenshot('initial_page')['width'] == 20
+    assert (tester.driver.clip['width'], tester.driver.clip['height']) == (app.SCREENSHOT_MAX_WIDTH,
+                                                                          app.SCREENSHOT_MAX_HEIGHT)
+
+
+def test_failed_screenshot_does_not_stop_the_audit(store):
+    tester = app.AccessibilityTester()
+    tester.driver = FakeDriver(800, 600, fail=True)
+    assert tester.capture_screenshot('initial_page') is None
+    assert tester.screenshot is None and tester.screenshot_pixels() is None
+    assert tester.screenshots == []
@@ -0,0 +1,80 @@
+from conftest import node
+
+import app
+
+
+def page(*nodes, title='Example page', lang='en'):
+    return {'url': 'https://example.com/', 'title': title, 'lang': lang, 'nodes': list(nodes)}
+
+
+class FakeDriver:
+    """Answers the snapshot script and counts the round-trips"""
+    def __init__(self, data):
+        self.data = data
+        self.scripts = []
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        return self.data
+
+
+def snapshot_tester(data):
+    tester = app.AccessibilityTester()
+    tester.driver = FakeDriver(data)
+    tester.take_snapshot()
+    return tester
+
+
+def test_snapshot_is_one_round_trip():
+    tester = snapshot_tester(page(node('html'), node('img', 0)))
+    assert tester.driver.scripts == [app.SNAPSHOT_SCRIPT]
+    assert tester.snapshot.title == 'Example page'
+    assert [item['index'] for item in tester.snapshot.nodes] == [0, 1]
+
+
+def test_lookups():
+    snapshot = app.DomSnapshot(page(
+        node('body'),
+        node('h2', 0, text='Second'),
+        node('label', 0, {'for': 'email'}, own_text='Email'),
+        node('input', 0, {'id': 'email', 'aria-label': 'Email'}, type='email'),
+        node('h1', 0, own_text='First'),
+        node('nav', 0),
+        node('ul', 5),
+    ))
+    assert [item['tag'] for item in snapshot.by_tag('h1', 'h2')] == ['h2', 'h1']
+    assert snapshot.by_tag('table') == []
+    assert [item['tag'] for item in snapshot.with_attr('aria-label')] == ['input']
+    field = snapshot.by_tag('input')[0]
+    assert snapshot.labels_for(field) == snapshot.by_tag('label')
+    assert snapshot.by_id(snapshot.nodes[0], 'email') is field
+    assert snapshot.parent(field)['tag'] == 'body'
+    assert snapshot.has_ancestor(snapshot.by_tag('ul')[0], ('nav',))
+    assert not snapshot.has_ancestor(field, ('nav',))
+    assert [app.DomSnapshot.text(item) for item in snapshot.by_tag('h2', 'h1')] == ['Second', 'First']
+
+
+def test_checks_run_on_the_snapshot():
+    tester = snapshot_tester(page(
+        node('html'),
+        node('img', 0, {'alt': ''}, src='https://example.com/a.png'),
+        node('img', 0, {'alt': 'ok'}, src='https://example.com/b.png'),
+        node('img', 0, {'alt': 'A photo'}, src='https://example.com/c.png'),
+        node('h1', 0, own_text='Title'),
+        node('h3', 0, own_text='Skipped'),
+        node('input', 0, {'id': 'q'}, type='text'),
+        node('input', 0, {}, type='hidden'),
+        node('div', 0, {'aria-label': 'Box'}),
+        node('a', 0, {'href': '#main'}, text='Skip to content'),
+        title='', lang=None
+    ))
+    assert [(issue['type'], issue['src']) for issue in tester.check_alt_text()] == [
+        ('Missing Alt Text', 'https://example.com/a.png'), ('Inadequate Alt Text', 'https://example.com/b.png')
+    ]
+    assert [issue['type'] for issue in tester.check_headings_structure()] == ['Heading Hierarchy Skip']
+    assert [issue['element_type'] for issue in tester.check_form_labels()] == ['text']
+    assert [issue['type'] for issue in tester.check_aria_attributes()] == ['ARIA Label Without Role']
+    assert [issue['type'] for issue in tester.check_page_structure()] == [
+        'Missing or Inadequate Page Title', 'Missing Language Attribute'
+    ]
+    assert tester.inspected['alt_text'] == 3
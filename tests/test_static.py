@@ -0,0 +1,78 @@
+import pytest
+
+import app
+
+PAGE = '''<!doctype html>
+<html lang="fr"><head><title> Accueil
+ du site </title><base href="/assets/"><style>p { color: red }</style></head>
+<body>
+<ul><li>One<li>Two</ul>
+<p hidden>Secret <a href="x.html">link</a></p>
+<template><img src="inert.png"></template>
+<img src="logo.png"><br/>
+<label for="q">Search</label><input id="q" type="SEARCH"><select multiple></select>
+<button disabled>Go <b>now</b></button>
+</body></html>'''
+
+
+def parse(html, chunk=7):
+    parser = app.StaticSnapshotParser('https://example.com/index.html')
+    # Fed in small pieces, as the page streams in
+    for start in range(0, len(html), chunk):
+        parser.feed(html[start:start + chunk])
+    return parser.snapshot()
+
+
+def test_document_fields():
+    snapshot = parse(PAGE)
+    assert snapshot.title == 'Accueil du site'
+    assert snapshot.lang == 'fr'
+    assert not snapshot.by_tag('style')[0]['visible']
+
+
+def test_implied_end_tags_and_void_elements():
+    snapshot = parse(PAGE)
+    items = snapshot.by_tag('li')
+    assert [item['own_text'] for item in items] == ['One', 'Two']
+    assert items[0]['parent'] == items[1]['parent']
+    body = snapshot.by_tag('body')[0]['index']
+    assert snapshot.by_tag('label')[0]['parent'] == body
+
+
+def test_urls_resolve_against_the_base_element():
+    snapshot = parse(PAGE)
+    assert [img['src'] for img in snapshot.by_tag('img')] == ['https://example.com/assets/logo.png']
+    assert snapshot.by_tag('a')[0]['href'] == 'https://example.com/assets/x.html'
+
+
+def test_hidden_content_and_controls():
+    snapshot = parse(PAGE)
+    assert not snapshot.by_tag('a')[0]['visible']
+    field = snapshot.by_tag('input')[0]
+    assert field['type'] == 'search'
+    assert snapshot.labels_for(field)[0]['own_text'] == 'Search'
+    assert snapshot.by_tag('select')[0]['type'] == 'select-multiple'
+    button = snapshot.by_tag('button')[0]
+    assert button['type'] == 'submit'
+    assert not button['enabled']
+    assert button['text'] == 'Go now'
+
+
+@pytest.fixture
+def site(tmp_path, serve):
+    (tmp_path / 'index.html').write_bytes(PAGE.replace('Accueil', 'Accueil é').encode('utf-8'))
+    (tmp_path / 'data.json').write_text('{}')
+    return serve(tmp_path) + '/'
+
+
+def test_fetch_static_snapshot(site):
+    snapshot, digest = app.fetch_static_snapshot(site + 'index.html')
+    # No charset in the Content-Type, so the body is read as UTF-8
+    assert snapshot.title == 'Accueil é du site'
+    assert snapshot.by_tag('img')[0]['src'] == site + 'assets/logo.png'
+    assert digest == app.fetch_static_snapshot(site + 'index.html')[1]
+
+
+def test_fetch_static_snapshot_rejects_other_content(site):
+    with pytest.raises(ValueError, match='Expected an HTML page'):
+        app.fetch_static_snapshot(site + 'data.json')
@@ -0,0 +1,123 @@
+import json
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+import app
+
+TOKENS = ['Exec', 'utive ', 'summary', ': fix alt text.']
+SUMMARY = ''.join(TOKENS)
+
+
+class MockOpenAI(BaseHTTPRequestHandler):
+    """Streams a fixed chat completion the way an OpenAI-compatible endpoint does"""
+    protocol_version = 'HTTP/1.1'
+    calls = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.calls.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for token in TOKENS:
+            self.send({'id': 'c', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'm',
+                       'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]})
+        self.send({'id': 'c', 'object': 'chat.completion.chunk', 'created': 0, 'model': 'm', 'choices': [],
+                   'usage': {'prompt_tokens': 11, 'completion_tokens': 4, 'total_tokens': 15}})
+        self.send('[DONE]')
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+    def send(self, chunk):
+        data = f"data: {chunk if isinstance(chunk, str) else json.dumps(chunk)}\n\n".encode()
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+
+@pytest.fixture
+def site(tmp_path, serve):
+    (tmp_path / 'index.html').write_text('<html lang="en"><head><title>Home</title></head>'
+                                         '<body><h1>Home</h1><img src="a.png"></body></html>')
+    return serve(tmp_path) + '/index.html'
+
+
+@pytest.fixture
+def openai_mock(monkeypatch, tmp_path, serve):
+    MockOpenAI.calls = []
+    monkeypatch.setenv('OPENAI_BASE_URL', serve(handler=MockOpenAI) + '/v1')
+    # The client is built on first use, so a fresh one picks up the mock's URL
+    monkeypatch.setattr(app, 'client', None)
+    monkeypatch.setattr(app, 'summary_cache', None)
+    monkeypatch.setattr(app, 'summary_manager', app.SummaryManager(workers=1))
+    monkeypatch.setattr(app, 'history_store', app.HistoryStore(str(tmp_path / 'history.sqlite3')))
+    return MockOpenAI.calls
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+def wait_for(client, summary_url):
+    events = client.get(summary_url + '/events').get_data(as_text=True)
+    assert 'event: completed' in events
+    return events
+
+
+def test_async_summary_streams_after_the_result(openai_mock, site, client):
+    result = client.post('/test', json={'url': site, 'mode': 'quick'}).get_json()
+    assert result['summary_status'] in ('pending', 'streaming')
+    assert result['summary_url'] == f"/summaries/{result['run_id']}"
+    assert result['ai_summary'] is None
+
+    events = wait_for(client, result['summary_url'])
+    text = ''.join(json.loads(line[len('data: '):])['text'] for line in events.splitlines()
+                   if line.startswith('data: ') and '"text"' in line)
+    assert text == SUMMARY
+    assert client.get(result['summary_url']).get_json()['ai_summary'] == SUMMARY
+    assert app.history_store.summary(result['run_id'])['status'] == 'completed'
+    assert openai_mock[0]['stream'] is True
+
+    # A reconnect resumes from the offset in Last-Event-ID
+    resumed = client.get(result['summary_url'] + '/events', headers={'Last-Event-ID': '9'}).get_data(as_text=True)
+    assert f'"text": "{SUMMARY[9:]}"' in resumed
+
+
+def test_sync_and_off_modes(openai_mock, site, client):
+    result = client.post('/test', json={'url': site, 'mode': 'quick', 'ai_summary': 'sync'}).get_json()
+    assert result['ai_summary'] == SUMMARY
+    assert 'summary_url' not in result
+
+    result = client.post('/test', json={'url': site, 'mode': 'quick', 'ai_summary': False}).get_json()
+    assert result['ai_summary'] is None
+    assert client.get(f"/summaries/{result['run_id']}").status_code == 404
+
+
+def test_ndjson_stream_ends_with_the_summary(openai_mock, site, client):
+    lines = client.post('/test', json={'url': site, 'mode': 'quick', 'stream': True}).get_data(as_text=True)
+    events = [json.loads(line) for line in lines.splitlines()]
+    types = [event['type'] for event in events]
+    assert types.index('result') < types.index('summary_delta')
+    assert ''.join(event['text'] for event in events if event['type'] == 'summary_delta') == SUMMARY
+    assert events[-1]['type'] == 'summary_completed'
+
+
+def test_cached_result_reuses_the_recorded_summary(openai_mock, site, client, monkeypatch):
+    monkeypatch.setattr(app, 'result_cache', app.ResultCache(app.MemoryCacheBackend()))
+    first = client.post('/test', json={'url': site, 'mode': 'quick'}).get_json()
+    wait_for(client, first['summary_url'])
+
+    # Once the live run has expired the summary still comes from the history, not a new request
+    monkeypatch.setattr(app, 'summary_manager', app.SummaryManager(workers=1))
+    second = client.post('/test', json={'url': site, 'mode': 'quick'}).get_json()
+    assert second['cached'] is True
+    assert second['run_id'] == first['run_id']
+    assert second['summary_url'] == first['summary_url']
+    assert second['summary_reused'] is True
+    assert second['summary_status'] == 'completed'
+    assert second['ai_summary'] == SUMMARY
+    assert len(openai_mock) == 1
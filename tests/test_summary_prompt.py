@@ -0,0 +1,83 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import app
+
+
+def issues(count, kind='Missing Alt Text', severity='high'):
+    return [{'type': kind, 'severity': severity, 'element': 'img', 'src': f'https://example.com/{i}.png' + 'x' * 200,
+             'rect': [0, 0, 1, 1], 'fingerprint': str(i)} for i in range(count)]
+
+
+def test_digest_groups_by_type_in_priority_order():
+    digest = app.build_issue_digest(issues(5) + issues(2, 'Missing Skip Link', 'medium')
+                                    + issues(9, 'Positive Tabindex', 'medium'))
+    assert [group['type'] for group in digest] == ['Missing Alt Text', 'Positive Tabindex', 'Missing Skip Link']
+    assert digest[0]['by_severity'] == {'high': 5}
+    assert len(digest[0]['examples']) == app.AI_SUMMARY_MAX_EXAMPLES
+    example = digest[0]['examples'][0]
+    assert 'rect' not in example and 'fingerprint' not in example
+    assert len(example['src']) == 80
+
+
+def test_fingerprint_ignores_the_examples():
+    first = app.build_issue_digest(issues(3))
+    second = app.build_issue_digest([dict(issue, element='picture') for issue in issues(3)])
+    assert app.digest_fingerprint(first) == app.digest_fingerprint(second)
+    assert app.digest_fingerprint(first) != app.digest_fingerprint(app.build_issue_digest(issues(4)))
+
+
+def test_prompt_sheds_examples_then_issue_types():
+    digest = app.build_issue_digest(sum((issues(3, f'Type {i}') for i in range(40)), []))
+    roomy = app.build_summary_prompt(digest, token_budget=100000)
+    assert '"examples":[{' in roomy
+
+    bare = app.build_summary_prompt([dict(group, examples=[]) for group in digest], token_budget=100000)
+    assert app.build_summary_prompt(digest, token_budget=app.estimate_tokens(bare)) == bare
+
+    tight = app.build_summary_prompt(digest, token_budget=app.estimate_tokens(bare) // 2)
+    assert json.dumps(digest[0]['type']) in tight
+    assert json.dumps(digest[-1]['type']) not in tight
+    assert 'lower priority issue types' in tight
+
+
+class FakeClient:
+    """Streams a fixed completion, the way the OpenAI client yields chunks"""
+    def __init__(self):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **options):
+        return self
+
+    def create(self, **request):
+        self.requests.append(request)
+        delta = lambda text: SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+        usage = SimpleNamespace(prompt_tokens=10, completion_tokens=2)
+        return iter([delta('All '), delta('good'), SimpleNamespace(choices=[], usage=usage)])
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(app, 'get_openai_client', lambda: client)
+    monkeypatch.setattr(app, 'summary_cache', app.MemoryCacheBackend())
+    return client
+
+
+def test_summaries_are_cached_by_digest(fake_client):
+    deltas = []
+    summary, usage = app.generate_summary(issues(3), on_delta=deltas.append)
+    assert (summary, deltas) == ('All good', ['All ', 'good'])
+    assert usage['prompt_tokens'] == 10
+    prompt = fake_client.requests[0]['messages'][1]['content']
+    assert json.dumps('Missing Alt Text') in prompt
+
+    # Same issue types and counts on another page: no second request
+    again, usage = app.generate_summary([dict(issue, src='other.png') for issue in issues(3)])
+    assert again == 'All good' and usage is None
+    assert len(fake_client.requests) == 1
+    app.generate_summary(issues(4))
+    assert len(fake_client.requests) == 2
@@ -0,0 +1,72 @@
+import pytest
+
+import app
+
+
+class FakeDriver:
+    def __init__(self):
+        self.cdp = []
+        self.width = 1280
+
+    def execute_cdp_cmd(self, command, params):
+        self.cdp.append((command, params))
+        if command == 'Emulation.setDeviceMetricsOverride':
+            self.width = params['width']
+
+    def execute_script(self, script, *args):
+        # The snapshot reflects the width the page was laid out at
+        return {'url': 'https://example.com/', 'nodes': [
+            {'tag': 'p', 'parent': -1, 'attrs': {}, 'own_text': str(self.width), 'rect': [0, 0, self.width, 10]}
+        ]}
+
+
+def viewport_tester(monkeypatch):
+    tester = app.AccessibilityTester()
+    tester.driver = FakeDriver()
+    tester.take_snapshot()
+    monkeypatch.setattr(tester, 'wait_until_ready', lambda deadline, mode: {'mode': mode, 'ready': True})
+
+    def run_checks(names, deadline=None, viewport=None):
+        tester.check_status = {name: {'status': 'completed'} for name in names}
+        return [{'type': 'Low Contrast', 'check': name, 'viewport': viewport,
+                 'width': tester.snapshot.nodes[0]['rect'][2]} for name in names]
+
+    monkeypatch.setattr(tester, 'run_checks', run_checks)
+    return tester
+
+
+def test_layout_checks_rerun_at_each_viewport(monkeypatch):
+    tester = viewport_tester(monkeypatch)
+    primary = (tester.check_status, tester.snapshot)
+    issues = tester.audit_viewports([[375, 812], [1920, 1080]], ['color_contrast', 'alt_text'],
+                                    {app.REQUIRES_SNAPSHOT}, app.Deadline(30))
+
+    # Only the checks that depend on layout run again, on a snapshot taken at that size
+    assert [(issue['check'], issue['viewport'], issue['width']) for issue in issues] == [
+        ('color_contrast', '375x812', 375), ('color_contrast', '1920x1080', 1920)
+    ]
+    overrides = [params for command, params in tester.driver.cdp if command == 'Emulation.setDeviceMetricsOverride']
+    assert [(params['width'], params['mobile']) for params in overrides] == [(375, True), (1920, False)]
+    assert tester.driver.cdp[-1] == ('Emulation.clearDeviceMetricsOverride', {})
+    assert [entry['viewport'] for entry in tester.viewports] == ['375x812', '1920x1080']
+    assert tester.viewports[0]['issue_count'] == 1
+    assert tester.viewports[0]['check_status'] == {'color_contrast': {'status': 'completed'}}
+    assert (tester.check_status, tester.snapshot) == primary
+
+
+def test_no_layout_checks_means_no_resizing(monkeypatch):
+    tester = viewport_tester(monkeypatch)
+    assert tester.audit_viewports([[375, 812]], ['alt_text'], set(), app.Deadline(30)) == []
+    assert tester.driver.cdp == []
+
+
+def test_override_is_cleared_after_a_failure(monkeypatch):
+    tester = viewport_tester(monkeypatch)
+
+    def fail(names, deadline=None, viewport=None):
+        raise RuntimeError('renderer crashed')
+
+    monkeypatch.setattr(tester, 'run_checks', fail)
+    with pytest.raises(RuntimeError):
+        tester.audit_viewports([[375, 812]], ['color_contrast'], set(), app.Deadline(30))
+    assert tester.driver.cdp[-1] == ('Emulation.clearDeviceMetricsOverride', {})